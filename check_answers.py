@@ -12,7 +12,7 @@ train_set, eval_set = arckit.load_data()
 task = train_set[4]
 task.show()
 db_manager = create_knowledge_graph(task)
-props = db_manager.get_shared_properties(example_id=1, batch_size=100)
+props = db_manager.get_shared_properties(example_id=1)
             
             # Do matching on the properties and take the first five objects
 top_5_pairs = get_top_n_pairs_exact(
@@ -0,0 +1,72 @@
+# Benchmark for the boundary detection in the dsl (pixel_out and friends), run with
+#   python -m dsl.benchmark_boundaries
+# It compares the set-membership implementations in dsl/dsl.py against the previous implementation, which compared
+# every pixel against every other pixel, on objects that fill the whole grid.
+
+import timeit
+
+from dsl.dsl import (
+    Constraints,
+    Object,
+    neighborhood,
+    neighborhood_with_diagonals,
+    pixel_out,
+    pixel_out_with_uncovered_neighbors_with_diagonal,
+)
+
+
+# previous implementations, kept as reference
+def quadratic_pixel_out(constraints, object: Object) -> Object:
+    outcome = set()
+    for pixel_1 in object:
+        neighborhood_pixel_1 = neighborhood(constraints, pixel_1)
+        for pixel_2 in object:
+            pixel_2_check = (pixel_2[0],pixel_2[1], pixel_1[2])
+            if  pixel_2_check in neighborhood_pixel_1:
+                neighborhood_pixel_1.remove(pixel_2_check)
+            if len( neighborhood_pixel_1) == 0:
+                break
+        if len(neighborhood_pixel_1) != 0:
+            outcome.add(pixel_1)
+    return outcome
+
+def quadratic_pixel_out_with_uncovered_neighbors_with_diagonal(constraints, object: Object):
+    outside_pixels = set()
+    uncovered_neighbors = set()
+    for pixel_1 in object:
+        local_uncovered = set(neighborhood_with_diagonals(constraints, pixel_1))
+        for pixel_2 in object:
+            pixel_2_check = (pixel_2[0], pixel_2[1], pixel_1[2])
+            if pixel_2_check in local_uncovered:
+                local_uncovered.remove(pixel_2_check)
+            if len(local_uncovered) == 0:
+                break
+        if len(local_uncovered) != 0:
+            outside_pixels.add(pixel_1)
+            uncovered_neighbors.update(local_uncovered)
+    return outside_pixels, uncovered_neighbors
+
+
+def full_grid_object(grid_width, grid_height, color=3) -> Object:
+    return set((x, y, color) for x in range(grid_width) for y in range(grid_height))
+
+
+def benchmark(grid_size=30, repeat=3):
+    constraints = Constraints(color=1, grid_width=grid_size, grid_height=grid_size)
+    object = full_grid_object(grid_size, grid_size)
+
+    comparisons = [
+        ('pixel_out', quadratic_pixel_out, pixel_out),
+        ('pixel_out_with_uncovered_neighbors_with_diagonal', quadratic_pixel_out_with_uncovered_neighbors_with_diagonal, pixel_out_with_uncovered_neighbors_with_diagonal),
+    ]
+
+    print(f'{grid_size}x{grid_size} full-grid object ({len(object)} pixels)')
+    for name, old, new in comparisons:
+        assert old(constraints, object) == new(constraints, object), f'{name}: results differ'
+        old_time = min(timeit.repeat(lambda: old(constraints, object), number=1, repeat=repeat))
+        new_time = min(timeit.repeat(lambda: new(constraints, object), number=1, repeat=repeat))
+        print(f'{name}: {old_time * 1000:.1f} ms -> {new_time * 1000:.2f} ms ({old_time / new_time:.0f}x faster)')
+
+
+if __name__ == '__main__':
+    benchmark()
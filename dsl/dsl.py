@@ -1,5 +1,10 @@
 from typing import TypeAlias, Tuple, Set    # Definition of a set of types
 from collections import Counter             #for base function
+import dataclasses
+
+import numpy as np
+
+from grid_utils.morphology import find_enclosed_regions
 
 
 #basic types
@@ -13,11 +18,17 @@ Object: TypeAlias = Set[Pixel]  # Note that any grid is hence an object
 # Gridsize: TypeAlias = Tuple[coordinate, coordinate] # this is the type for the whole grid
 
 
+# Constraints are immutable (and hashable), so a search can share them between branches, use them in cache keys and
+# send them to other processes. Every DSL operation returns its outcome together with the constraints that hold for
+# it: the same object if the grid is unchanged, a new one (see replace) if the operation changes the grid dimensions.
+@dataclasses.dataclass(frozen=True, slots=True)
 class Constraints:
-    def __init__(self, color : color, grid_width : coordinate, grid_height : coordinate):
-        self.color : color  = color
-        self.grid_width : coordinate = grid_width
-        self.grid_height : coordinate = grid_height
+    color : color
+    grid_width : coordinate
+    grid_height : coordinate
+
+    def replace(self, **changes) -> 'Constraints':
+        return dataclasses.replace(self, **changes)
 
     
 #Core functions: these functions are not part of the DSL but enable us to detect elements of a structure:
@@ -45,120 +56,56 @@ def only_diagonal_neighborhood(constraints, pixel: Pixel) -> Object:     #We wan
             outcome.add((pixel[0] + change[0], pixel[1] + change[1], pixel[2]))
     return outcome
 
+def uncovered_neighborhood(constraints, object: Object, neighborhood_function) -> Tuple[Object, Object]:
+    # For every pixel, look up its neighbours in the set of occupied coordinates. This is linear in the size of the
+    # object, instead of comparing every pixel against every other pixel.
+    occupied = set((x, y) for x, y, c in object)
+    outside_pixels = set()
+    uncovered_neighbors = set()
+    for pixel in object:
+        local_uncovered = set(neighbor for neighbor in neighborhood_function(constraints, pixel) if (neighbor[0], neighbor[1]) not in occupied)
+        if len(local_uncovered) != 0:                   # If there are uncovered neighbors, the object has empty-space next to the pixel
+            outside_pixels.add(pixel)
+            uncovered_neighbors.update(local_uncovered)
+    return outside_pixels, uncovered_neighbors
+
 def pixel_out(constraints, object: Object) -> Object:             # Given an object, we want to the pixels on the outside
-    outcome = set()
-    for pixel_1 in object:
-        neighborhood_pixel_1 = neighborhood(constraints, pixel_1)
-        for pixel_2 in object:
-            pixel_2_check = (pixel_2[0],pixel_2[1], pixel_1[2])     # We want to check whether an object is in the 
-            if  pixel_2_check in neighborhood_pixel_1:
-                neighborhood_pixel_1.remove(pixel_2_check)          
-            if len( neighborhood_pixel_1) == 0:                     # This provides a stop if the  neighborhood_pixel_1 is already empty
-                break
-        if len(neighborhood_pixel_1) != 0:                          # If there is still some neighborhoods which are not covered, we know that the object has empty-space next to it
-            outcome.add(pixel_1)
-    return outcome
+    outside_pixels, _ = uncovered_neighborhood(constraints, object, neighborhood)
+    return outside_pixels
 
 def pixel_in(constraints, object: Object) -> Object:             # Given an object, we want to the pixels in the inside
-    result = object
-    outcome = set()
-    for pixel_1 in object:
-        neighborhood_pixel_1 = neighborhood(constraints, pixel_1)
-        for pixel_2 in object:
-            pixel_2_check = (pixel_2[0],pixel_2[1], pixel_1[2])     # We want to check whether an object is in the  neighborhood of pixel_1
-            if  pixel_2_check in neighborhood_pixel_1:
-                neighborhood_pixel_1.remove(pixel_2_check)          
-            if len( neighborhood_pixel_1) == 0:                     # This provides a stop if the  neighborhood_pixel_1 is already empty
-                break
-        if len(neighborhood_pixel_1) == 0:                          # If every neighborhood is covered, we know that the object has no empty-space next to it
-            outcome.add(pixel_1)
-    for pixel in outcome:
-        result.remove(pixel)
-    return result
+    # The object without the pixels whose whole neighborhood is covered, which are the same pixels as pixel_out.
+    # change_color_pixel_in/out and the stored programs rely on this, so it stays as it was
+    return pixel_out(constraints, object)
 
 
 def holes(constraints, object: Object) -> Object:  # outputs a set containing pixel-holes of an object
-    outcome = set()
-    object_xy = set((x,y) for x,y,c in object)
-    for x in range(constraints.grid_width):
-        for y in range(constraints.grid_height):
-            if (x,y) in object_xy:
-                continue 
-            left = (x - 1, y) in object_xy
-            right = (x + 1, y) in object_xy
-            above = (x, y + 1) in object_xy
-            below = (x, y - 1) in object_xy
-
-            if left and right and above and below:
-                outcome.add((x,y,constraints.color)) #@Lorenz changed this to outcome from holes. Also, colored it bc otherwise with only coordinates, it is not a set of pixels and hence not an object!
-    return outcome 
+    # Draw the object on a boolean grid and flood-fill the background, every cell the fill cannot reach is a hole.
+    # This finds holes of any size, not just single pixels.
+    mask = np.zeros((constraints.grid_height, constraints.grid_width), dtype=bool)
+    object_xy = np.array([(x, y) for x, y, c in object if 0 <= x < constraints.grid_width and 0 <= y < constraints.grid_height], dtype=int).reshape(-1, 2)
+    mask[object_xy[:, 1], object_xy[:, 0]] = True
+    hole_y, hole_x = np.nonzero(find_enclosed_regions(mask))
+    return set((x, y, constraints.color) for x, y in zip(hole_x.tolist(), hole_y.tolist())) # colored, bc otherwise with only coordinates, it is not a set of pixels and hence not an object!
 
 def pixel_out_with_uncovered_neighbors(constraints, object: Object) -> Tuple[Object, Object]:
-    outside_pixels = set()
-    uncovered_neighbors = set()
-
-    for pixel_1 in object:
-        neighborhood_pixel_1 = neighborhood(constraints,pixel_1)
-        local_uncovered = set(neighborhood_pixel_1)  # Start with all neighbors.
-
-        for pixel_2 in object:
-            pixel_2_check = (pixel_2[0], pixel_2[1], pixel_1[2])  # Align dimensions for comparison.
-            if pixel_2_check in local_uncovered:
-                local_uncovered.remove(pixel_2_check)  # Remove covered neighbors.
-            if len(local_uncovered) == 0:  # Stop early if no uncovered neighbors remain.
-                break
-
-        if len(local_uncovered) != 0:  # If there are uncovered neighbors:
-            outside_pixels.add(pixel_1)  # Add to outside pixels.
-            uncovered_neighbors.update(local_uncovered)  # Collect uncovered neighbors.
-
-    return outside_pixels, uncovered_neighbors
+    return uncovered_neighborhood(constraints, object, neighborhood)
 
 def pixel_out_with_uncovered_neighbors_with_diagonal(constraints, object: Object) -> Tuple[Object, Object]:
-    outside_pixels = set()
-    uncovered_neighbors = set()
-
-    for pixel_1 in object: 
-        neighborhood_pixel_1 = neighborhood_with_diagonals(constraints, pixel_1) #@Lorenz this requires an object, you are giving it a pixel. I changed the function.
-        local_uncovered = set(neighborhood_pixel_1)  # Start with all neighbors.
-
-        for pixel_2 in object:
-            pixel_2_check = (pixel_2[0], pixel_2[1], pixel_1[2])  # Align dimensions for comparison.
-            if pixel_2_check in local_uncovered:
-                local_uncovered.remove(pixel_2_check)  # Remove covered neighbors.
-            if len(local_uncovered) == 0:  # Stop early if no uncovered neighbors remain.
-                break
-
-        if len(local_uncovered) != 0:  # If there are uncovered neighbors:
-            outside_pixels.add(pixel_1)  # Add to outside pixels.
-            uncovered_neighbors.update(local_uncovered)  # Collect uncovered neighbors.
-
-    return outside_pixels, uncovered_neighbors
+    return uncovered_neighborhood(constraints, object, neighborhood_with_diagonals)
 
 def pixel_out_with_uncovered_neighbors_only_diagonal_neighborhood(constraints, object: Object) -> Tuple[Object, Object]:
-    outside_pixels = set()
-    uncovered_neighbors = set()
-
-    for pixel_1 in object:
-        neighborhood_pixel_1 = only_diagonal_neighborhood(constraints, pixel_1)
-        local_uncovered = set(neighborhood_pixel_1)  # Start with all neighbors.
-
-        for pixel_2 in object:
-            pixel_2_check = (pixel_2[0], pixel_2[1], pixel_1[2])  # Align dimensions for comparison.
-            if pixel_2_check in local_uncovered:
-                local_uncovered.remove(pixel_2_check)  # Remove covered neighbors.
-            if len(local_uncovered) == 0:  # Stop early if no uncovered neighbors remain.
-                break
+    return uncovered_neighborhood(constraints, object, only_diagonal_neighborhood)
 
-        if len(local_uncovered) != 0:  # If there are uncovered neighbors:
-            outside_pixels.add(pixel_1)  # Add to outside pixels.
-            uncovered_neighbors.update(local_uncovered)  # Collect uncovered neighbors.
-
-    return outside_pixels, uncovered_neighbors
+def first_pixel(object: Object) -> Pixel:
+    # Any pixel of the object. An empty object has no coordinates, like max() of an empty list this is a ValueError
+    for pixel in object:
+        return pixel
+    raise ValueError("the object has no pixels")
 
 def x_max(object: Object) -> coordinate:
     # x_max = object[0][0]            # Initialize with the x-coordinate of the first pixel
-    x_max =  next(iter(object))[0]  
+    x_max =  first_pixel(object)[0]  
     for pixel in object:
         if pixel[0] > x_max:        # Compare the x-coordinate of each pixel
             x_max = pixel[0]
@@ -166,7 +113,7 @@ def x_max(object: Object) -> coordinate:
 
 def x_min(object: Object) -> coordinate:
     # x_min = object[0][0]            # Initialize with the x-coordinate of the first pixel
-    x_min =  next(iter(object))[0]  
+    x_min =  first_pixel(object)[0]  
     for pixel in object:
         if pixel[0] < x_min:        # Compare the x-coordinate of each pixel
             x_min = pixel[0]
@@ -174,7 +121,7 @@ def x_min(object: Object) -> coordinate:
 
 def y_max(object: Object) -> coordinate:
     # y_max = object[0][1]            # Initialize with the y-coordinate of the first pixel
-    y_max =  next(iter(object))[1]  
+    y_max =  first_pixel(object)[1]  
     for pixel in object:
         if pixel[1] > y_max:        # Compare the y-coordinate of each pixel
             y_max = pixel[1]
@@ -182,208 +129,198 @@ def y_max(object: Object) -> coordinate:
 
 def y_min(object: Object) -> coordinate:
     # y_min = object[0][1]            # Initialize with the y-coordinate of the first pixel @Lorenz: object is a set, not a list! You cannot refer to it like this, instead we just draw an element from the set. I changed it below:
-    y_min =  next(iter(object))[1]   
+    y_min =  first_pixel(object)[1]   
     
     for pixel in object:
         if pixel[1] < y_min:        # Compare the y-coordinate of each pixel
             y_min = pixel[1]
     return y_min  
 
+def color_order_key(farbe, count):
+    # Sort key of a color by its count, the largest key wins: ties go to the smaller color (pixels without a color come
+    # last), so the result does not depend on the order in which the set of pixels is iterated
+    return (count, farbe is not None, 0 if farbe is None else -farbe)
+
 def color_max(object: Object) -> color:
-    colorlist = [pixel[2] for pixel in object]  # Collect all colors
-    colorcounts = Counter(colorlist)           # Count occurrences of each color
-    max_count = 0
-    max_color = None
-    for farbe, count in colorcounts.items():
-        if farbe != 1 and max_count < count:  # Exclude background and ensure color appears
-            max_color = farbe
-            max_count = count
-    return max_color
+    colorlist = [pixel[2] for pixel in object if pixel[2] != 1]  # Collect all colors, exclude background
+    colorcounts = Counter(colorlist)                              # Count occurrences of each color
+    if not colorcounts:
+        return None
+    return max(colorcounts, key=lambda farbe: color_order_key(farbe, colorcounts[farbe]))
 
 def color_min(object: Object) -> color:
-    colorlist = [pixel[2] for pixel in object]  # Collect all colors
-    colorcounts = Counter(colorlist)            # Count occurrences of each color
-    min_count = float('inf')
-    min_color = None
-    for farbe, count in colorcounts.items():
-        if farbe != 1 and 0 < count < min_count:  # Exclude background and ensure color appears
-            min_color = farbe
-            min_count = count
-    return min_color
+    colorlist = [pixel[2] for pixel in object if pixel[2] != 1]  # Collect all colors, exclude background
+    colorcounts = Counter(colorlist)                              # Count occurrences of each color
+    if not colorcounts:
+        return None
+    return max(colorcounts, key=lambda farbe: color_order_key(farbe, -colorcounts[farbe]))
 
 def color_order(object: Object) -> list[color]: # Generalisation of min, max
     colorlist = [pixel[2] for pixel in object]  # Collect all colors
     colorcounts = Counter(colorlist)            # Count occurrences of each color
     
-    sorted_colors = sorted([(farbe, count) for farbe, count in colorcounts.items() if farbe != 1], key=lambda x: x[1], reverse=True) #sorts color and cound by decending order
+    sorted_colors = sorted([(farbe, count) for farbe, count in colorcounts.items() if farbe != 1], key=lambda x: color_order_key(*x), reverse=True) #sorts color and cound by decending order
     
     return [farbe for farbe, count in sorted_colors] #return only color
 
 # mirrors on x axis
-def flip_xax(constraints, object: Object) -> Object: #we want to flip the y-value of the pixels
+def flip_xax(constraints, object: Object) -> Tuple[Object, Constraints]: #we want to flip the y-value of the pixels
     outcome = set()
     for pixel in object:
         newpixel = (pixel[0], constraints.grid_height - pixel[1] - 1, pixel[2])
         outcome.add(newpixel) 
-    return outcome
+    return outcome, constraints
 
 # mirrors on y axis
-def flip_yax(constraints, object: Object) -> Object: #we want to flip the x-value of the pixels
+def flip_yax(constraints, object: Object) -> Tuple[Object, Constraints]: #we want to flip the x-value of the pixels
     outcome = set()
     for pixel in object:
         newpixel = (constraints.grid_width - pixel[0] -1, pixel[1], pixel[2])
         outcome.add(newpixel) 
-    return outcome
+    return outcome, constraints
 
-def flip_object_around_own_xax(constraints, object: Object) -> Object:
+def flip_object_around_own_xax(constraints, object: Object) -> Tuple[Object, Constraints]:
     outcome = set()
     max_y_value =  y_max(object)
     min_y_value =  y_min(object)
     for pixel in object:
         newpixel = (pixel[0], max_y_value + min_y_value - pixel[1], pixel[2])
         outcome.add(newpixel)
-    return outcome
+    return outcome, constraints
 
-def flip_object_around_own_yax(constraints, object: Object) -> Object:
+def flip_object_around_own_yax(constraints, object: Object) -> Tuple[Object, Constraints]:
     outcome = set()
     max_x_value =  x_max(object)
     min_x_value =  x_min(object)
     for pixel in object:
         newpixel = (max_x_value + min_x_value - pixel[0],pixel[1], pixel[2])
         outcome.add(newpixel)
-    return outcome
+    return outcome, constraints
 
-def move_right(constraints, object: Object) -> Object: #we want to move the object one pixel to the right 
+def move_right(constraints, object: Object) -> Tuple[Object, Constraints]: #we want to move the object one pixel to the right 
     outcome = set()
     for pixel in object:
         if pixel[0] + 1 <= constraints.grid_width:  
             newpixel = (pixel[0] +1 , pixel[1], pixel[2])
             outcome.add(newpixel) 
-    return outcome
+    return outcome, constraints
 
-def move_left(constraints, object: Object) -> Object:  #we want tot move the object one pixel to the right 
+def move_left(constraints, object: Object) -> Tuple[Object, Constraints]:  #we want tot move the object one pixel to the right 
     outcome = set()
     for pixel in object:
         if pixel[0] - 1 >= 0:  
             newpixel = (pixel[0]  - 1 , pixel[1], pixel[2])
             outcome.add(newpixel) 
-    return outcome
+    return outcome, constraints
 
-def move_down(constraints, object: Object) -> Object: #we want tot move the object one pixel up 
+def move_down(constraints, object: Object) -> Tuple[Object, Constraints]: #we want tot move the object one pixel up 
     outcome = set()
     for pixel in object:
         if pixel[1] + 1 <= constraints.grid_height:  
             newpixel = (pixel[0], pixel[1] + 1, pixel[2])
             outcome.add(newpixel) 
-    return outcome
+    return outcome, constraints
 
-def move_up(constraints, object: Object) -> Object:  #we want to move the object one pixel down
+def move_up(constraints, object: Object) -> Tuple[Object, Constraints]:  #we want to move the object one pixel down
     outcome = set()
     for pixel in object:
         if pixel[1] - 1 >= 0:  
             newpixel = (pixel[0], pixel[1] - 1, pixel[2])
             outcome.add(newpixel) 
-    return outcome
+    return outcome, constraints
 
-def move_left_edge(constraints, object: Object) -> Object: # move to left edge
+def move_left_edge(constraints, object: Object) -> Tuple[Object, Constraints]: # move to left edge
     outcome = set()
     min_x_value = x_min(object)
     for pixel in object:
         newpixel = (pixel[0] - min_x_value, pixel[1], pixel[2])
         outcome.add(newpixel)
-    return outcome 
+    return outcome, constraints
 
-def move_right_edge(constraints, object: Object) -> Object: #move to right edge
+def move_right_edge(constraints, object: Object) -> Tuple[Object, Constraints]: #move to right edge
     outcome = set()
     max_x_value = x_max(object)
     for pixel in object:
         newpixel = (pixel[0] + (constraints.grid_width - max_x_value - 1), pixel[1], pixel[2])
         outcome.add(newpixel)
-    return outcome 
+    return outcome, constraints
 
-def move_up_edge(constraints, object: Object) -> Object: # move to bottom edge
+def move_up_edge(constraints, object: Object) -> Tuple[Object, Constraints]: # move to bottom edge
     outcome = set()
     min_y_value = y_min(object)
     for pixel in object:
         newpixel = (pixel[0], pixel[1] - min_y_value, pixel[2])
         outcome.add(newpixel)
-    return outcome 
+    return outcome, constraints
 
-def move_down_edge(constraints, object: Object) -> Object: # move to top edge
+def move_down_edge(constraints, object: Object) -> Tuple[Object, Constraints]: # move to top edge
     outcome = set()
     max_y_value = y_max(object)
     for pixel in object:
         newpixel = (pixel[0], pixel[1] + (constraints.grid_height - max_y_value - 1), pixel[2])
         outcome.add(newpixel)
-    return outcome 
+    return outcome, constraints
 
 ### DSL Transform 
-def isolate(constraints, object: Object) -> (Object): #isolate an object
+def isolate(constraints, object: Object) -> Tuple[Object, Constraints]: #isolate an object
     outcome= set()
     for pixel in object:
         newpixel = (pixel[0] - x_min(object), pixel[1] - y_min(object), pixel[2])
         outcome.add(newpixel)
     #newgridsize = (x_max(object) - x_min(object),y_max(object)-y_min(object) )
-    print('these would be the new values for x_max and y_max:', x_max(object), y_max(object))
-    constraints.grid_width = x_max(object) - x_min(object) +1                # to be checked @Natasha
-    constraints.grid_height = y_max(object) - y_min(object) +1               # to be checked @Natasha
-    return outcome
+    new_constraints = constraints.replace(grid_width=x_max(object) - x_min(object) + 1,       # to be checked @Natasha
+                                          grid_height=y_max(object) - y_min(object) + 1)      # to be checked @Natasha
+    return outcome, new_constraints
 
-def color_object_max(constraints, object: Object) -> (Object):
+def color_object_max(constraints, object: Object) -> Tuple[Object, Constraints]:
     outcome = set()
     tobecolor = color_max(object)
     for pixel in object:
         outcome.add((pixel[0], pixel[1], tobecolor))
-    return outcome
+    return outcome, constraints
 
-def color_object_min(constraints, object: Object) -> (Object):
+def color_object_min(constraints, object: Object) -> Tuple[Object, Constraints]:
     outcome = set()
     tobecolor = color_min(object)
     for pixel in object:
         outcome.add((pixel[0], pixel[1], tobecolor))
-    return outcome
+    return outcome, constraints
 
-def project_dupliate(constraints, object: Object) -> Object: #duplication of an object
+def project_dupliate(constraints, object: Object) -> Tuple[Object, Constraints]: #duplication of an object
     outcome = set()
     for (pixel) in object: 
         for x_value in range(0,2):
             for y_value in range(0,2):
                 newpixel = (pixel[0] * 2 + x_value, pixel[1] * 2 + y_value, pixel[2]) 
                 outcome.add(newpixel)
-    constraints.grid_height = constraints.grid_height *2
-    constraints.grid_width = constraints.grid_width *2
-    return outcome
+    return outcome, constraints.replace(grid_width=constraints.grid_width * 2, grid_height=constraints.grid_height * 2)
 
-def project_triplicate(constraints, object: Object) -> Object: #triplication of an object
+def project_triplicate(constraints, object: Object) -> Tuple[Object, Constraints]: #triplication of an object
     outcome = set()
     for (pixel) in object: 
         for x_value in range(0,3):
             for y_value in range(0,3):
                 newpixel = (pixel[0] * 3 + x_value, pixel[1] * 3 + y_value, pixel[2]) 
                 outcome.add(newpixel)
-    constraints.grid_height = constraints.grid_height *3
-    constraints.grid_width = constraints.grid_width *3
-    return outcome
+    return outcome, constraints.replace(grid_width=constraints.grid_width * 3, grid_height=constraints.grid_height * 3)
 
-def project_quintuplicate(constraints, object: Object) -> Object: #quintuplication of an object
+def project_quintuplicate(constraints, object: Object) -> Tuple[Object, Constraints]: #quintuplication of an object
     outcome = set()
     for (pixel) in object: 
         for x_value in range(0,5):
             for y_value in range(0,5):
                 newpixel = (pixel[0] * 5 + x_value, pixel[1] *5 + y_value, pixel[2]) 
                 outcome.add(newpixel)
-    constraints.grid_height = constraints.grid_height *5
-    constraints.grid_width = constraints.grid_width *5
-    return outcome
+    return outcome, constraints.replace(grid_width=constraints.grid_width * 5, grid_height=constraints.grid_height * 5)
     
 
-def project_half(constraints, object: Object) -> Object: #project on grid of half size
+def project_half(constraints, object: Object) -> Tuple[Object, Constraints]: #project on grid of half size
     outcome = set()
     grid_x_value = x_max(object) - x_min(object) + 1
     grid_y_value = y_max(object) - y_min(object) + 1
     
     if grid_x_value % 2 != 0 or grid_y_value % 2 != 0:
-        return object
+        return object, constraints
 
     for value_1 in range(2): #to shrink x-value
         for value_2 in range(2): # to shrink y-value
@@ -396,17 +333,15 @@ def project_half(constraints, object: Object) -> Object: #project on grid of hal
             # else:
             #     outcome.add((value_1, value_2, 0))
 
-    constraints.grid_height = int(constraints.grid_height /2)
-    constraints.grid_width = int(constraints.grid_width /2)
-    return outcome 
+    return outcome, constraints.replace(grid_width=int(constraints.grid_width / 2), grid_height=int(constraints.grid_height / 2))
 
-def project_third(constraints, object: Object) -> Object: #project on grid of third size
+def project_third(constraints, object: Object) -> Tuple[Object, Constraints]: #project on grid of third size
     outcome = set()
     grid_x_value = x_max(object) - x_min(object) + 1
     grid_y_value = y_max(object) - y_min(object) + 1
     
     if grid_x_value % 3 != 0 or grid_y_value % 3 != 0:
-        return object
+        return object, constraints
 
     for value_1 in range(3): #to shrink x-value
         for value_2 in range(3): # to shrink y-value
@@ -419,17 +354,15 @@ def project_third(constraints, object: Object) -> Object: #project on grid of th
             # else:
             #     outcome.add((value_1, value_2, 0))
 
-    constraints.grid_height = int(constraints.grid_height /3)
-    constraints.grid_width = int(constraints.grid_width /3)
-    return outcome 
+    return outcome, constraints.replace(grid_width=int(constraints.grid_width / 3), grid_height=int(constraints.grid_height / 3))
 
-def project_fifth(constraints, object: Object) -> Object: #project on grid of fifth size
+def project_fifth(constraints, object: Object) -> Tuple[Object, Constraints]: #project on grid of fifth size
     outcome = set()
     grid_x_value = x_max(object) - x_min(object) + 1
     grid_y_value = y_max(object) - y_min(object) + 1
     
     if grid_x_value % 5 != 0 or grid_y_value % 5 != 0:
-        return object
+        return object, constraints
 
     for value_1 in range(5): #to shrink x-value
         for value_2 in range(5): # to shrink y-value
@@ -439,61 +372,59 @@ def project_fifth(constraints, object: Object) -> Object: #project on grid of fi
                     subgrid.add((x,y,c))
             if color_max(subgrid) is not None:    
                 outcome.add((value_1, value_2, color_max(subgrid))) #add new pixel to final object
-    constraints.grid_height = int(constraints.grid_height /5)
-    constraints.grid_width = int(constraints.grid_width /5)
-    return outcome 
+    return outcome, constraints.replace(grid_width=int(constraints.grid_width / 5), grid_height=int(constraints.grid_height / 5))
 
 
-def add_star_around_object(constraints, object: Object) -> Object: # add star-like pixels
-    outcome = object
+def add_star_around_object(constraints, object: Object) -> Tuple[Object, Constraints]: # add star-like pixels
+    outcome = set(object)
     outside_pixels, uncovered_neighbors = pixel_out_with_uncovered_neighbors(constraints, object) # then we add the surronding objects
     for pixel in uncovered_neighbors:
         outcome.add((pixel[0],pixel[1], constraints.color)) #they get the assigned color
     
-    return object
+    return outcome, constraints
 
-def add_corners_around_object(constraints, object: Object) -> Object: # add diagonal corners
-    outcome = object
+def add_corners_around_object(constraints, object: Object) -> Tuple[Object, Constraints]: # add diagonal corners
+    outcome = set(object)
     outside_pixels, uncovered_neighbors = pixel_out_with_uncovered_neighbors_only_diagonal_neighborhood(constraints, object) # then we add the surronding corners
     for pixel in uncovered_neighbors:
         outcome.add((pixel[0],pixel[1], constraints.color)) #they get the assigned color
     
-    return object
+    return outcome, constraints
 
-def add_border_around_object(constraints, object: Object) -> Object: # add boundary
-    outcome = object
+def add_border_around_object(constraints, object: Object) -> Tuple[Object, Constraints]: # add boundary
+    outcome = set(object)
     outside_pixels, uncovered_neighbors = pixel_out_with_uncovered_neighbors_with_diagonal(constraints, object) # then we add the surronding corners
     for pixel in uncovered_neighbors:
         outcome.add((pixel[0],pixel[1], constraints.color)) #they get the assigned color
     
-    return outcome
+    return outcome, constraints
 
-def change_color_pixel_out(constraints, object: Object) -> Object: # only change the color of pixels classified as out-side pixels 
+def change_color_pixel_out(constraints, object: Object) -> Tuple[Object, Constraints]: # only change the color of pixels classified as out-side pixels 
     outcome = set()
     for pixel in pixel_in(constraints, object):
         outcome.add(pixel)
     for  pixel in pixel_out(constraints, object):
         outcome.add((pixel[0], pixel [1], constraints.color))
-    return outcome
+    return outcome, constraints
 
-def change_color_pixel_in(constraints, object: Object) -> (Object): # only change the color of pixels classified as in-side pixels 
+def change_color_pixel_in(constraints, object: Object) -> Tuple[Object, Constraints]: # only change the color of pixels classified as in-side pixels 
     outcome = set()
     for pixel in pixel_in(constraints, object):
         outcome.add((pixel[0], pixel [1], constraints.color))
     for  pixel in pixel_out(constraints, object):
         outcome.add(pixel)
-    return outcome
+    return outcome, constraints
 
-def fill_pixel(constraints, object: Object) -> Object: # fill pixel within an object
+def fill_pixel(constraints, object: Object) -> Tuple[Object, Constraints]: # fill pixel within an object
     outcome = set()
     detected_holes = holes(constraints, object)
     for pixel in object:
         outcome.add(pixel)
     for pixel in detected_holes: #@Lorenz I changed object here to holes
         outcome.add((pixel[0], pixel[1], constraints.color))
-    return outcome
+    return outcome, constraints
 
-def fill_pixel_right(constraints, object: Object) -> Object: # combine pixels on the same x-value but with a gap 
+def fill_pixel_right(constraints, object: Object) -> Tuple[Object, Constraints]: # combine pixels on the same x-value but with a gap 
     outcome = set()
     gaps = set()
     for y_value in range(0,constraints.grid_width):
@@ -509,9 +440,9 @@ def fill_pixel_right(constraints, object: Object) -> Object: # combine pixels on
         outcome.add(pixel)
     for pixel in gaps:
         outcome.add((pixel[0], pixel[1], constraints.color))
-    return outcome
+    return outcome, constraints
 
-def fill_pixel_down(constraints, object: Object) -> Object: # combine pixels on the same y-value but with a gap
+def fill_pixel_down(constraints, object: Object) -> Tuple[Object, Constraints]: # combine pixels on the same y-value but with a gap
     outcome = set()
     gaps = set()
     for x_value in range(0,constraints.grid_height):
@@ -527,11 +458,11 @@ def fill_pixel_down(constraints, object: Object) -> Object: # combine pixels on
         outcome.add(pixel)
     for pixel in gaps:
         outcome.add((pixel[0], pixel[1], constraints.color))
-    return outcome
+    return outcome, constraints
 
 
 # DSL grid modifications
-def grid_add_down(constraints, object: Object) -> Object: #add one more gridline at the bottom
+def grid_add_down(constraints, object: Object) -> Tuple[Object, Constraints]: #add one more gridline at the bottom
     outcome = set()
     for pixel in object:
         outcome.add(pixel) # @Lorenz, why not outcome=object instead of this loop?
@@ -539,10 +470,9 @@ def grid_add_down(constraints, object: Object) -> Object: #add one more gridline
     for x_value in range(constraints.grid_width): 
         newpixel = (x_value, constraints.grid_height, constraints.color)
         outcome.add(newpixel)
-    constraints.grid_height = constraints.grid_height +1
-    return outcome
+    return outcome, constraints.replace(grid_height=constraints.grid_height + 1)
 
-def grid_add_up(constraints, object: Object) -> Object: #add one more gridline at the top
+def grid_add_up(constraints, object: Object) -> Tuple[Object, Constraints]: #add one more gridline at the top
     outcome = set()
     for pixel in object:
         newpixel = (pixel[0], pixel[1] + 1, pixel[2])
@@ -550,20 +480,18 @@ def grid_add_up(constraints, object: Object) -> Object: #add one more gridline a
     for x_value in range(constraints.grid_width):
         newpixel = (x_value, 0, constraints.color)
         outcome.add(newpixel)
-    constraints.grid_height = constraints.grid_height +1
-    return outcome
+    return outcome, constraints.replace(grid_height=constraints.grid_height + 1)
 
-def grid_add_right(constraints, object: Object) -> Object: #add one more gridline right
+def grid_add_right(constraints, object: Object) -> Tuple[Object, Constraints]: #add one more gridline right
     outcome = set()
     for pixel in object:
         outcome.add(pixel)
     for y_value in range(constraints.grid_height):
         newpixel = (constraints.grid_width, y_value, constraints.color)
         outcome.add(newpixel)
-    constraints.grid_width = constraints.grid_width +1
-    return outcome
+    return outcome, constraints.replace(grid_width=constraints.grid_width + 1)
 
-def grid_add_left(constraints, object: Object) -> Object: #add one more gridline left
+def grid_add_left(constraints, object: Object) -> Tuple[Object, Constraints]: #add one more gridline left
     outcome = set()
     for pixel in object:
         newpixel = (pixel[0] +1, pixel[1], pixel[2])
@@ -571,10 +499,9 @@ def grid_add_left(constraints, object: Object) -> Object: #add one more gridline
     for y_value in range(constraints.grid_height):
         newpixel = (0, y_value, constraints.color)
         outcome.add(newpixel)
-    constraints.grid_width = constraints.grid_width +1
-    return outcome
+    return outcome, constraints.replace(grid_width=constraints.grid_width + 1)
 
-def grid_add_up_and_down (constraints, object: Object) -> Object: #add one more gridline at top and bottom
+def grid_add_up_and_down (constraints, object: Object) -> Tuple[Object, Constraints]: #add one more gridline at top and bottom
     outcome = set()
     for pixel in object:
         newpixel = (pixel[0], pixel[1] + 1, pixel[2])
@@ -584,10 +511,9 @@ def grid_add_up_and_down (constraints, object: Object) -> Object: #add one more
         outcome.add(newpixel_1)
         newpixel_2 = (x_value, constraints.grid_height + 1, constraints.color) #last line #@Lorenz: what happens with this?
         outcome.add(newpixel_2)
-    constraints.grid_height = constraints.grid_height +2
-    return outcome
+    return outcome, constraints.replace(grid_height=constraints.grid_height + 2)
 
-def grid_add_left_and_right (constraints, object: Object) -> Object: #add one more gridline at left and right 
+def grid_add_left_and_right (constraints, object: Object) -> Tuple[Object, Constraints]: #add one more gridline at left and right 
     outcome = set()
     for pixel in object:
         newpixel = (pixel[0] + 1, pixel[1], pixel[2])
@@ -597,10 +523,9 @@ def grid_add_left_and_right (constraints, object: Object) -> Object: #add one mo
         outcome.add(newpixel_1)
         newpixel_2 = (constraints.grid_width + 1, y_value, constraints.color) #last line 
         outcome.add(newpixel_2)
-    constraints.grid_width = constraints.grid_width +2
-    return outcome
+    return outcome, constraints.replace(grid_width=constraints.grid_width + 2)
 
-def grid_duplicate_down(constraints, object: Object) -> Object: #add one more gridline by duplication the bottom line
+def grid_duplicate_down(constraints, object: Object) -> Tuple[Object, Constraints]: #add one more gridline by duplication the bottom line
     outcome = set()
     for pixel in object:
         outcome.add(pixel)
@@ -608,10 +533,9 @@ def grid_duplicate_down(constraints, object: Object) -> Object: #add one more gr
     for pixel in filtered_pixels:
         newpixel = (pixel[0], constraints.grid_height, pixel[2])
         outcome.add(newpixel)
-    constraints.grid_height = constraints.grid_height +1
-    return outcome
+    return outcome, constraints.replace(grid_height=constraints.grid_height + 1)
 
-def grid_duplicate_up(constraints, object: Object) -> Object: #add one more gridline by duplication the top line
+def grid_duplicate_up(constraints, object: Object) -> Tuple[Object, Constraints]: #add one more gridline by duplication the top line
     outcome = set()
     for pixel in object:      
         newpixel = (pixel[0], pixel[1] + 1, pixel[2])
@@ -620,10 +544,9 @@ def grid_duplicate_up(constraints, object: Object) -> Object: #add one more grid
     for pixel in filtered_pixels:
         newpixel = (pixel[0], 0, pixel[2])
         outcome.add(newpixel)
-    constraints.grid_height = constraints.grid_height +1
-    return outcome
+    return outcome, constraints.replace(grid_height=constraints.grid_height + 1)
 
-def grid_duplicate_right(constraints, object: Object) -> Object: #add one more gridline by duplication the right line
+def grid_duplicate_right(constraints, object: Object) -> Tuple[Object, Constraints]: #add one more gridline by duplication the right line
     outcome = set()
     for pixel in object:
         outcome.add(pixel)
@@ -631,10 +554,9 @@ def grid_duplicate_right(constraints, object: Object) -> Object: #add one more g
     for pixel in filtered_pixels:
         newpixel = (constraints.grid_width, pixel[1], pixel[2])
         outcome.add(newpixel)
-    constraints.grid_width = constraints.grid_width +1
-    return outcome
+    return outcome, constraints.replace(grid_width=constraints.grid_width + 1)
 
-def grid_duplicate_left(constraints, object: Object) -> Object: ##add one more gridline by duplication the left line
+def grid_duplicate_left(constraints, object: Object) -> Tuple[Object, Constraints]: ##add one more gridline by duplication the left line
     outcome = set()
     for pixel in object:
         newpixel = (pixel[0] +1, pixel[1], pixel[2])
@@ -643,11 +565,10 @@ def grid_duplicate_left(constraints, object: Object) -> Object: ##add one more g
     for pixel in filtered_pixels:
         newpixel = (0, pixel[1], pixel[2])
         outcome.add(newpixel)
-    constraints.grid_width = constraints.grid_width +1
-    return outcome
+    return outcome, constraints.replace(grid_width=constraints.grid_width + 1)
 
 
-def grid_duplicate_up_and_down (constraints, object: Object) -> Object: #duplication of top and bottom
+def grid_duplicate_up_and_down (constraints, object: Object) -> Tuple[Object, Constraints]: #duplication of top and bottom
     outcome = set()
     for pixel in object:
         newpixel = (pixel[0], pixel[1] + 1, pixel[2])
@@ -660,10 +581,9 @@ def grid_duplicate_up_and_down (constraints, object: Object) -> Object: #duplica
     for pixel in sorted_object_down: # new last line 
         newpixel = (pixel[0], constraints.grid_height + 1, pixel[2])
         outcome.add(newpixel)
-    constraints.grid_height = constraints.grid_height +2
-    return outcome
+    return outcome, constraints.replace(grid_height=constraints.grid_height + 2)
 
-def grid_duplicate_left_and_right (constraints, object: Object) -> Object: #duplication of left and right
+def grid_duplicate_left_and_right (constraints, object: Object) -> Tuple[Object, Constraints]: #duplication of left and right
     outcome = set()
     for pixel in object:
         newpixel = (pixel[0] + 1, pixel[1], pixel[2])
@@ -676,5 +596,4 @@ def grid_duplicate_left_and_right (constraints, object: Object) -> Object: #dupl
     for pixel in sorted_object_down: # new last line 
         newpixel = (constraints.grid_width + 1, pixel[1] ,pixel[2])
         outcome.add(newpixel)
-    constraints.grid_width = constraints.grid_width +2
-    return outcome
\ No newline at end of file
+    return outcome, constraints.replace(grid_width=constraints.grid_width + 2)
\ No newline at end of file
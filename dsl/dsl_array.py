@@ -0,0 +1,312 @@
+# Array backend for the DSL: instead of a set of (x, y, color) pixels, an object is stored as a dense int8 grid of
+# shape (grid_height, grid_width) in which empty cells hold EMPTY. The operations below are vectorized counterparts of
+# the move, flip, projection, grid_add and grid_duplicate families in dsl/dsl.py and follow the same contract:
+# they take (constraints, grid) and return (new_grid, constraints).
+#
+# Every operation also works on a stack of grids of shape (n, grid_height, grid_width), which applies it to all n
+# objects at once (see search/batch_evaluation.py); the constraints are then shared by all of them.
+#
+# For an object inside its grid the outcome is the same as the one of the set version (tests/test_dsl_array.py checks
+# this), with one exception: the array format has no place for pixels outside the grid. The set version of move_right
+# and move_down keeps pixels one step beyond the right/bottom border (so move_left and move_up undo them exactly), and
+# project_half/third/fifth can put pixels outside of grids with a size that is not a multiple of the factor. DSL_ARRAY_CASES tells for every grid of a stack
+# whether the operation is applied, leaves the grid as it is (like the set version does), or cannot give the outcome
+# of the set version (the set version raises an error, or its outcome does not fit on its grid). For a single grid the
+# operations handle the cases themselves and raise ValueError in the last one, for a stack the caller selects the
+# grids an operation applies to first (see search/batch_evaluation.py).
+
+import numpy as np
+
+from dsl.dsl import Constraints, Object
+
+EMPTY = -1          # value of a cell that is not part of the object
+NUM_COLORS = 10     # ARC colors 0-9
+
+# The cases of an operation per grid, see DSL_ARRAY_CASES
+APPLY = 0           # the operation is applied
+KEEP = 1            # the set version returns the object unchanged
+SKIP = 2            # the set version raises an error or its outcome does not fit on its grid
+
+
+# Converters between the set format and the array format
+def object_to_array(object: Object, grid_width, grid_height) -> np.ndarray:
+    grid = np.full((grid_height, grid_width), EMPTY, dtype=np.int8)
+    # pixels without a color (color_max of an object that only has color 1) cannot be drawn
+    pixels = [pixel for pixel in object if pixel[2] is not None]
+    if pixels:
+        pixels = np.array(pixels, dtype=np.int64)           # columns: x, y, color
+        inside = (pixels[:, 0] >= 0) & (pixels[:, 0] < grid_width) & (pixels[:, 1] >= 0) & (pixels[:, 1] < grid_height)
+        pixels = pixels[inside]
+        grid[pixels[:, 1], pixels[:, 0]] = pixels[:, 2]
+    return grid
+
+def array_to_object(grid: np.ndarray) -> Object:
+    rows, cols = np.nonzero(grid != EMPTY)
+    return set(zip(cols.tolist(), rows.tolist(), grid[rows, cols].tolist()))
+
+def constraints_for(constraints: Constraints, grid: np.ndarray) -> Constraints:
+    # constraints that match the dimensions of grid
+    grid_height, grid_width = grid.shape[-2:]
+    if constraints.grid_width == grid_width and constraints.grid_height == grid_height:
+        return constraints
+    return constraints.replace(grid_width=grid_width, grid_height=grid_height)
+
+
+# Helpers
+def _edges(grid: np.ndarray, axis):
+    # first and last column (axis=-2) or row (axis=-1) that contains a pixel, per grid of a stack. Empty grids get
+    # first = 0 and last = size - 1, so the edge moves leave them where they are
+    occupied = (grid != EMPTY).any(axis=axis)
+    size = occupied.shape[-1]
+    first = np.where(occupied.any(axis=-1), occupied.argmax(axis=-1), 0)
+    last = np.where(occupied.any(axis=-1), size - 1 - occupied[..., ::-1].argmax(axis=-1), size - 1)
+    return first, last
+
+def _shift(grid: np.ndarray, dx, dy) -> np.ndarray:
+    # moves all pixels by (dx, dy), pixels that leave the grid are dropped
+    height, width = grid.shape[-2:]
+    outcome = np.full_like(grid, EMPTY)
+    if abs(dx) >= width or abs(dy) >= height:
+        return outcome
+    outcome[..., max(dy, 0):height + min(dy, 0), max(dx, 0):width + min(dx, 0)] = \
+        grid[..., max(-dy, 0):height + min(-dy, 0), max(-dx, 0):width + min(-dx, 0)]
+    return outcome
+
+def _shift_each(grid: np.ndarray, dx, dy) -> np.ndarray:
+    # like _shift, but dx and dy hold one shift per grid of a stack (or a single one for a single grid)
+    if grid.ndim == 2:
+        return _shift(grid, int(dx), int(dy))
+    height, width = grid.shape[-2:]
+    dx, dy = np.broadcast_arrays(dx, dy)
+    # one number per shift, grids with the same shift are moved together
+    shifts = (dx + width) * (2 * height + 1) + (dy + height)
+    outcome = np.empty_like(grid)
+    for shift in np.unique(shifts):
+        same = shifts == shift
+        first = np.argmax(same)
+        outcome[same] = _shift(grid[same], int(dx[first]), int(dy[first]))
+    return outcome
+
+def _line(constraints: Constraints, grid: np.ndarray, axis) -> np.ndarray:
+    # a uniformly colored row (axis=-2) or column (axis=-1) for every grid of grid
+    shape = list(grid.shape)
+    shape[axis] = 1
+    return np.full(shape, constraints.color, dtype=np.int8)
+
+def _project(constraints: Constraints, grid: np.ndarray, factor):
+    outcome = np.repeat(np.repeat(grid, factor, axis=-2), factor, axis=-1)
+    return outcome, constraints_for(constraints, outcome)
+
+def _single_case(cases, name):
+    # a single grid handles its case like the set version, the grids of a stack were selected by the caller
+    if np.ndim(cases) != 0:
+        return APPLY
+    if cases == SKIP:
+        raise ValueError(f"{name} has no outcome on this grid")
+    return int(cases)
+
+def _has_pixels(constraints, grid):
+    # the edge moves look for the first and last pixel, like x_min and co. the set version raises on an empty object
+    return np.where((grid != EMPTY).any(axis=(-2, -1)), APPLY, SKIP)
+
+def _right_column_empty(constraints, grid):
+    # move_right of the set version keeps pixels of the last column just outside the grid
+    return np.where((grid[..., :, -1] != EMPTY).any(axis=-1), SKIP, APPLY)
+
+def _bottom_row_empty(constraints, grid):
+    return np.where((grid[..., -1, :] != EMPTY).any(axis=-1), SKIP, APPLY)
+
+def _block_colors(grid: np.ndarray, factor):
+    # color_max of the blocks of factor x factor cells in the first factor x factor blocks (the ones the set version
+    # of project_half/third/fifth looks at), EMPTY for blocks without a color other than 1
+    size = factor * factor
+    height, width = grid.shape[-2:]
+    cells = np.full(grid.shape[:-2] + (size, size), EMPTY, dtype=np.int8)
+    cells[..., :min(height, size), :min(width, size)] = grid[..., :size, :size]
+    blocks = cells.reshape(grid.shape[:-2] + (factor, factor, factor, factor))     # block row, row, block column, column
+    counts = np.stack([(blocks == color).sum(axis=(-3, -1)) for color in range(NUM_COLORS)], axis=-1)
+    counts[..., 1] = 0  # color_max never picks color 1
+    # argmax takes the first of equal counts, so ties go to the smaller color like in color_max
+    return np.where(counts.any(axis=-1), counts.argmax(axis=-1), EMPTY).astype(np.int8)
+
+def _reduce_cases(grid: np.ndarray, factor):
+    height, width = grid.shape[-2:]
+    left, right = _edges(grid, axis=-2)
+    top, bottom = _edges(grid, axis=-1)
+    has_pixels = (grid != EMPTY).any(axis=(-2, -1))
+    # the set version only reduces objects whose bounding box is a multiple of factor wide and high
+    divisible = ((right - left + 1) % factor == 0) & ((bottom - top + 1) % factor == 0)
+    # and keeps the blocks at their place, on the grid of (height // factor, width // factor)
+    outside = _block_colors(grid, factor) != EMPTY
+    outside[..., :height // factor, :width // factor] = False
+    fits = ~outside.any(axis=(-2, -1))
+    return np.where(~has_pixels, SKIP, np.where(~divisible, KEEP, np.where(fits, APPLY, SKIP)))
+
+def _reduce(constraints: Constraints, grid: np.ndarray, factor):
+    if _single_case(_reduce_cases(grid, factor), f"project with factor {factor}") == KEEP:
+        return grid, constraints
+    height, width = grid.shape[-2:]
+    outcome = np.full(grid.shape[:-2] + (height // factor, width // factor), EMPTY, dtype=np.int8)
+    rows, columns = min(factor, height // factor), min(factor, width // factor)
+    outcome[..., :rows, :columns] = _block_colors(grid, factor)[..., :rows, :columns]
+    return outcome, constraints_for(constraints, outcome)
+
+
+# mirrors on x axis
+def flip_xax(constraints, grid):
+    return grid[..., ::-1, :].copy(), constraints
+
+# mirrors on y axis
+def flip_yax(constraints, grid):
+    return grid[..., :, ::-1].copy(), constraints
+
+def move_right(constraints, grid):
+    _single_case(_right_column_empty(constraints, grid), 'move_right')
+    return _shift(grid, 1, 0), constraints
+
+def move_left(constraints, grid):
+    return _shift(grid, -1, 0), constraints
+
+def move_down(constraints, grid):
+    _single_case(_bottom_row_empty(constraints, grid), 'move_down')
+    return _shift(grid, 0, 1), constraints
+
+def move_up(constraints, grid):
+    return _shift(grid, 0, -1), constraints
+
+def move_left_edge(constraints, grid):
+    _single_case(_has_pixels(constraints, grid), 'move_left_edge')
+    first, _ = _edges(grid, axis=-2)
+    return _shift_each(grid, -first, 0), constraints
+
+def move_right_edge(constraints, grid):
+    _single_case(_has_pixels(constraints, grid), 'move_right_edge')
+    _, last = _edges(grid, axis=-2)
+    return _shift_each(grid, grid.shape[-1] - 1 - last, 0), constraints
+
+def move_up_edge(constraints, grid):
+    _single_case(_has_pixels(constraints, grid), 'move_up_edge')
+    first, _ = _edges(grid, axis=-1)
+    return _shift_each(grid, 0, -first), constraints
+
+def move_down_edge(constraints, grid):
+    _single_case(_has_pixels(constraints, grid), 'move_down_edge')
+    _, last = _edges(grid, axis=-1)
+    return _shift_each(grid, 0, grid.shape[-2] - 1 - last), constraints
+
+def project_dupliate(constraints, grid):
+    return _project(constraints, grid, 2)
+
+def project_triplicate(constraints, grid):
+    return _project(constraints, grid, 3)
+
+def project_quintuplicate(constraints, grid):
+    return _project(constraints, grid, 5)
+
+def project_half(constraints, grid):
+    return _reduce(constraints, grid, 2)
+
+def project_third(constraints, grid):
+    return _reduce(constraints, grid, 3)
+
+def project_fifth(constraints, grid):
+    return _reduce(constraints, grid, 5)
+
+def grid_add_down(constraints, grid):
+    outcome = np.concatenate([grid, _line(constraints, grid, axis=-2)], axis=-2)
+    return outcome, constraints_for(constraints, outcome)
+
+def grid_add_up(constraints, grid):
+    outcome = np.concatenate([_line(constraints, grid, axis=-2), grid], axis=-2)
+    return outcome, constraints_for(constraints, outcome)
+
+def grid_add_right(constraints, grid):
+    outcome = np.concatenate([grid, _line(constraints, grid, axis=-1)], axis=-1)
+    return outcome, constraints_for(constraints, outcome)
+
+def grid_add_left(constraints, grid):
+    outcome = np.concatenate([_line(constraints, grid, axis=-1), grid], axis=-1)
+    return outcome, constraints_for(constraints, outcome)
+
+def grid_add_up_and_down(constraints, grid):
+    line = _line(constraints, grid, axis=-2)
+    outcome = np.concatenate([line, grid, line], axis=-2)
+    return outcome, constraints_for(constraints, outcome)
+
+def grid_add_left_and_right(constraints, grid):
+    line = _line(constraints, grid, axis=-1)
+    outcome = np.concatenate([line, grid, line], axis=-1)
+    return outcome, constraints_for(constraints, outcome)
+
+def grid_duplicate_down(constraints, grid):
+    outcome = np.concatenate([grid, grid[..., -1:, :]], axis=-2)
+    return outcome, constraints_for(constraints, outcome)
+
+def grid_duplicate_up(constraints, grid):
+    outcome = np.concatenate([grid[..., :1, :], grid], axis=-2)
+    return outcome, constraints_for(constraints, outcome)
+
+def grid_duplicate_right(constraints, grid):
+    outcome = np.concatenate([grid, grid[..., :, -1:]], axis=-1)
+    return outcome, constraints_for(constraints, outcome)
+
+def grid_duplicate_left(constraints, grid):
+    outcome = np.concatenate([grid[..., :, :1], grid], axis=-1)
+    return outcome, constraints_for(constraints, outcome)
+
+def grid_duplicate_up_and_down(constraints, grid):
+    outcome = np.concatenate([grid[..., :1, :], grid, grid[..., -1:, :]], axis=-2)
+    return outcome, constraints_for(constraints, outcome)
+
+def grid_duplicate_left_and_right(constraints, grid):
+    outcome = np.concatenate([grid[..., :, :1], grid, grid[..., :, -1:]], axis=-1)
+    return outcome, constraints_for(constraints, outcome)
+
+
+# array implementations by the name of the DSL function they replace
+DSL_ARRAY_METHODS = {
+    function.__name__: function
+    for function in [
+        flip_xax,
+        flip_yax,
+        move_right,
+        move_left,
+        move_down,
+        move_up,
+        move_left_edge,
+        move_right_edge,
+        move_up_edge,
+        move_down_edge,
+        project_dupliate,
+        project_triplicate,
+        project_quintuplicate,
+        project_half,
+        project_third,
+        project_fifth,
+        grid_add_down,
+        grid_add_up,
+        grid_add_right,
+        grid_add_left,
+        grid_add_up_and_down,
+        grid_add_left_and_right,
+        grid_duplicate_down,
+        grid_duplicate_up,
+        grid_duplicate_right,
+        grid_duplicate_left,
+        grid_duplicate_up_and_down,
+        grid_duplicate_left_and_right,
+    ]
+}
+
+# cases(constraints, grid) of the operations that do not always apply, by name (see APPLY, KEEP and SKIP)
+DSL_ARRAY_CASES = {
+    'move_right': _right_column_empty,
+    'move_down': _bottom_row_empty,
+    'move_left_edge': _has_pixels,
+    'move_right_edge': _has_pixels,
+    'move_up_edge': _has_pixels,
+    'move_down_edge': _has_pixels,
+    'project_half': lambda constraints, grid: _reduce_cases(grid, 2),
+    'project_third': lambda constraints, grid: _reduce_cases(grid, 3),
+    'project_fifth': lambda constraints, grid: _reduce_cases(grid, 5),
+}
@@ -1,6 +1,7 @@
 # this file contains funcitons that can extract information from our dsl (such as features of a function)
 
 import csv
+import os
 import pprint
 import inspect
 
@@ -104,4 +105,37 @@ def confirm_overwrite():
             print('\nNo changes have been made to your dsl description.\n')
             return False
         else:
-            print("Invalid input. Please type 'yes' or 'no'.")
\ No newline at end of file
+            print("Invalid input. Please type 'yes' or 'no'.")
+
+def get_dsl_algebra():
+
+    # Reads the algebraic properties of the dsl functions from dsl_algebra.csv, which the searches use to skip programs
+    # that are equivalent to a shorter or differently ordered one
+    # ------------------------------
+    # inverse_of:           applying this function directly after inverse_of restores the object on every state the
+    #                       search can reach, e.g. flip_xax after flip_xax. move_left is not the inverse of move_right:
+    #                       move_right drops the pixels that already were one column beyond the grid, so pixels moved
+    #                       there by an earlier move_right are lost (move_up and move_down alike)
+    # idempotent:           bool, applying the function twice is the same as applying it once
+    # commutes_with:        comma separated functions that give the same outcome in either order (made symmetric below)
+    # changes_dimensions:   bool, the function can change grid_width and grid_height
+
+    path = os.path.join(os.path.dirname(__file__), 'dsl_algebra.csv')
+    result = {}
+    with open(path, mode='r', newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile, delimiter=';')
+        for row in reader:
+            result[row['function_name']] = {
+                'inverse_of': row['inverse_of'] or None,
+                'idempotent': row['idempotent'] == '1',
+                'commutes_with': set(name for name in row['commutes_with'].split(',') if name),
+                'changes_dimensions': row['changes_dimensions'] == '1',
+            }
+
+    # commuting is symmetric, the csv only has to list each pair once
+    for name, properties in result.items():
+        for other in properties['commutes_with']:
+            result.setdefault(other, {'inverse_of': None, 'idempotent': False, 'commutes_with': set(), 'changes_dimensions': False})
+            result[other]['commutes_with'].add(name)
+
+    return result
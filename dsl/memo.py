@@ -0,0 +1,90 @@
+# Memoization of DSL operators. During a search the same operator is applied to the same object many times: on
+# different branches that reach the same intermediate object and on training pairs that share an object. An
+# OperatorCache remembers the outcome of (operator, object, constraints) so those calls are served from memory.
+#
+#   cache = OperatorCache()
+#   operators = cache.wrap_all(DSL_METHODS)    # drop-in replacements, same names and signatures
+#   ...
+#   print(cache.stats())
+#
+# Cached outcomes are shared between all callers, which is fine as long as nobody modifies an outcome in place
+# (the DSL operators never modify their inputs, see dsl/dsl.py).
+
+import functools
+from collections import OrderedDict
+
+from dsl.dsl import Constraints, Object
+
+
+class OperatorCache:
+    def __init__(self, max_entries=100_000, max_pixels=2_000_000):
+        """
+        Least recently used cache for operator outcomes.
+
+        Args:
+            max_entries: Maximum number of cached calls.
+            max_pixels: Maximum number of pixels held by the cache (input and outcome of every call), so a few
+                calls on full 30x30 grids cannot take up the memory of thousands of calls on small objects.
+        """
+        self.max_entries = max_entries
+        self.max_pixels = max_pixels
+        self.entries = OrderedDict()  # key -> (outcome, constraints, pixels)
+        self.pixels = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def call(self, operator, constraints: Constraints, object: Object):
+        key = (operator, frozenset(object), constraints)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[0], entry[1]
+
+        self.misses += 1
+        # exceptions (operators that cannot be applied) are not cached and reach the caller as before
+        outcome, new_constraints = operator(constraints, object)
+        pixels = len(object) + len(outcome)
+        if pixels <= self.max_pixels:
+            self.entries[key] = (outcome, new_constraints, pixels)
+            self.pixels += pixels
+            self.evict()
+        return outcome, new_constraints
+
+    def evict(self):
+        # drop the least recently used calls until the cache is within its limits again
+        while len(self.entries) > self.max_entries or self.pixels > self.max_pixels:
+            _, (_, _, pixels) = self.entries.popitem(last=False)
+            self.pixels -= pixels
+            self.evictions += 1
+
+    def wrap(self, operator):
+        # operator with the same name and signature that goes through the cache
+        @functools.wraps(operator)
+        def memoized_operator(constraints, object):
+            return self.call(operator, constraints, object)
+        return memoized_operator
+
+    def wrap_all(self, operators):
+        return [self.wrap(operator) for operator in operators]
+
+    def clear(self):
+        self.entries.clear()
+        self.pixels = 0
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'pixels': self.pixels,
+        }
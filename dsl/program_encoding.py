@@ -0,0 +1,84 @@
+# Compact programs. During a search a program is a tuple of small integers that index into an OperatorTable, a frozen
+# list of the operators of that search. Extending a tuple of ints is cheap, it can be hashed (e.g. as a dictionary key
+# or in a set) and sent to other processes, and only when a program is executed or returned it is decoded back to the
+# DSL functions.
+#
+#   table = OperatorTable(DSL_OBJECT_MOVE_METHODS)
+#   codes = table.encode([move_right, move_down])    # (4, 0)
+#   program = table.decode(codes)                     # [move_right, move_down]
+#   text = dumps(program)                             # 'move_right move_down'
+#   program = loads(text, table)
+#
+# Serialized programs hold the operator names instead of the codes, so they stay valid when the operator lists change
+# between runs, and they can be stored (save_programs/load_programs) and diffed as text.
+
+import json
+from typing import Callable, Dict, List, Sequence, Tuple
+
+Program = List[Callable]
+Codes = Tuple[int, ...]
+
+
+class OperatorTable:
+    def __init__(self, operators: Sequence[Callable]):
+        """
+        Frozen table of the operators programs are built from.
+
+        Args:
+            operators: The DSL functions (or OperatorCache wrappers of them, which keep the names). The position of
+                an operator in this list is its code, the names have to be unique.
+        """
+        self.operators = tuple(operators)
+        self.codes = {operator.__name__: code for code, operator in enumerate(self.operators)}
+        if len(self.codes) != len(self.operators):
+            raise ValueError("The operators of an OperatorTable need unique names")
+
+    def __len__(self):
+        return len(self.operators)
+
+    def __getitem__(self, code) -> Callable:
+        return self.operators[code]
+
+    def code(self, operator) -> int:
+        # operator can be the function or its name
+        return self.codes[operator if isinstance(operator, str) else operator.__name__]
+
+    def encode(self, program: Sequence[Callable]) -> Codes:
+        return tuple(self.code(operator) for operator in program)
+
+    def decode(self, codes: Sequence[int]) -> Program:
+        return [self.operators[code] for code in codes]
+
+    def pack(self, codes: Sequence[int]) -> int:
+        # the whole program as a single int: code + 1 is a digit in base len(table) + 1 (0 would make leading
+        # operators disappear)
+        packed = 0
+        for code in codes:
+            packed = packed * (len(self.operators) + 1) + code + 1
+        return packed
+
+    def unpack(self, packed: int) -> Codes:
+        codes = []
+        while packed:
+            packed, digit = divmod(packed, len(self.operators) + 1)
+            codes.append(digit - 1)
+        return tuple(reversed(codes))
+
+
+# Serializer
+def dumps(program: Sequence[Callable]) -> str:
+    # operator names separated by spaces, the empty program is the empty string
+    return ' '.join(operator.__name__ for operator in program)
+
+def loads(text: str, table: OperatorTable) -> Program:
+    # raises KeyError for an operator that is not in the table
+    return table.decode(table.code(name) for name in text.split())
+
+def save_programs(path, programs: Dict[str, Sequence[Callable]]):
+    # programs by a key of the caller (e.g. the task id), one per line so two files can be diffed
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({key: dumps(program) for key, program in programs.items()}, file, indent=0, sort_keys=True)
+
+def load_programs(path, table: OperatorTable) -> Dict[str, Program]:
+    with open(path, mode='r', encoding='utf-8') as file:
+        return {key: loads(text, table) for key, text in json.load(file).items()}
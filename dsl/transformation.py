@@ -9,30 +9,23 @@ from arckit_handler.arckit_handler import drawGrid, getGrid
 
 def convert_grid_format(grid):
 
-    # empty Object
-    object = []
+    # the dsl uses sets of touples (x, y, color), one per pixel that is not None. We collect them with numpy instead of looping over every pixel
+    grid = np.asarray(grid, dtype=object)
+    row_index, column_index = np.nonzero(grid != None)
+    formatted_grid = set(zip(column_index.tolist(), row_index.tolist(), grid[row_index, column_index].tolist()))
 
-    for row_index, row in enumerate(grid):
-        for column_index, column in enumerate(row):
-            if not column is None:
-                object.append([column_index, row_index, column])
-
-    # the above creates a list of lists. The dsl though uses sets of touples. Since we are typing, this is an important distiction! Thus, we convert to a set of touples
-    object = {tuple(pixel) for pixel in object}
-
-    return object
+    return formatted_grid
 
 
 def reconvert_grid_format(formatted_grid, grid_width, grid_height):
     
-    # Create an empty grid (numpy array; empty here means filled with 0, which is the bg color in most cases.) with the specified dimensions
-    grid = np.array([[None for _ in range(grid_width)] for _ in range(grid_height)]).astype(object)
-
+    # Create an empty grid (numpy array; empty here means filled with None, which add_bg turns into the bg color 0) with the specified dimensions
+    grid = np.full((grid_height, grid_width), None, dtype=object)
 
-    # Iterate over the formatted grid and place the values back into the correct positions
-    for item in formatted_grid:
-        column_index, row_index, color = item
-        grid[row_index][column_index] = color
+    # place all pixels of the formatted grid back into their positions at once
+    if formatted_grid:
+        column_index, row_index, color = zip(*formatted_grid)
+        grid[list(row_index), list(column_index)] = list(color)
 
     return grid
 
@@ -161,7 +154,7 @@ def apply_transformation(grid, grid_name, transformation_name, terminal_visualiz
     formatted_grid = convert_grid_format(grid)
 
     # appy transformation with the specified constraints
-    transgrid = transformation(constraints, formatted_grid)
+    transgrid, constraints = transformation(constraints, formatted_grid)
     transgrid = reconvert_grid_format(transgrid, grid_width = constraints.grid_width, grid_height = constraints.grid_height)
 
 
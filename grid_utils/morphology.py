@@ -0,0 +1,61 @@
+# Morphology on binary grids, shared by the DSL (dsl/dsl.py) and the knowledge graph (knowledge_graph/). It only
+# needs NumPy and SciPy, so importing it does not pull in the knowledge graph dependencies (arckit, kuzu).
+
+from enum import Enum
+
+import numpy as np
+from scipy.ndimage import binary_fill_holes
+
+class StructuringElementMode(Enum):
+    """
+    An enumeration to represent different modes of structuring elements used in image processing.
+
+    Attributes:
+    -----------
+    DIRECT : Enum
+        Represents a direct (cross-shaped) structuring element.
+    DIAGONAL : Enum
+        Represents a diagonal (X-shaped) structuring element.
+    EIGHT_WAY : Enum
+        Represents an 8-way (3x3 all ones) structuring element.
+
+    Methods:
+    --------
+    get_structuring_element():
+        Returns the corresponding structuring element as a numpy array based on the mode.
+        Raises a ValueError if the mode is unknown.
+    """
+    DIRECT = "direct"
+    DIAGONAL = "diagonal"
+    EIGHT_WAY = "8-way"
+
+    def get_structuring_element(self):
+        if self == StructuringElementMode.DIRECT:
+            return np.array([[0, 1, 0],
+                             [1, 1, 1],
+                             [0, 1, 0]], dtype=bool)
+        elif self == StructuringElementMode.DIAGONAL:
+            return np.array([[1, 0, 1],
+                             [0, 0, 0],
+                             [1, 0, 1]], dtype=bool)
+        elif self == StructuringElementMode.EIGHT_WAY:
+            return np.ones((3, 3), dtype=bool)
+        else:
+            raise ValueError(f"Unknown mode='{self.value}'. Must be \"direct\", \"diagonal\", or \"8-way\".")
+
+def find_enclosed_regions(mask, mode="direct"):
+    """
+    Finds the cells that are not part of a binary mask but are completely enclosed by it (holes of any size).
+
+    Parameters:
+    mask (np.ndarray): A 2D boolean array, True where the object is.
+    mode (str): How background cells connect to each other, see StructuringElementMode. With "direct", a hole
+        that only touches the outside diagonally still counts as enclosed.
+
+    Returns:
+    np.ndarray: A 2D boolean array, True for the cells inside the holes.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    structure = StructuringElementMode(mode).get_structuring_element()
+    # Flood-fill the background from the border; whatever the fill cannot reach is enclosed by the mask
+    return binary_fill_holes(mask, structure=structure) & ~mask
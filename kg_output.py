@@ -14,7 +14,7 @@ def get_example_object_mappings(task, db_manager, example_id):
 
 
     
-    shared_properties = db_manager.get_shared_properties(example_id=example_id +1, batch_size=50) #@Paul @Lucrezia: Did you start counting the examples from one instead of 0? it looks like it
+    shared_properties = db_manager.get_shared_properties(example_id=example_id +1) #@Paul @Lucrezia: Did you start counting the examples from one instead of 0? it looks like it
     # print("Total rows in shared_properties:", len(shared_properties))
 
 
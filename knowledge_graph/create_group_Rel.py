@@ -8,6 +8,10 @@
 # Match persisting shapes.
 
 
+from collections import Counter
+
+from knowledge_graph.create_obj_Rel import scale_factors, upscale, hashable_shape
+
 ### TODO: implement if required
 def group_same_size():
     pass
@@ -18,5 +22,24 @@ def group_same_color():
 def group_sub_group():
     pass
 
-def group_is_scaled():
-    pass 
\ No newline at end of file
+def group_is_scaled(shapes1, shapes2):
+    """
+    Checks if the objects of one group are the objects of another group scaled up by the same factors.
+
+    Parameters:
+    shapes1, shapes2 (List[np.ndarray]): The binary shapes of the objects of the two groups.
+
+    Returns:
+    Tuple[int, int]: (row_factor, col_factor) such that upscaling every shape of shapes1 gives exactly the shapes of
+        shapes2 (as a multiset), or None if there are no such factors.
+    """
+    if len(shapes1) != len(shapes2) or not shapes1:
+        return None
+    targets = Counter(hashable_shape(shape) for shape in shapes2)
+
+    # the first shape of shapes2 has to be the upscaled version of one of shapes1, which leaves few candidate factors
+    candidates = set(scale_factors(shape, shapes2[0]) for shape in shapes1)
+    for factors in sorted(candidates - {None}):
+        if Counter(hashable_shape(upscale(shape, *factors)) for shape in shapes1) == targets:
+            return factors
+    return None 
\ No newline at end of file
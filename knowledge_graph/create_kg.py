@@ -1,8 +1,7 @@
-from knowledge_graph.kuzu_db_manager import KuzuDBManager
-from knowledge_graph.create_obj import label_components, get_unique_labels
-from knowledge_graph.create_obj_groups import to_hashable_shape, is_rotation
-from knowledge_graph.create_obj_Rel import get_object_adjacency
-from knowledge_graph.utils import remove_folder_if_exists
+from knowledge_graph.kuzu_db_manager import KuzuDBManager, IN_MEMORY
+from knowledge_graph.create_obj import label_components_with_stats, extract_object_records, number_of_holes
+from knowledge_graph.create_obj_groups import shape_key, rotation_shape_key, canonical_shape_key, scaled_shape_key
+from knowledge_graph.create_obj_Rel import get_object_adjacency, adjacency_matrix
 
 from typing import List, Tuple, Optional
 from arckit import Task
@@ -10,11 +9,12 @@ from arckit import Task
 import matplotlib.pyplot as plt
 import numpy as np
 import networkx as nx
+from scipy.sparse.csgraph import connected_components
 
-def create_knowledge_graph(task: Task) -> KuzuDBManager:
-    db_folder = "kuzudb"
-    remove_folder_if_exists(db_folder)
-    db_manager = KuzuDBManager(db_folder)
+def create_knowledge_graph(task: Task, in_memory: bool = True) -> KuzuDBManager:
+    # Every task gets its own database (in memory, or in a unique temporary folder that is cleaned up automatically),
+    # so graphs of different tasks can be built at the same time, e.g. in the worker processes of main.py
+    db_manager = KuzuDBManager(IN_MEMORY if in_memory else None)
     db_manager.create_schema()
     kg_builder = KnowledgeGraphBuilder(db_manager)
     return kg_builder.build_knowledge_graph(task)
@@ -64,35 +64,30 @@ class KnowledgeGraphBuilder:
         Returns:
         List[dict]: A list of dictionaries representing the object-level nodes.
         """
-        labeled_grid = label_components(grid, example_id)
-        component_labels = get_unique_labels(labeled_grid)
+        labeled_grid, component_labels, bboxes, counts = label_components_with_stats(grid, example_id)
         adjacency = get_object_adjacency(labeled_grid)
 
+        # bbox, shape and color of all objects in one sweep, see extract_object_records
+        records = extract_object_records(labeled_grid, component_labels, bboxes, counts)
+
         nodes = []
-        for label in component_labels:
-            # Create a mask for the current label
-            mask = (labeled_grid == label)
-            
-            # Find the bounding box coordinates
-            bbox_x, bbox_y = np.where(mask)
-            bbox_height  = bbox_x.max() - bbox_x.min() + 1  # Note that this looks weird but bc of the problem format the axes have been swapped
-            bbox_width = bbox_y.max() - bbox_y.min() + 1    # Numpy dimensions are row then column
-            
-            # Extract the subarray corresponding to the bounding box
-            bbox = mask[bbox_x.min():bbox_x.max() + 1, bbox_y.min():bbox_y.max() + 1]
-    
-            # Convert to binary representation to represent shape
-            binary_shape = bbox.astype(int)
+        for record in records:
             nodes.append({
-                'id': int(label),
+                'id': int(record['id']),
                 'example_id': example_id,
-                'color': int(str(label)[1]),
-                'shape': binary_shape,
-                'bbox_x': int(bbox_x.min()),
-                'bbox_y': int(bbox_y.min()),
-                'bbox_width': int(bbox_width),
-                'bbox_height': int(bbox_height),
-                'adjacency' : list( int(neighbour) for neighbour in adjacency[label]),
+                'color': int(record['color']),
+                'shape': record['shape'],
+                'bbox_x': int(record['bbox_x']),
+                'bbox_y': int(record['bbox_y']),
+                'bbox_width': int(record['bbox_width']),
+                'bbox_height': int(record['bbox_height']),
+                'holes': int(number_of_holes(record['shape'])),
+                # keys of the shape up to nothing, rotation, rotation and flip, and scale (see create_obj_groups.py)
+                'shape_key': shape_key(record['shape']),
+                'rotation_shape_key': rotation_shape_key(record['shape']),
+                'canonical_shape_key': canonical_shape_key(record['shape']),
+                'scaled_shape_key': scaled_shape_key(record['shape']),
+                'adjacency' : list( int(neighbour) for neighbour in adjacency[record['id']]),
             })
         return nodes
        
@@ -107,87 +102,49 @@ class KnowledgeGraphBuilder:
             color_groups[color].add(label)
         return list(list(group) for group in color_groups.values())
     
-    def create_shape_groups(self, object_nodes: List[dict]) -> List[set]:
-        shape_groups = {}
+    def group_by_key(self, object_nodes: List[dict], key, distinct_key=None) -> List[list]:
+        # Objects with the same key form a group, in one pass over the objects. With distinct_key, only groups in
+        # which at least two objects differ in distinct_key are kept (e.g. a rotation group needs two different shapes)
+        groups = {}
         for node in object_nodes:
-            label = node['id']
-            shape = node['shape']
-            shape_key = to_hashable_shape(shape)
-        
-            if shape_key not in shape_groups:
-                shape_groups[shape_key] = set()
-            shape_groups[shape_key].add(label)
-        
-        return list(list(group) for group in shape_groups.values())
-    
-    def create_shape_color_groups(self, object_nodes: List[dict]) -> List[set]:
-        shape_color_groups = {}
-        for node in object_nodes:
-            label = node['id']
-            shape = node['shape']
-            color = node['color']
-
-            shape_key = to_hashable_shape(shape)
-            group_key = (shape_key, color)
+            groups.setdefault(key(node), []).append(node)
 
-            if group_key not in shape_color_groups:
-                shape_color_groups[group_key] = set()
-            shape_color_groups[group_key].add(label)
+        return [[node['id'] for node in group] for group in groups.values()
+                if distinct_key is None or len(set(distinct_key(node) for node in group)) >= 2]
 
-        return list(list(group) for group in shape_color_groups.values())
+    def create_shape_groups(self, object_nodes: List[dict]) -> List[set]:
+        return self.group_by_key(object_nodes, key=lambda node: node['shape_key'])
+    
+    def create_shape_color_groups(self, object_nodes: List[dict]) -> List[set]:
+        return self.group_by_key(object_nodes, key=lambda node: (node['shape_key'], node['color']))
     
     def create_rotation_groups(self, object_nodes: List[dict]) -> List[set]:
-        visited = set()
-        rotation_groups = dict()
-        
-        for node in object_nodes:
-            label = node['id']
-            shape = node['shape']
-            
-            if label in visited:
-                continue
-            else:
-                visited.add(label)
-
-                # Initialize a new group for shapes that rotate into this one
-                rotation_set = {label}
-
-                for other_node in object_nodes:
-                    other_label = other_node['id']
-                    other_shape = other_node['shape']
-
-                    if other_label not in visited:
-                        if is_rotation(shape, other_shape):
-                            rotation_set.add(other_label)
-                            visited.add(other_label)
-                
-                if len(rotation_set) >= 2:
-                    rotation_groups[label] = list(rotation_set)
-        
-        return list(rotation_groups.values())
+        # objects whose shapes are rotations of each other, at least two of them rotated differently
+        return self.group_by_key(object_nodes, key=lambda node: node['rotation_shape_key'],
+                                 distinct_key=lambda node: node['shape_key'])
+
+    def create_flip_groups(self, object_nodes: List[dict]) -> List[set]:
+        # objects whose shapes are rotations or flips of each other, at least two of them are flipped (not only rotated)
+        return self.group_by_key(object_nodes, key=lambda node: node['canonical_shape_key'],
+                                 distinct_key=lambda node: node['rotation_shape_key'])
+
+    def create_scaled_groups(self, object_nodes: List[dict]) -> List[set]:
+        # objects whose shapes are scaled versions of each other, at least two of them at different scales
+        return self.group_by_key(object_nodes, key=lambda node: node['scaled_shape_key'],
+                                 distinct_key=lambda node: node['shape_key'])
 
     def create_composite_objects_groups(self, object_nodes: List[dict]) -> List[set]:
-        node_adjacency = {node['id']: node['adjacency'] for node in object_nodes}
-
-        visited = set()
-        composite_groups = {} 
-
-        def dfs(start_label, component):
-            stack = [start_label]
-            while stack:
-                label = stack.pop()
-                for neighbor in node_adjacency[label]:
-                    if neighbor not in visited:
-                        visited.add(neighbor)
-                        component.add(neighbor)
-                        stack.append(neighbor)
-
-        for label in sorted(node_adjacency.keys()):
-            if label not in visited:
-                visited.add(label)
-                new_group = {label}
-                dfs(label, new_group)
-                composite_groups[label] = list(new_group)
+        # Objects that touch each other (directly or through other objects) form a group: the connected components
+        # of the sparse adjacency matrix
+        labels = np.array(sorted(node['id'] for node in object_nodes), dtype=int)
+        pairs = np.array([(node['id'], neighbour) for node in object_nodes for neighbour in node['adjacency']],
+                         dtype=int).reshape(-1, 2)
+        _, component_of = connected_components(adjacency_matrix(labels, pairs), directed=False)
+
+        # components are numbered in the order of their smallest label
+        composite_groups = {}
+        for label, component in zip(labels, component_of):
+            composite_groups.setdefault(component, []).append(int(label))
 
         return list(composite_groups.values())
 
@@ -206,12 +163,16 @@ class KnowledgeGraphBuilder:
         shape_groups = self.create_shape_groups(object_nodes)
         shape_color_groups = self.create_shape_color_groups(object_nodes)
         rotation_groups = self.create_rotation_groups(object_nodes)
+        flip_groups = self.create_flip_groups(object_nodes)
+        scaled_groups = self.create_scaled_groups(object_nodes)
         composite_object_group = self.create_composite_objects_groups(object_nodes)
 
         groups_by_type = [('color', color_groups),
                   ('shape', shape_groups),
                   ('shape_color', shape_color_groups),
                   ('rotation', rotation_groups),
+                  ('flip', flip_groups),
+                  ('scaled', scaled_groups),
                   ('composite_object', composite_object_group)]
         
         nodes = []
@@ -232,6 +193,28 @@ class KnowledgeGraphBuilder:
 
         return group_objects_mapping, nodes
 
+    def insert_example(self, input_grid: np.ndarray, output_grid: np.ndarray, example_id: int):
+        """
+        Extracts the objects and groups of one input/output pair and inserts them into the database. Every kind of
+        node and edge is inserted with a single statement.
+        """
+        # Extract object-level nodes
+        input_objects = self.extract_objects(input_grid, example_id)
+        output_objects = self.extract_objects(output_grid, example_id)
+
+        # Create group-level nodes
+        input_group_object_mapping, input_groups = self.extract_groups(input_objects, example_id)
+        output_group_object_mapping, output_groups = self.extract_groups(output_objects, example_id)
+
+        self.db_manager.insert_input_objects(input_objects)
+        self.db_manager.insert_output_objects(output_objects)
+        self.db_manager.insert_input_groups(input_groups)
+        self.db_manager.insert_output_groups(output_groups)
+
+        # Insert contains relations
+        self.db_manager.insert_input_contains_relationships(input_group_object_mapping)
+        self.db_manager.insert_output_contains_relationships(output_group_object_mapping)
+
     def build_knowledge_graph(self, task: Task) -> KuzuDBManager:
         """
         Creates a knowledge graph from the given task.
@@ -245,66 +228,13 @@ class KnowledgeGraphBuilder:
         for example_id, (input_grid, output_grid) in enumerate(task.train):
             # Increment to start example_id by 1
             example_id = example_id + 1 
-
-            # Extract and insert object-level nodes
-            input_objects = self.extract_objects(input_grid, example_id)
-            output_objects = self.extract_objects(output_grid, example_id)
-            for obj in input_objects:
-                self.db_manager.insert_input_object(**obj)
-            for obj in output_objects:
-                self.db_manager.insert_output_object(**obj)
-
-            # Create and insert group-level nodes
-            input_group_object_mapping, input_groups = self.extract_groups(input_objects, example_id)
-            output_group_object_mapping, output_groups = self.extract_groups(output_objects, example_id)
-            for group in input_groups:
-                self.db_manager.insert_input_group(**group)
-            for group in output_groups:
-                self.db_manager.insert_output_group(**group)
-
-             # Insert contains relations
-            for group_id, objects in input_group_object_mapping:
-                for object_id in objects:
-                    self.db_manager.insert_input_contains_relationship(group_id, object_id)
-            
-            for group_id, objects in output_group_object_mapping:
-                for object_id in objects:
-                    self.db_manager.insert_output_contains_relationship(group_id, object_id)
-
-            # TODO: Extend to add task.test to the knowledge graph so we can make predictions
+            self.insert_example(input_grid, output_grid, example_id)
         
         test_example_id = 9  # Use a unique identifier to differentiate test cases
 
         if task.test:
+            # The test output grid is processed as an **extra output grid**
             test_input_grid, test_output_grid = task.test[0]  
-
-            test_input_objects = self.extract_objects(test_input_grid, test_example_id)
-            for obj in test_input_objects:
-                self.db_manager.insert_input_object(**obj)
-
-            # Create and insert group-level nodes 
-            test_input_group_object_mapping, test_input_groups = self.extract_groups(test_input_objects, test_example_id)
-            for group in test_input_groups:
-                self.db_manager.insert_input_group(**group)
-
-            # Insert contains relations for test input groups
-            for group_id, objects in test_input_group_object_mapping:
-                for object_id in objects:
-                    self.db_manager.insert_input_contains_relationship(group_id, object_id)
-
-            # Now, process the test output grid as an **extra output grid**
-            test_output_objects = self.extract_objects(test_output_grid, test_example_id)
-            for obj in test_output_objects:
-                self.db_manager.insert_output_object(**obj)
-
-            # Create and insert group-level nodes for the test output grid
-            test_output_group_object_mapping, test_output_groups = self.extract_groups(test_output_objects, test_example_id)
-            for group in test_output_groups:
-                self.db_manager.insert_output_group(**group)
-
-            # Insert contains relations for test output groups
-            for group_id, objects in test_output_group_object_mapping:
-                for object_id in objects:
-                    self.db_manager.insert_output_contains_relationship(group_id, object_id)
+            self.insert_example(test_input_grid, test_output_grid, test_example_id)
 
         return self.db_manager
\ No newline at end of file
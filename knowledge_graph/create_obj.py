@@ -1,41 +1,64 @@
-from knowledge_graph.utils import StructuringElementMode
+from grid_utils.morphology import StructuringElementMode, find_enclosed_regions
 
 import numpy as np
-from scipy.ndimage import label, binary_fill_holes
+from scipy.ndimage import label, binary_fill_holes, find_objects
 from scipy.ndimage import binary_dilation
 
-def label_components(grid, example_id, mode="direct"):          # formerly called label_by_color
-     # Convert mode to StructuringElementMode enum
+def label_components_with_stats(grid, example_id, mode="direct"):
+    """
+    Labels the connected components of every color (except the background 0) in a single call of scipy's label.
+
+    The grid is split into one binary layer per color, and the layers are labeled together with a structuring element
+    that does not connect neighbouring layers. label numbers the components layer by layer in raster order, which is
+    the color_value, comp_id order of the final labels, so the final label of every component comes from a lookup
+    table instead of a full-grid mask per component.
+
+    Parameters:
+    grid (np.ndarray): A 2D numpy array of colors.
+    example_id (int): Example the grid belongs to, the first digit of the labels.
+    mode (str): How the pixels of a component connect, see StructuringElementMode.
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray, List[Tuple[slice, slice]], np.ndarray]: The labeled grid with the labels
+        example_id * 10_000 + color_value * 1000 + comp_id (0 for the background), the labels in ascending order, the
+        bounding box of every label as (row slice, column slice) and the number of pixels of every label.
+    """
+    # Convert mode to StructuringElementMode enum
     try:
         mode_enum = StructuringElementMode(mode)
     except ValueError:
         raise ValueError(f"Unknown mode='{mode}'. Must be 'direct', 'diagonal', or '8-way'.")
 
-    structure = mode_enum.get_structuring_element()
-    
-    # Find all unique colors 
-    unique_colors = np.unique(grid)
-    
-    # Initialize output
-    out = np.zeros_like(grid, dtype=int)
-    
-    for color_value in unique_colors:
-        # Create a binary mask for this particular color
-        if color_value == 0:
-            continue
-        
-        mask = (grid == color_value)
-        
-        # Label the connected components *within* this mask
-        # labeled_mask will have values in [0, 1, 2, ..., n_components]
-        labeled_mask, n_components = label(mask, structure=structure)
-        # 0 means "not in the mask" or background, 1...n_components are distinct objects.
-        
-        # Assign final labels:example_id * 10_000 color_value * 1000 + component_id; upper bound is 900 (30x30) objects in a grid
-        for comp_id in range(1, n_components + 1):
-            out[labeled_mask == comp_id] = + (10_000 * example_id) + (color_value * 1000) + comp_id
-
-    return out
+    grid = np.asarray(grid)
+    colors = np.unique(grid)
+    colors = colors[colors != 0]
+    if colors.size == 0:
+        return np.zeros_like(grid, dtype=int), np.zeros(0, dtype=int), [], np.zeros(0, dtype=int)
+
+    # One binary layer per color, the structure only connects pixels within a layer
+    layers = grid[np.newaxis] == colors[:, np.newaxis, np.newaxis]
+    structure = np.zeros((3, 3, 3), dtype=bool)
+    structure[1] = mode_enum.get_structuring_element()
+    labeled_layers, n_components = label(layers, structure=structure)
+
+    # The color of every component and its number among the components of that color
+    slices = find_objects(labeled_layers)
+    component_colors = np.array([colors[layer_slice.start] for layer_slice, _, _ in slices])
+    first_of_color = np.searchsorted(component_colors, component_colors)  # components are sorted by color
+    comp_ids = np.arange(n_components) - first_of_color + 1
+
+    # Assign final labels: example_id * 10_000 + color_value * 1000 + component_id; upper bound is 900 (30x30) objects in a grid
+    lookup = np.zeros(n_components + 1, dtype=int)
+    lookup[1:] = (10_000 * example_id) + (component_colors * 1000) + comp_ids
+
+    # every pixel is in at most one layer, so the maximum over the layers is its component (or 0)
+    out = lookup[labeled_layers.max(axis=0)]
+    counts = np.bincount(labeled_layers.ravel(), minlength=n_components + 1)[1:]
+    bboxes = [(rows, cols) for _, rows, cols in slices]
+    return out, lookup[1:], bboxes, counts
+
+def label_components(grid, example_id, mode="direct"):          # formerly called label_by_color
+    return label_components_with_stats(grid, example_id, mode)[0]
 
 def get_unique_labels(labeled_array, exclude_zero=True):
     unique_vals = np.unique(labeled_array)
@@ -44,53 +67,90 @@ def get_unique_labels(labeled_array, exclude_zero=True):
     return unique_vals
 
 def label_coordinates_dict(labeled_array, exclude_zero=True):
-    unique_labels = np.unique(labeled_array)
-    
-    if exclude_zero:
-        unique_labels = unique_labels[unique_labels != 0]
-    
+    # Sort the cells by label once (stable, so every label keeps its cells in row-major order) and cut the sorted
+    # cells into one run per label, instead of comparing the whole array with every label
+    flat = np.asarray(labeled_array).ravel()
+    order = np.argsort(flat, kind='stable')
+    unique_labels, starts = np.unique(flat[order], return_index=True)
+    rows, cols = np.unravel_index(order, np.shape(labeled_array))
+
     # Build the dictionary
     label_coords = {}
-    for lbl in unique_labels:
-        # Rows and cols where labeled_array == lbl
-        rows, cols = np.where(labeled_array == lbl)
+    for lbl, start, stop in zip(unique_labels, starts, list(starts[1:]) + [flat.size]):
+        if exclude_zero and lbl == 0:
+            continue
         # Combine them into (row, col) tuples
-        coords = list(zip(rows, cols))
-        label_coords[lbl] = coords
-    
+        label_coords[lbl] = list(zip(rows[start:stop], cols[start:stop]))
+
     return label_coords
 
 def get_quadrant(labeled_array): #Or other orientation to maybe use in group building process
     pass
 
-def extract_object_shapes(grid):
+# One record per object of a labeled grid. bbox_x/bbox_y are the first row/column of the bounding box (the axes are
+# swapped because of the problem format), the centroid is in grid coordinates and shape is the binary shape inside
+# the bounding box (an int array, so the field holds Python objects)
+OBJECT_RECORD_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('color', np.int64),
+    ('bbox_x', np.int64),
+    ('bbox_y', np.int64),
+    ('bbox_width', np.int64),
+    ('bbox_height', np.int64),
+    ('pixel_count', np.int64),
+    ('centroid_row', np.float64),
+    ('centroid_col', np.float64),
+    ('shape', object),
+])
 
-    # Get unique labels excluding 0 (background)
-    unique_labels = np.unique(grid)
-    unique_labels = unique_labels[unique_labels != 0]
-    
-    object_shapes = {}
-    
-    for label in unique_labels:
-        # Find the coordinates of the object
-        coords = np.argwhere(grid == label)
-        if coords.size == 0:
-            continue
-        
-        # Get the bounding box of the object
-        min_row, min_col = coords.min(axis=0)
-        max_row, max_col = coords.max(axis=0)
-        
-        # Extract the submatrix for the object
-        submatrix = grid[min_row:max_row + 1, min_col:max_col + 1]
-        
-        # Create a binary representation of the object's shape
-        binary_shape = (submatrix == label).astype(int)
-        
-        # Store the binary shape in the dictionary
-        object_shapes[label] = binary_shape
-    
-    return object_shapes
+def extract_object_records(labeled_grid, labels=None, bboxes=None, counts=None):
+    """
+    Extracts all objects of a labeled grid in one sweep.
+
+    Parameters:
+    labeled_grid (np.ndarray): A 2D array of labels as made by label_components, 0 is the background.
+    labels, bboxes, counts: Optionally the other results of label_components_with_stats for this grid, so they are
+        not computed again.
+
+    Returns:
+    np.ndarray: A structured array with dtype OBJECT_RECORD_DTYPE, one record per label in ascending order.
+    """
+    labeled_grid = np.asarray(labeled_grid)
+    occupied = labeled_grid != 0
+    if labels is None:
+        labels = np.unique(labeled_grid[occupied])
+    records = np.zeros(len(labels), dtype=OBJECT_RECORD_DTYPE)
+    if len(labels) == 0:
+        return records
+
+    # Number the labels 1..n, so find_objects and bincount only need n entries and not one per possible label
+    compact = np.zeros(labeled_grid.shape, dtype=int)
+    compact[occupied] = np.searchsorted(labels, labeled_grid[occupied]) + 1
+    if bboxes is None:
+        bboxes = find_objects(compact)
+    flat = compact.ravel()
+    if counts is None:
+        counts = np.bincount(flat, minlength=len(labels) + 1)[1:]
+    rows, cols = np.indices(labeled_grid.shape)
+
+    records['id'] = labels
+    records['color'] = (np.asarray(labels) // 1000) % 10
+    records['bbox_x'] = [rows_slice.start for rows_slice, _ in bboxes]
+    records['bbox_y'] = [cols_slice.start for _, cols_slice in bboxes]
+    records['bbox_height'] = [rows_slice.stop - rows_slice.start for rows_slice, _ in bboxes]
+    records['bbox_width'] = [cols_slice.stop - cols_slice.start for _, cols_slice in bboxes]
+    records['pixel_count'] = counts
+    records['centroid_row'] = np.bincount(flat, weights=rows.ravel(), minlength=len(labels) + 1)[1:] / counts
+    records['centroid_col'] = np.bincount(flat, weights=cols.ravel(), minlength=len(labels) + 1)[1:] / counts
+    for index, (rows_slice, cols_slice) in enumerate(bboxes):
+        # only the cells inside the bounding box are compared with the label
+        records['shape'][index] = (compact[rows_slice, cols_slice] == index + 1).astype(int)
+    return records
+
+def extract_object_shapes(grid):
+    # Binary shape of every object of a labeled grid, by label
+    records = extract_object_records(grid)
+    return dict(zip(records['id'], records['shape']))
 
 # Functions to find features on objects shapes:
 
@@ -113,5 +173,10 @@ def find_centroid(object_shape): # Finds the "center of mass"
     return (r_mean, c_mean)
 
 def find_holes(object_shape):
-    #We use flood-first algo to find holes
-    pass
\ No newline at end of file
+    # We flood-fill the background around the shape; the cells the fill cannot reach are holes (of any size)
+    return find_enclosed_regions(object_shape == 1).astype(int)
+
+def number_of_holes(object_shape):
+    # Separate holes are counted once each, however many pixels they have
+    _, n_holes = label(find_holes(object_shape))
+    return n_holes
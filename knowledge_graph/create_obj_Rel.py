@@ -1,10 +1,27 @@
 from knowledge_graph.create_obj import *
-from knowledge_graph.utils import StructuringElementMode
+from grid_utils.morphology import StructuringElementMode
+
+import functools
 
 from scipy.ndimage import binary_dilation
+from scipy.sparse import csr_matrix
 import numpy as np 
 
-def get_object_adjacency(labeled_array, mode="8-way"):
+def get_adjacent_label_pairs(labeled_array, mode="8-way"):
+    """
+    Finds all pairs of labels that touch, in one pass over the grid.
+
+    For every offset of the structuring element the label image is compared with a copy of itself shifted by that
+    offset, and the cells where two different labels meet give a pair. The elements are symmetric, so half of the
+    offsets are enough.
+
+    Parameters:
+    labeled_array (np.ndarray): A 2D array of labels, 0 is the background.
+    mode (str): Which neighbours touch, see StructuringElementMode.
+
+    Returns:
+    np.ndarray: An (n, 2) array of the unique adjacent pairs (smaller label first), sorted.
+    """
     # Convert mode to StructuringElementMode enum
     try:
         mode_enum = StructuringElementMode(mode)
@@ -12,29 +29,51 @@ def get_object_adjacency(labeled_array, mode="8-way"):
         raise ValueError(f"Unknown mode='{mode}'. Must be 'direct', 'diagonal', or '8-way'.")
 
     structure = mode_enum.get_structuring_element()
-    adjacency = {}
-    
-    # Gather non-zero labels (ignore background=0)
+    labeled_array = np.asarray(labeled_array)
+    height, width = labeled_array.shape
+
+    pairs = []
+    for d_row, d_col in np.argwhere(structure) - 1:
+        # (1, 0), (0, 1), (1, 1) and (1, -1) cover their mirrored offsets as well
+        if d_row < 0 or (d_row == 0 and d_col <= 0):
+            continue
+        here = labeled_array[:height - d_row, max(-d_col, 0):width - max(d_col, 0)]
+        there = labeled_array[d_row:, max(d_col, 0):width + min(d_col, 0)]
+        touching = (here != there) & (here != 0) & (there != 0)
+        pairs.append(np.stack([np.minimum(here[touching], there[touching]),
+                               np.maximum(here[touching], there[touching])], axis=1))
+
+    if not pairs:
+        return np.zeros((0, 2), dtype=labeled_array.dtype)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+def adjacency_matrix(labels, pairs):
+    """
+    Sparse symmetric adjacency matrix of the labels, row and column i belong to labels[i].
+
+    Parameters:
+    labels (np.ndarray): The labels in ascending order.
+    pairs (np.ndarray): Adjacent label pairs as returned by get_adjacent_label_pairs.
+
+    Returns:
+    scipy.sparse.csr_matrix: A boolean matrix that is True for adjacent labels.
+    """
+    labels = np.asarray(labels)
+    rows = np.searchsorted(labels, pairs[:, 0])
+    cols = np.searchsorted(labels, pairs[:, 1])
+    data = np.ones(2 * len(pairs), dtype=bool)
+    return csr_matrix((data, (np.concatenate([rows, cols]), np.concatenate([cols, rows]))), shape=(len(labels), len(labels)))
+
+def get_object_adjacency(labeled_array, mode="8-way"):
+    # Neighbours of every non-zero label (labels without neighbours get an empty set)
     unique_labels = np.unique(labeled_array)
     unique_labels = unique_labels[unique_labels != 0]
-    
-    for label in unique_labels:
-        # 1) Binary mask for this label
-        mask = (labeled_array == label)
-        
-        # 2) Dilate mask using the chosen structuring element
-        dilated = binary_dilation(mask, structure=structure)
-        
-        # 3) Check which labels appear in the dilated region
-        neighbor_labels = np.unique(labeled_array[dilated])
-        
-        # 4) Exclude background and the label itself
-        neighbor_labels = neighbor_labels[
-            (neighbor_labels != 0) & (neighbor_labels != label)
-        ]
-        
-        adjacency[label] = set(neighbor_labels)
-    
+    adjacency = {label: set() for label in unique_labels}
+
+    for first, second in get_adjacent_label_pairs(labeled_array, mode):
+        adjacency[first].add(second)
+        adjacency[second].add(first)
+
     return adjacency
 
 ###### Functions between objects (independent of the grid): #######
@@ -61,52 +100,77 @@ def size_mod_is_zero(shape1, shape2):
     
     return (size1 % size2) == 0
 
+def largest_block_factor(shape, axis):
+    # Largest k such that the rows (axis=0) or columns (axis=1) of shape come in runs of k identical ones
+    size = shape.shape[axis]
+    for k in range(size, 1, -1):
+        if size % k != 0:
+            continue
+        blocks = shape.reshape((size // k, k, -1)) if axis == 0 else shape.reshape((shape.shape[0], size // k, k))
+        if np.all(blocks == np.take(blocks, [0], axis=axis + 1)):
+            return k
+    return 1
+
+def reduce_scale(shape):
+    # The smallest shape that shape is an upscaled version of: shape == np.kron(base, np.ones((row_factor, col_factor)))
+    shape = np.asarray(shape)
+    if shape.size == 0:
+        return shape, 1, 1
+    row_factor = largest_block_factor(shape, axis=0)
+    col_factor = largest_block_factor(shape, axis=1)
+    return shape[::row_factor, ::col_factor], row_factor, col_factor
+
+def upscale(shape, row_factor, col_factor):
+    # Every cell becomes a row_factor x col_factor block
+    return np.kron(shape, np.ones((row_factor, col_factor), dtype=np.asarray(shape).dtype))
+
+def hashable_shape(shape):
+    # Dimensions and cells of a binary shape as a hashable key
+    shape = np.asarray(shape) != 0
+    return shape.shape, shape.tobytes()
+
+@functools.lru_cache(maxsize=100_000)
+def _scale_factors(key1, key2):
+    (rows1, cols1), (rows2, cols2) = key1[0], key2[0]
+    if rows1 == 0 or cols1 == 0 or rows2 % rows1 != 0 or cols2 % cols1 != 0:
+        return None
+    row_factor, col_factor = rows2 // rows1, cols2 // cols1
+    shape1 = np.frombuffer(key1[1], dtype=bool).reshape(rows1, cols1)
+    shape2 = np.frombuffer(key2[1], dtype=bool).reshape(rows2, cols2)
+    # Cut shape2 into the blocks of the cells of shape1, every block has to be filled like its cell
+    blocks = shape2.reshape(rows1, row_factor, cols1, col_factor)
+    if not np.all(blocks == shape1[:, np.newaxis, :, np.newaxis]):
+        return None
+    return row_factor, col_factor
+
+def scale_factors(shape1, shape2):
+    """
+    Checks if shape2 is an upscaled version of shape1, with any integer factors (also different ones for the rows
+    and the columns). The results are cached per pair of shapes, so many pairs can be tested cheaply.
+
+    Parameters:
+    shape1, shape2 (np.ndarray): Binary shapes.
+
+    Returns:
+    Tuple[int, int]: (row_factor, col_factor) with shape2 == upscale(shape1, row_factor, col_factor), (1, 1) for
+        equal shapes, or None if shape2 is no upscaled version of shape1.
+    """
+    return _scale_factors(hashable_shape(shape1), hashable_shape(shape2))
+
+def is_scaled(shape1, shape2, factor=None):
+    # shape2 is shape1 scaled up by factor (an int, or (row_factor, col_factor)), by any factor other than 1 if None
+    factors = scale_factors(shape1, shape2)
+    if factors is None:
+        return False
+    if factor is None:
+        return factors != (1, 1)
+    return factors == (factor if isinstance(factor, tuple) else (factor, factor))
 
 def is_scaled_quadratic(shape1, shape2): 
-    r1, c1 = shape1.shape
-    r2, c2 = shape2.shape
-    
-    # Check dimension scaling
-    if r2 != 2 * r1 or c2 != 2 * c1:
-        return False
-    
-    # Check each cell
-    for i in range(r1):
-        for j in range(c1):
-            block = shape2[2*i : 2*i+2, 2*j : 2*j+2]
-            if shape1[i, j] == 1:
-                # Block should be all 1s
-                if not np.all(block == 1):
-                    return False
-            else:
-                # Block should be all 0s
-                if not np.all(block == 0):
-                    return False
-    
-    return True
+    return is_scaled(shape1, shape2, factor=2)
 
 def is_scaled_quadratic_inverse(shape2, shape1): #reuse is_scaled with switched arguments
-    r1, c1 = shape1.shape
-    r2, c2 = shape2.shape
-    
-    # Check dimension scaling
-    if r2 != 2 * r1 or c2 != 2 * c1:
-        return False
-    
-    # Check each cell
-    for i in range(r1):
-        for j in range(c1):
-            block = shape2[2*i : 2*i+2, 2*j : 2*j+2]
-            if shape1[i, j] == 1:
-                # Block should be all 1s
-                if not np.all(block == 1):
-                    return False
-            else:
-                # Block should be all 0s
-                if not np.all(block == 0):
-                    return False
-    
-    return True
+    return is_scaled(shape1, shape2, factor=2)
 
 def is_rotation(shape1, shape2):
     # 0° rotation (Identity excluded; excludes also squares)
@@ -25,6 +25,29 @@ def to_hashable_shape(shape_array):
     """
     return tuple(tuple(row) for row in shape_array)
 
+# Shape keys. A binary shape is encoded as "<height>x<width>:<bits packed into hex>", a short string that can be
+# hashed and stored on the object nodes. Shapes that are the same up to rotation, flip or scale get the same key from
+# the functions below, so objects can be grouped with one dictionary pass instead of comparing every pair.
+
+def shape_key(shape_array):
+    shape_array = np.asarray(shape_array)
+    height, width = shape_array.shape
+    return f"{height}x{width}:{np.packbits(shape_array != 0).tobytes().hex()}"
+
+def rotation_shape_key(shape_array):
+    # The same for all 4 rotations of a shape: the smallest of their keys
+    return min(shape_key(np.rot90(shape_array, k)) for k in range(4))
+
+def canonical_shape_key(shape_array):
+    # The same for all 8 rotations and flips of a shape (the dihedral group D4): every flip is a rotation of the transpose
+    shape_array = np.asarray(shape_array)
+    return min(rotation_shape_key(shape_array), rotation_shape_key(shape_array.T))
+
+def scaled_shape_key(shape_array):
+    # The same for all (also unevenly) upscaled versions of a shape, see reduce_scale
+    base, _, _ = reduce_scale(np.asarray(shape_array))
+    return shape_key(base)
+
 
 # def create_color_group(obj_color_dict, obj_shapes):
 #     """
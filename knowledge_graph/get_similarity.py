@@ -1,9 +1,21 @@
 
 import numpy as np
-from scipy.optimize import linear_sum_assignment
 import arckit
 from typing import List, Dict
 
+from knowledge_graph.similarity_engine import (
+    SIMILARITY_NORMALIZATION,
+    SIMILARITY_PROPERTIES,
+    SIMILARITY_WEIGHTS,
+    SimilarityMatrix,
+    compute_similarity_matrix,
+    create_similarity_matrix,
+    matching_properties,
+    optimal_one_to_one_assignment_with_valid_dummies,
+    property_table,
+    similarity_matrix_to_shared_properties,
+)
+
 
 def get_highest_similarity_pairs(shared_properties):
     best_pairs = {}
@@ -18,81 +30,6 @@ def get_highest_similarity_pairs(shared_properties):
     return best_pairs
 
 
-def create_similarity_matrix(shared_properties):
-    # Get sorted unique IDs
-    input_ids = sorted({match['input_id'] for match in shared_properties})
-    output_ids = sorted({match['output_id'] for match in shared_properties})
-    
-    # Create index mappings
-    input_index = {id_: idx for idx, id_ in enumerate(input_ids)}
-    output_index = {id_: idx for idx, id_ in enumerate(output_ids)}
-
-    # Initialize the matrix
-    similarity_matrix = np.zeros((len(input_ids), len(output_ids)))
-
-    # Fill in the matrix with similarity scores
-    for match in shared_properties:
-        row = input_index[match['input_id']]
-        col = output_index[match['output_id']]
-        similarity_matrix[row, col] = match['normalized_similarity']
-
-    return similarity_matrix, input_ids, output_ids
-
-
-def optimal_one_to_one_assignment_with_valid_dummies(shared_properties, similarity_threshold=0.2):
-    # Create the similarity matrix
-    similarity_matrix, input_ids, output_ids = create_similarity_matrix(shared_properties)
-
-    # Determine the size for padding (larger of #inputs vs. #outputs)
-    max_size = max(len(input_ids), len(output_ids))
-
-    # Pad with zeros (meaning no similarity for those dummy pairs)
-    padded_matrix = np.zeros((max_size, max_size))
-    padded_matrix[:len(input_ids), :len(output_ids)] = similarity_matrix
-
-    # Convert to negative to apply Hungarian Algorithm which minimizes
-    cost_matrix = -padded_matrix
-    row_indices, col_indices = linear_sum_assignment(cost_matrix)
-
-    # Track matched outputs and unmatched outputs
-    matched_outputs = set()
-    unmatched_outputs = set(range(len(output_ids)))  # all outputs initially unmatched
-
-    results = []
-
-    for i, j in zip(row_indices, col_indices):
-        if i < len(input_ids) and j < len(output_ids):
-            # A real input-output match (not padding)
-            similarity = similarity_matrix[i, j]
-            if similarity >= similarity_threshold:
-                results.append({
-                    "input_id": input_ids[i],
-                    "output_id": output_ids[j],
-                    "similarity": similarity,
-                    "marker": "matched"
-                })
-                matched_outputs.add(j)
-                unmatched_outputs.discard(j)
-            else:
-                # Below threshold => treat as unmatched
-                unmatched_outputs.add(j)
-        elif j < len(output_ids):
-            # This was a dummy input (i >= len(input_ids)) assigned to a real output
-            unmatched_outputs.add(j)
-
-    # Assign "dummy" inputs to any remaining unmatched outputs
-    for unmatched_index in unmatched_outputs:
-        if unmatched_index not in matched_outputs:
-            results.append({
-                "input_id": None,  # Dummy
-                "output_id": output_ids[unmatched_index],
-                "similarity": 0.0,
-                "marker": "unmatched"
-            })
-
-    return results
-
-
 def one_to_many_matches_dict(shared_properties, similarity_threshold=0.1):
     matches_by_input = {}
 
@@ -1,9 +1,35 @@
 import kuzu
 import numpy as np
+import shutil
+import tempfile
+import weakref
+
+from knowledge_graph.similarity_engine import (
+    SIMILARITY_PROPERTIES,
+    compute_similarity_matrix,
+    optimal_one_to_one_assignment_with_valid_dummies,
+    similarity_matrix_to_shared_properties,
+)
+
+# Path that makes Kùzu keep the whole database in memory
+IN_MEMORY = ":memory:"
 
 
 class KuzuDBManager:
-    def __init__(self, db_path=""):
+    def __init__(self, db_path=None):
+        """
+        Opens (or creates) a Kùzu database.
+
+        Parameters:
+        db_path (str): Folder of the database. Use IN_MEMORY for a database that never touches the disk. If None,
+            a unique temporary folder is used, which is deleted again when the manager is closed or garbage
+            collected. Either way several databases can exist at the same time, e.g. one per worker process.
+        """
+        self.temporary_folder = None
+        if db_path is None:
+            self.temporary_folder = tempfile.mkdtemp(prefix="kuzudb_")
+            db_path = self.temporary_folder + "/db"
+            weakref.finalize(self, shutil.rmtree, self.temporary_folder, ignore_errors=True)
         self.db_path = db_path
         self.db = kuzu.Database(db_path)
         self.conn = kuzu.Connection(self.db)
@@ -13,12 +39,19 @@ class KuzuDBManager:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        del self
+
+    def close(self):
         # Close the connection or clean up resources
         if self.conn:
             self.conn.close()
+            self.conn = None
         if self.db:
             self.db.close()
-        del self
+            self.db = None
+        if self.temporary_folder:
+            shutil.rmtree(self.temporary_folder, ignore_errors=True)
 
     def create_schema(self):
         # Create the object node tables
@@ -32,7 +65,12 @@ class KuzuDBManager:
                                    bbox_y INT32,
                                    bbox_width INT32,
                                    bbox_height INT32,
-                                   adjacency INT64[]
+                                   holes INT32,
+                                   adjacency INT64[],
+                                   shape_key STRING,
+                                   rotation_shape_key STRING,
+                                   canonical_shape_key STRING,
+                                   scaled_shape_key STRING
                              );
                              """)
 
@@ -46,7 +84,12 @@ class KuzuDBManager:
                                    bbox_y INT32,
                                    bbox_width INT32,
                                    bbox_height INT32,
-                                   adjacency INT64[]
+                                   holes INT32,
+                                   adjacency INT64[],
+                                   shape_key STRING,
+                                   rotation_shape_key STRING,
+                                   canonical_shape_key STRING,
+                                   scaled_shape_key STRING
                              );
                              """)  # TODO: extend to include things like is_rotation_invariant
         # Group level
@@ -83,163 +126,133 @@ class KuzuDBManager:
     def serialize_shape(self, shape_array):
         return shape_array.tolist()
 
-    def insert_object(
-        self,
-        table_name,
-        id,
-        example_id,
-        color,
-        shape,
-        bbox_x,
-        bbox_y,
-        bbox_width,
-        bbox_height,
-        adjacency,
-    ):
+    # Bulk loading: the methods below insert all rows of one kind with a single statement (UNWIND over a list
+    # parameter), there are no methods that run one CREATE per object, group or edge.
+
+    def insert_objects(self, table_name, objects):
+        if not objects:
+            return
         query = f"""
+        UNWIND $objects AS object
         CREATE (n:{table_name} {{
             node_class: '{table_name}',
-            id: $id,
-            example_id: $example_id,
-            color: $color,
-            shape: $shape,
-            bbox_x: $bbox_x,
-            bbox_y: $bbox_y,
-            bbox_width: $bbox_width,
-            bbox_height: $bbox_height,
-            adjacency: $adjacency
+            id: object.id,
+            example_id: object.example_id,
+            color: object.color,
+            shape: CAST(object.shape AS INT64[][]),
+            bbox_x: object.bbox_x,
+            bbox_y: object.bbox_y,
+            bbox_width: object.bbox_width,
+            bbox_height: object.bbox_height,
+            holes: object.holes,
+            adjacency: CAST(object.adjacency AS INT64[]),
+            shape_key: object.shape_key,
+            rotation_shape_key: object.rotation_shape_key,
+            canonical_shape_key: object.canonical_shape_key,
+            scaled_shape_key: object.scaled_shape_key
         }})
         """
 
-        # Create the parameter dictionary
+        # One dictionary with the properties of the node table per object. The lists are cast explicitly in the query,
+        # otherwise Kùzu cannot infer the element type when all of them are empty.
         parameters = {
-            "id": id,
-            "example_id": example_id,
-            "color": color,
-            "shape": self.serialize_shape(shape),
-            "bbox_x": bbox_x,
-            "bbox_y": bbox_y,
-            "bbox_width": bbox_width,
-            "bbox_height": bbox_height,
-            "adjacency": adjacency,
+            "objects": [
+                {
+                    "id": obj["id"],
+                    "example_id": obj["example_id"],
+                    "color": obj["color"],
+                    "shape": self.serialize_shape(obj["shape"]),
+                    "bbox_x": obj["bbox_x"],
+                    "bbox_y": obj["bbox_y"],
+                    "bbox_width": obj["bbox_width"],
+                    "bbox_height": obj["bbox_height"],
+                    "holes": obj["holes"],
+                    "adjacency": obj["adjacency"],
+                    "shape_key": obj["shape_key"],
+                    "rotation_shape_key": obj["rotation_shape_key"],
+                    "canonical_shape_key": obj["canonical_shape_key"],
+                    "scaled_shape_key": obj["scaled_shape_key"],
+                }
+                for obj in objects
+            ]
         }
 
-        # Execute the query
         self.conn.execute(query, parameters=parameters)
 
-    def insert_input_object(
-        self,
-        id,
-        example_id,
-        color,
-        shape,
-        bbox_x,
-        bbox_y,
-        bbox_width,
-        bbox_height,
-        adjacency,
-    ):
-        self.insert_object(
-            "input_object",
-            id,
-            example_id,
-            color,
-            shape,
-            bbox_x,
-            bbox_y,
-            bbox_width,
-            bbox_height,
-            adjacency,
-        )
+    def insert_input_objects(self, objects):
+        self.insert_objects("input_object", objects)
 
-    def insert_output_object(
-        self,
-        id,
-        example_id,
-        color,
-        shape,
-        bbox_x,
-        bbox_y,
-        bbox_width,
-        bbox_height,
-        adjacency,
-    ):
-        self.insert_object(
-            "output_object",
-            id,
-            example_id,
-            color,
-            shape,
-            bbox_x,
-            bbox_y,
-            bbox_width,
-            bbox_height,
-            adjacency,
-        )
+    def insert_output_objects(self, objects):
+        self.insert_objects("output_object", objects)
 
-    def insert_group(self, table_name, id, example_id, type, size):
-        # Define the query
+    def insert_groups(self, table_name, groups):
+        if not groups:
+            return
         query = f"""
+        UNWIND $groups AS group_node
         CREATE (n:{table_name} {{
             node_class: '{table_name}',
-            id: $id,
-            example_id : $example_id,
-            type: $type,
-            size: $size
+            id: group_node.id,
+            example_id : group_node.example_id,
+            type: group_node.type,
+            size: group_node.size
         }})
         """
 
-        # Create the parameter dictionary
         parameters = {
-            "id": id,
-            "example_id": example_id,
-            "type": type,
-            "size": size,
+            "groups": [
+                {
+                    "id": group["id"],
+                    "example_id": group["example_id"],
+                    "type": group["type"],
+                    "size": group["size"],
+                }
+                for group in groups
+            ]
         }
 
-        # Execute the query
         self.conn.execute(query, parameters=parameters)
 
-    def insert_input_group(self, id, example_id, type, size):
-        self.insert_group("input_group", id, example_id, type, size)
+    def insert_input_groups(self, groups):
+        self.insert_groups("input_group", groups)
 
-    def insert_output_group(self, id, example_id, type, size):
-        self.insert_group("output_group", id, example_id, type, size)
+    def insert_output_groups(self, groups):
+        self.insert_groups("output_group", groups)
 
-    def insert_relationship(
-        self, table_name, group_id, group_type, object_id, object_type
+    def insert_relationships(
+        self, table_name, group_type, object_type, group_object_mapping
     ):
-        # Define the query with escaped curly braces
+        # group_object_mapping: list of (group_id, object_ids) as returned by KnowledgeGraphBuilder.extract_groups
+        edges = [
+            {"group_id": int(group_id), "object_id": int(object_id)}
+            for group_id, object_ids in group_object_mapping
+            for object_id in object_ids
+        ]
+        if not edges:
+            return
         query = f"""
+        UNWIND $edges AS edge
         MATCH (g:{group_type}), (o:{object_type})
-        WHERE g.id = $group_id AND o.id = $object_id
+        WHERE g.id = edge.group_id AND o.id = edge.object_id
         CREATE (g)-[:{table_name} {{edge_class: '{table_name}'}}]->(o)
         """
 
-        # Create the parameter dictionary
-        parameters = {
-            "group_id": group_id,
-            "object_id": object_id,
-        }
-        # Execute the query
-        self.conn.execute(query, parameters=parameters)
+        self.conn.execute(query, parameters={"edges": edges})
 
-    def insert_input_contains_relationship(self, group_id, object_id):
-        self.insert_relationship(
+    def insert_input_contains_relationships(self, group_object_mapping):
+        self.insert_relationships(
             table_name="input_contains",
-            group_id=group_id,
             group_type="input_group",
-            object_id=object_id,
             object_type="input_object",
+            group_object_mapping=group_object_mapping,
         )
 
-    def insert_output_contains_relationship(self, group_id, object_id):
-        self.insert_relationship(
+    def insert_output_contains_relationships(self, group_object_mapping):
+        self.insert_relationships(
             table_name="output_contains",
-            group_id=group_id,
             group_type="output_group",
-            object_id=object_id,
             object_type="output_object",
+            group_object_mapping=group_object_mapping,
         )
 
     def get_graph(self):
@@ -274,192 +287,97 @@ class KuzuDBManager:
             print(f"Error during query execution: {e}")
 
         return data
-    def get_shared_properties(self, example_id=None, batch_size=100):
-        # Base query with dynamic filtering by example_id
-        query = f"""
-        MATCH (i:input_object), (o:output_object)
-        WHERE i.example_id = o.example_id {f"AND i.example_id = $example_id" if example_id is not None else ""}
-        RETURN 
-            i.id AS input_id, 
-            o.id AS output_id,
-            (CASE WHEN i.color = o.color THEN 1 ELSE 0 END +
-            CASE WHEN i.bbox_x = o.bbox_x THEN 1 ELSE 0 END +
-            CASE WHEN i.bbox_y = o.bbox_y THEN 1 ELSE 0 END +
-            CASE WHEN i.bbox_width = o.bbox_width THEN 1 ELSE 0 END +
-            CASE WHEN i.bbox_height = o.bbox_height THEN 1 ELSE 0 END +
-            CASE WHEN i.shape = o.shape THEN 1 ELSE 0 END) AS num_matching_properties,
-            [
-                CASE WHEN i.color = o.color THEN 'color' ELSE NULL END,
-                CASE WHEN i.bbox_x = o.bbox_x THEN 'bbox_x' ELSE NULL END,
-                CASE WHEN i.bbox_y = o.bbox_y THEN 'bbox_y' ELSE NULL END,
-                CASE WHEN i.bbox_width = o.bbox_width THEN 'bbox_width' ELSE NULL END,
-                CASE WHEN i.bbox_height = o.bbox_height THEN 'bbox_height' ELSE NULL END,
-                CASE WHEN i.shape = o.shape THEN 'shape' ELSE NULL END
-            ] AS matching_properties,
-            (CASE WHEN i.color = o.color THEN 5 ELSE 0 END +
-            CASE WHEN i.bbox_x = o.bbox_x THEN 5 ELSE 0 END +
-            CASE WHEN i.bbox_y = o.bbox_y THEN 5 ELSE 0 END +
-            CASE WHEN i.bbox_width = o.bbox_width THEN 2.5 ELSE 0 END +
-            CASE WHEN i.bbox_height = o.bbox_height THEN 2.5 ELSE 0 END +
-            CASE WHEN i.shape = o.shape THEN 5 ELSE 0 END) * 1.0 / 25 AS normalized_similarity
+    def get_object_properties(self, table_name, example_id=None):
         """
-        # !!!! We want to check whether we should combine bbox_width and bbox_height !!!!
+        Reads the compared properties of all objects of a table in one query.
 
-        # Parameters for filtering by example_id
+        Parameters:
+        table_name (str): input_object or output_object
+        example_id (int): only return the objects of this example, all if None
+
+        Returns:
+        list: one dict per object with id, example_id and the SIMILARITY_PROPERTIES
+        """
+        query = f"""
+        MATCH (n:{table_name})
+        {"WHERE n.example_id = $example_id" if example_id is not None else ""}
+        RETURN n.id, n.example_id, {", ".join(f"n.{property}" for property in SIMILARITY_PROPERTIES)}
+        ORDER BY n.id
+        """
         parameters = {"example_id": example_id} if example_id is not None else {}
+        columns = ["id", "example_id"] + SIMILARITY_PROPERTIES
+        result = self.conn.execute(query, parameters=parameters)
+        return [dict(zip(columns, row)) for row in result.get_all()]
 
-        # Result storage
-        matches = []
-        try:
-            # Execute the query
-            result = self.conn.execute(query, parameters=parameters)
-            batch = []
-            while result.has_next():
-                row = result.get_next()
+    def get_objects_by_shape_key(self, table_name, key, key_type="canonical_shape_key"):
+        """
+        Finds the objects whose shape has the given key.
+
+        Parameters:
+        table_name (str): input_object or output_object
+        key (str): A key made by the function of the same name in create_obj_groups.py.
+        key_type (str): shape_key, rotation_shape_key, canonical_shape_key or scaled_shape_key
+
+        Returns:
+        list: the ids of the objects, in ascending order
+        """
+        if key_type not in ("shape_key", "rotation_shape_key", "canonical_shape_key", "scaled_shape_key"):
+            raise ValueError(f"Unknown key_type='{key_type}'.")
+        query = f"""
+        MATCH (n:{table_name})
+        WHERE n.{key_type} = $key
+        RETURN n.id
+        ORDER BY n.id
+        """
+        result = self.conn.execute(query, parameters={"key": key})
+        return [row[0] for row in result.get_all()]
+
+    def get_similarity_matrix(self, example_id):
+        # Similarity between all input and output objects of one example
+        return compute_similarity_matrix(
+            self.get_object_properties("input_object", example_id),
+            self.get_object_properties("output_object", example_id),
+        )
 
-                # Adjust based on `row` structure
-                if isinstance(row, (list, tuple)):
-                    # Access values positionally
-                    (
-                        input_id,
-                        output_id,
-                        num_matching_properties,
-                        matching_properties,
-                        normalized_similarity,
-                    ) = row
-                    matching_properties = [
-                        prop for prop in matching_properties if prop is not None
-                    ]
-                elif isinstance(row, dict):
-                    # Access values using keys
-                    input_id = row["input_id"]
-                    output_id = row["output_id"]
-                    num_matching_properties = row["num_matching_properties"]
-                    matching_properties = [
-                        prop for prop in row["matching_properties"] if prop is not None
-                    ]
-                    normalized_similarity = row["normalized_similarity"]
-                else:
-                    raise ValueError("Unexpected row format returned from query.")
-
-                # Add processed result to the batch
-                batch.append(
-                    {
-                        "input_id": input_id,
-                        "output_id": output_id,
-                        "num_matching_properties": num_matching_properties,
-                        "matching_properties": matching_properties,
-                        "normalized_similarity": normalized_similarity,
-                    }
-                )
-
-                # If batch size is reached, process and reset the batch
-                if len(batch) >= batch_size:
-                    matches.extend(batch)
-                    batch = []
-
-            # Add remaining rows
-            matches.extend(batch)
+    def get_shared_properties(self, example_id=None):
+        # Compares the input and output objects of the same example. The comparison itself runs in numpy
+        # (see compute_similarity_matrix).
+        input_objects = self.get_object_properties("input_object", example_id)
+        output_objects = self.get_object_properties("output_object", example_id)
 
+        matches = []
+        try:
+            matrix = compute_similarity_matrix(input_objects, output_objects)
+            # only pairs of the same example are compared
+            same_example = (
+                np.array([o["example_id"] for o in input_objects])[:, np.newaxis]
+                == np.array([o["example_id"] for o in output_objects])[np.newaxis, :]
+            )
+            matches = similarity_matrix_to_shared_properties(matrix, same_example)
         except Exception as e:
-            print(f"Error during query execution: {e}")
+            print(f"Error during similarity computation: {e}")
 
         return matches
 
-    def shared_properties_across_input(
-        self, example_id_1=None, example_id_2=None, batch_size=100
-    ):
+    def shared_properties_across_input(self, example_id_1=None, example_id_2=None):
         """
         Compare input objects from two different example_ids
         (or all if None) and return their matching properties & similarity.
         """
-        # 1) Build query with optional parameters
-        query = f"""
-        MATCH (i:input_object), (j:input_object)
-        WHERE i.example_id <> j.example_id
-            {f"AND i.example_id = $example_id_1" if example_id_1 else ""}
-            {f"AND j.example_id = $example_id_2" if example_id_2 else ""}
-        RETURN 
-            i.id AS input_i_id, 
-            j.id AS input_j_id,
-            (
-                CASE WHEN i.color = j.color THEN 1 ELSE 0 END +
-                CASE WHEN i.bbox_x = j.bbox_x THEN 1 ELSE 0 END +
-                CASE WHEN i.bbox_y = j.bbox_y THEN 1 ELSE 0 END +
-                CASE WHEN i.bbox_width = j.bbox_width THEN 1 ELSE 0 END +
-                CASE WHEN i.bbox_height = j.bbox_height THEN 1 ELSE 0 END +
-                CASE WHEN i.shape = j.shape THEN 1 ELSE 0 END
-            ) AS num_matching_properties,
-            [
-                CASE WHEN i.color = j.color THEN 'color' ELSE NULL END,
-                CASE WHEN i.bbox_x = j.bbox_x THEN 'bbox_x' ELSE NULL END,
-                CASE WHEN i.bbox_y = j.bbox_y THEN 'bbox_y' ELSE NULL END,
-                CASE WHEN i.bbox_width = j.bbox_width THEN 'bbox_width' ELSE NULL END,
-                CASE WHEN i.bbox_height = j.bbox_height THEN 'bbox_height' ELSE NULL END,
-                CASE WHEN i.shape = j.shape THEN 'shape' ELSE NULL END
-            ] AS matching_properties,
-            (
-                CASE WHEN i.color = j.color THEN 5 ELSE 0 END +
-                CASE WHEN i.bbox_x = j.bbox_x THEN 5 ELSE 0 END +
-                CASE WHEN i.bbox_y = j.bbox_y THEN 5 ELSE 0 END +
-                CASE WHEN i.bbox_width = j.bbox_width THEN 2.5 ELSE 0 END +
-                CASE WHEN i.bbox_height = j.bbox_height THEN 2.5 ELSE 0 END +
-                CASE WHEN i.shape = j.shape THEN 5 ELSE 0 END
-            ) * 1.0 / 25 AS normalized_similarity
-        """
-        parameters = {}
-        if example_id_1 is not None:
-            parameters["example_id_1"] = example_id_1
-        if example_id_2 is not None:
-            parameters["example_id_2"] = example_id_2
+        objects_1 = self.get_object_properties("input_object", example_id_1)
+        objects_2 = self.get_object_properties("input_object", example_id_2)
 
         matches = []
         try:
-            result = self.conn.execute(query, parameters=parameters)
-            batch = []
-            while result.has_next():
-                row = result.get_next()
-
-                if isinstance(row, (list, tuple)):
-                    # Access values positionally
-                    (
-                        input_i_id,
-                        input_j_id,
-                        num_matching_properties,
-                        matching_props,
-                        normalized_similarity,
-                    ) = row
-                elif isinstance(row, dict):
-                    # Access values by keys
-                    input_i_id = row["input_i_id"]
-                    input_j_id = row["input_j_id"]
-                    num_matching_properties = row["num_matching_properties"]
-                    matching_props = row["matching_properties"]
-                    normalized_similarity = row["normalized_similarity"]
-                else:
-                    raise ValueError("Unexpected row format returned from query.")
-
-                # Filter out None from matching_props
-                matching_props = [prop for prop in matching_props if prop is not None]
-
-                # Add processed result
-                batch.append(
-                    {
-                        "input_id": input_i_id,
-                        "output_id": input_j_id,
-                        "num_matching_properties": num_matching_properties,
-                        "matching_properties": matching_props,
-                        "normalized_similarity": normalized_similarity,
-                    }
-                )
-
-                if len(batch) >= batch_size:
-                    matches.extend(batch)
-                    batch = []
-
-            matches.extend(batch)
+            matrix = compute_similarity_matrix(objects_1, objects_2)
+            # objects of the same example are never compared with each other
+            different_example = (
+                np.array([o["example_id"] for o in objects_1])[:, np.newaxis]
+                != np.array([o["example_id"] for o in objects_2])[np.newaxis, :]
+            )
+            matches = similarity_matrix_to_shared_properties(matrix, different_example)
         except Exception as e:
-            print(f"Error during query execution: {e}")
+            print(f"Error during similarity computation: {e}")
 
         return matches
 
@@ -470,11 +388,8 @@ class KuzuDBManager:
 
         # check for unmatched objects and too many matched objects
         for i in range(1, 4):  # Loop over 3, 2, 1
-            # Obtain properties
-            props = self.get_shared_properties(example_id=i, batch_size=100)
-
-            # Do matching on the properties
-            matchings = optimal_one_to_one_assignment_with_valid_dummies(props)
+            # Compare the objects and match them
+            matchings = optimal_one_to_one_assignment_with_valid_dummies(self.get_similarity_matrix(i))
 
             # Count unmatched and matched objects
             unmatched_count = sum(
@@ -497,13 +412,10 @@ class KuzuDBManager:
         # check for low similarity on the top 5 objects
         low_similarity_counter = 0
         for j in range(1, 4):  # Loop over 3, 2, 1
-            # Obtain properties
-            props = self.get_shared_properties(example_id=j, batch_size=100)
-
             # Do matching on the properties and take the first five objects
-            matchings = optimal_one_to_one_assignment_with_valid_dummies(props)
+            matchings = optimal_one_to_one_assignment_with_valid_dummies(self.get_similarity_matrix(j))
 
-            sorted_matchings = sorted(my_list, key=lambda x: x["similarity"])
+            sorted_matchings = sorted(matchings, key=lambda x: x["similarity"])
 
             first_five = sorted_matchings[:5]
             # Count how many objects have a low similarity score
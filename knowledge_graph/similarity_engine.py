@@ -0,0 +1,176 @@
+# The NumPy engine that compares knowledge graph objects, and the one-to-one matching on its results. It only needs
+# NumPy and SciPy, so KuzuDBManager can use it without the arckit dependency of get_similarity.py (which imports
+# everything from here, so the names stay available there as well).
+
+from typing import NamedTuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+# Object properties that are compared between two objects and the weight a match on each of them adds to the
+# similarity. The weights sum up to SIMILARITY_NORMALIZATION, so two identical objects have a similarity of 1.
+SIMILARITY_PROPERTIES = ["color", "bbox_x", "bbox_y", "bbox_width", "bbox_height", "shape"]
+SIMILARITY_WEIGHTS = np.array([5, 5, 5, 2.5, 2.5, 5])
+SIMILARITY_NORMALIZATION = 25
+
+
+class SimilarityMatrix(NamedTuple):
+    similarity: np.ndarray  # (n_inputs, n_outputs) normalized weighted similarity
+    matching: np.ndarray    # (n_inputs, n_outputs) bitmask, bit k is set if SIMILARITY_PROPERTIES[k] is equal
+    input_ids: list
+    output_ids: list
+
+
+def property_table(objects, shape_codes):
+    """
+    Turns a list of object property dicts into an integer table with one column per SIMILARITY_PROPERTIES entry.
+    Shapes are replaced by an integer code from shape_codes, which is shared between both sides of a comparison so
+    that equal shapes get equal codes.
+
+    Parameters:
+    objects (list): dicts with an 'id' and the SIMILARITY_PROPERTIES
+    shape_codes (dict): maps a hashable shape to its code, new shapes are added
+
+    Returns:
+    tuple: (ids, table) with table of shape (len(objects), len(SIMILARITY_PROPERTIES))
+    """
+    table = np.empty((len(objects), len(SIMILARITY_PROPERTIES)), dtype=np.int64)
+    for row, object in enumerate(objects):
+        shape = tuple(map(tuple, object["shape"]))
+        table[row, :-1] = [object[property] for property in SIMILARITY_PROPERTIES[:-1]]
+        table[row, -1] = shape_codes.setdefault(shape, len(shape_codes))
+    return [object["id"] for object in objects], table
+
+
+def compute_similarity_matrix(input_objects, output_objects):
+    """
+    Compares every input object with every output object in one broadcast.
+
+    Parameters:
+    input_objects (list): property dicts of the input side (see property_table)
+    output_objects (list): property dicts of the output side
+
+    Returns:
+    SimilarityMatrix: weighted similarity and matching-property bitmask for all pairs
+    """
+    shape_codes = {}
+    input_ids, input_table = property_table(input_objects, shape_codes)
+    output_ids, output_table = property_table(output_objects, shape_codes)
+
+    # equal[i, o, k] is True if input i and output o agree on property k
+    equal = input_table[:, np.newaxis, :] == output_table[np.newaxis, :, :]
+    similarity = equal @ SIMILARITY_WEIGHTS / SIMILARITY_NORMALIZATION
+    matching = equal @ (1 << np.arange(len(SIMILARITY_PROPERTIES)))
+    return SimilarityMatrix(similarity, matching, input_ids, output_ids)
+
+
+def matching_properties(mask):
+    # names of the properties that are set in a matching bitmask
+    return [property for k, property in enumerate(SIMILARITY_PROPERTIES) if mask >> k & 1]
+
+
+def similarity_matrix_to_shared_properties(matrix: SimilarityMatrix, pair_mask=None):
+    """
+    Converts a SimilarityMatrix into the list of dicts returned by KuzuDBManager.get_shared_properties.
+
+    Parameters:
+    matrix (SimilarityMatrix): the compared objects
+    pair_mask (np.ndarray): optional boolean mask of the pairs to keep
+
+    Returns:
+    list: one dict per pair with input_id, output_id, num_matching_properties, matching_properties and
+    normalized_similarity
+    """
+    if pair_mask is None:
+        pair_mask = np.ones(matrix.similarity.shape, dtype=bool)
+    shared_properties = []
+    for row, col in zip(*np.nonzero(pair_mask)):
+        properties = matching_properties(int(matrix.matching[row, col]))
+        shared_properties.append({
+            "input_id": matrix.input_ids[row],
+            "output_id": matrix.output_ids[col],
+            "num_matching_properties": len(properties),
+            "matching_properties": properties,
+            "normalized_similarity": float(matrix.similarity[row, col]),
+        })
+    return shared_properties
+
+
+def create_similarity_matrix(shared_properties):
+    # A SimilarityMatrix already is the matrix
+    if isinstance(shared_properties, SimilarityMatrix):
+        return shared_properties.similarity, shared_properties.input_ids, shared_properties.output_ids
+
+    # Get sorted unique IDs
+    input_ids = sorted({match['input_id'] for match in shared_properties})
+    output_ids = sorted({match['output_id'] for match in shared_properties})
+    
+    # Create index mappings
+    input_index = {id_: idx for idx, id_ in enumerate(input_ids)}
+    output_index = {id_: idx for idx, id_ in enumerate(output_ids)}
+
+    # Initialize the matrix
+    similarity_matrix = np.zeros((len(input_ids), len(output_ids)))
+
+    # Fill in the matrix with similarity scores
+    for match in shared_properties:
+        row = input_index[match['input_id']]
+        col = output_index[match['output_id']]
+        similarity_matrix[row, col] = match['normalized_similarity']
+
+    return similarity_matrix, input_ids, output_ids
+
+
+def optimal_one_to_one_assignment_with_valid_dummies(shared_properties, similarity_threshold=0.2):
+    # shared_properties is either a SimilarityMatrix or the list of dicts of get_shared_properties
+    # Create the similarity matrix
+    similarity_matrix, input_ids, output_ids = create_similarity_matrix(shared_properties)
+
+    # Determine the size for padding (larger of #inputs vs. #outputs)
+    max_size = max(len(input_ids), len(output_ids))
+
+    # Pad with zeros (meaning no similarity for those dummy pairs)
+    padded_matrix = np.zeros((max_size, max_size))
+    padded_matrix[:len(input_ids), :len(output_ids)] = similarity_matrix
+
+    # Convert to negative to apply Hungarian Algorithm which minimizes
+    cost_matrix = -padded_matrix
+    row_indices, col_indices = linear_sum_assignment(cost_matrix)
+
+    # Track matched outputs and unmatched outputs
+    matched_outputs = set()
+    unmatched_outputs = set(range(len(output_ids)))  # all outputs initially unmatched
+
+    results = []
+
+    for i, j in zip(row_indices, col_indices):
+        if i < len(input_ids) and j < len(output_ids):
+            # A real input-output match (not padding)
+            similarity = similarity_matrix[i, j]
+            if similarity >= similarity_threshold:
+                results.append({
+                    "input_id": input_ids[i],
+                    "output_id": output_ids[j],
+                    "similarity": float(similarity),
+                    "marker": "matched"
+                })
+                matched_outputs.add(j)
+                unmatched_outputs.discard(j)
+            else:
+                # Below threshold => treat as unmatched
+                unmatched_outputs.add(j)
+        elif j < len(output_ids):
+            # This was a dummy input (i >= len(input_ids)) assigned to a real output
+            unmatched_outputs.add(j)
+
+    # Assign "dummy" inputs to any remaining unmatched outputs
+    for unmatched_index in unmatched_outputs:
+        if unmatched_index not in matched_outputs:
+            results.append({
+                "input_id": None,  # Dummy
+                "output_id": output_ids[unmatched_index],
+                "similarity": 0.0,
+                "marker": "unmatched"
+            })
+
+    return results
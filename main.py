@@ -1,5 +1,4 @@
 import arckit
-import csv
 import numpy as np
 
 from dsl import (
@@ -16,15 +15,33 @@ from dsl.transformation import (
     reconvert_grid_format,
 )
 from dsl.dsl import Constraints
+from dsl.memo import OperatorCache
+from dsl.dsl_dictionary import get_dsl_algebra
+from dsl.program_encoding import dumps
 
 from dsl.test_problems import get_problem_1, get_problem_3, get_problem_4
 
 from kg_output import get_task_object_mappings
 
-from search.breadth_fist_search import BreadthFirstSearch
+from search.batch_evaluation import BatchedBreadthFirstSearch
+from search.best_first_search import BestFirstSearch
+from search.bidirectional_search import BidirectionalSearch
+from search.iterative_deepening_search import IterativeDeepeningSearch
+from search.parallel_search import ParallelSearch
 from search.program_search_problem import goal_test
 from knowledge_graph.get_similarity import get_most_similar_to_test
 from knowledge_graph.create_output import create_isolated_object
+import task_runner
+from task_runner import write_submission
+
+TASK_TIMEOUT = 120  # seconds a single task may take before we give up on it
+SEARCH_NODE_BUDGET = 20000  # expansions of the best-first search per object, its frontier grows with every expansion
+SEARCH_TIME_BUDGET = 20  # seconds of the iterative deepening search that takes over when the best-first search gives up
+SEARCH_WORKERS = 1  # more than 1 searches every object exhaustively with that many processes, use it with predict_tasks(workers=1)
+BATCHED_SEARCH = False  # first search the operators with an array version (moves, flips) a whole BFS layer at a time,
+                        # it can return a longer program of these operators when a shorter one needs the others
+BATCHED_SEARCH_DEPTH = 4  # program length of the batched search, its layers hold every distinct state of that depth
+USE_BEST_PROGRAM = False  # apply the closest program of the iterative deepening search when it runs out of time
 
 
 def overlay_arrays(arrays):
@@ -44,6 +61,51 @@ def overlay_arrays(arrays):
     return result
 
 
+def search_program(problem, operators, operator_cache):
+    # A program for the problem (training pairs of one object), or None
+    if SEARCH_WORKERS > 1:
+        # An exhaustive search instead of the batched and best-first order below: it returns the lexicographically
+        # first shortest canonical program, the same for any number of workers, but it has no budget and does not
+        # look at the heuristic. Every worker process fills its own cache with the limits of operator_cache
+        search = ParallelSearch(
+            problem=problem, goal_test=goal_test, operators=operators, max_depth=5, workers=SEARCH_WORKERS,
+            algebra=get_dsl_algebra(), operator_cache=operator_cache,
+        )
+        return search.search()
+
+    program = None
+    if BATCHED_SEARCH:
+        # a shortest program of the operators with an array version, a whole layer at a time. The other operators
+        # are left to the searches below
+        batched = BatchedBreadthFirstSearch(
+            problem=problem, operators=operators, max_depth=BATCHED_SEARCH_DEPTH, algebra=get_dsl_algebra(),
+        )
+        program = batched.search()
+        print(f"Batched search: {batched.stats()}")
+
+    if program is None:
+        search = BestFirstSearch(
+            problem=problem, goal_test=goal_test, operators=operators, max_depth=5,
+            max_expansions=SEARCH_NODE_BUDGET, operator_cache=operator_cache, algebra=get_dsl_algebra(),
+        )
+        program = search.search()
+
+    if program is None:
+        # Iterative deepening only keeps the current path in memory and stops after SEARCH_TIME_BUDGET seconds
+        fallback = IterativeDeepeningSearch(
+            problem=problem, goal_test=goal_test, operators=operators, max_depth=5,
+            time_budget=SEARCH_TIME_BUDGET, operator_cache=operator_cache, algebra=get_dsl_algebra(),
+        )
+        program = fallback.search()
+        if program is None and fallback.budget_exhausted and USE_BEST_PROGRAM:
+            # the budget ran out before every program up to max_depth was tried, so the closest program seen may be
+            # worth a guess. If the search was complete, no program solves the training pairs
+            program = fallback.best_program
+        print(f"Iterative deepening: {fallback.stats()}")
+
+    return program
+
+
 def run_object_level_prediction(task, dsl_fmt_task):
     db_manager, object_mappings = get_task_object_mappings(task)
     object_mappings = {mapping["input_id"]: mapping for mapping in object_mappings}
@@ -67,6 +129,9 @@ def run_object_level_prediction(task, dsl_fmt_task):
     for _, index in obj.values():
         top_1_similar.append(most_sim[index])
 
+    # The searches for the different objects apply the same operators to many of the same objects, so they share one cache
+    operator_cache = OperatorCache()
+
     prediction_panes = []
     # Get grids for training_input, training_output and test_output
     for pair_dict in top_1_similar:
@@ -113,12 +178,10 @@ def run_object_level_prediction(task, dsl_fmt_task):
             + DSL_COLOR_METHODS
         )
 
-        bfs = BreadthFirstSearch(
-            problem=problem, goal_test=goal_test, operators=operators, max_depth=5
-        )
-        program = bfs.search()
+        program = search_program(problem, operators, operator_cache)
 
-        if program:
+        if program is not None:
+            print(f"Program: {dumps(program)}")
             # GET TEST
             test_input_obj_id = pair_dict["output_id"]
             test_input_properties = test_object_properties[test_input_obj_id]
@@ -144,6 +207,8 @@ def run_object_level_prediction(task, dsl_fmt_task):
                 )
             )
 
+    print(f"Operator cache: {operator_cache.stats()}")
+
     if prediction_panes:
         print(prediction_panes)
         return overlay_arrays(prediction_panes)
@@ -156,16 +221,18 @@ def run_grid_level_prediction(task):
 
     problem = task["train"]  # initial_state, goal_state, constraints
     operators = DSL_COLOR_METHODS + DSL_GRID_MUTATION_METHODS
-    bfs = BreadthFirstSearch(
-        problem=problem, goal_test=goal_test, operators=operators, max_depth=4
+    # the grid mutations can be undone, so we meet in the middle: depth 3 from the inputs and depth 3 from the outputs
+    search = BidirectionalSearch(
+        problem=problem, operators=operators, max_depth=6,
+        goal_constraints=task["train_output_constraints"], algebra=get_dsl_algebra(),
     )
-    return bfs.search()
+    return search.search()
 
 
 def run_program(test_input, program):
     test_output, constraints = test_input
     for operation in program: #@Natasha this applies the wrong program to the objects (should be exactly switched). After some digging, this seems to be not wrong indexing but a kg issue - the closest object is just not of the same color. Maybe we could just value color stronger in the similarity so that it always wins and we have one working testcase. Or I manipulate the problem until it works
-        test_output = operation(constraints, test_output)
+        test_output, constraints = operation(constraints, test_output)
         print(operation)
         print(test_output)
     return add_bg(reconvert_grid_format(test_output,  grid_width = constraints.grid_width, grid_height = constraints.grid_height))
@@ -185,6 +252,15 @@ def format_task(task):
             )
             for input_img, output_img in task.train
         ],
+        # the goal grids keep their size here, the goal pixels in "train" do not carry it
+        "train_output_constraints": [
+            Constraints(
+                color=1,  # TODO: make random
+                grid_width=output_img.shape[1],
+                grid_height=output_img.shape[0],
+            )
+            for _, output_img in task.train
+        ],
         "test": [
             (
                 convert_grid_format(remove_bg(input_img)),
@@ -208,90 +284,40 @@ def predict_output(task):
 
     print(output)
 
-    if output.any():
+    if output is not None and output.any():
         return output
-    else:
-        return None
 
+    # no program for the objects, maybe the whole grid is transformed (e.g. a line is added)
+    program = run_grid_level_prediction(dsl_fmt_task)
+    if program is not None:
+        print(f"Grid program: {dumps(program)}")
+        output = run_program(test_input=dsl_fmt_task["test"][0], program=program)
+        if output.any():
+            return output
 
-# array flattener from kaggle to put the output in the correct format as required by the arckit evaluator
-def flatten_prediction(prediction):
-    str_pred = str([row for row in prediction])
-    str_pred = str_pred.replace(", ", "")
-    str_pred = str_pred.replace("[[", "|")
-    str_pred = str_pred.replace("][", "|")
-    str_pred = str_pred.replace("]]", "|")
-    return str_pred
-
-
-def submit_task(task, predictions):
-    task_id = task.id
-
-    # TODO transform predictions from np.arrays to list format
-
-
-    if not predictions.any():  # If no solution: return shark picture
-        fail_pred = [
-            [0, 0, 0, 0, 1, 1, 1, 0, 0, 0],
-            [0, 0, 0, 1, 1, 1, 1, 1, 0, 0],
-            [0, 0, 1, 1, 1, 1, 1, 1, 0, 0],
-            [0, 1, 1, 1, 1, 1, 1, 1, 0, 0],
-            [0, 1, 1, 1, 1, 1, 1, 1, 0, 0],
-            [0, 0, 1, 1, 1, 1, 1, 0, 0, 0],
-            [0, 0, 0, 1, 1, 1, 0, 0, 0, 0],
-            [0, 0, 0, 0, 1, 1, 0, 0, 0, 0],
-            [0, 0, 0, 1, 1, 0, 0, 0, 0, 0],
-            [0, 0, 0, 1, 0, 0, 0, 0, 0, 0],
-        ]
-
-        predictions = [fail_pred for _ in task.test]
-
-    # flatten prediction
-    flattened_pred = flatten_prediction(predictions.tolist())
-
-    # for i, pred in enumerate(predictions):
-    #         flat_pred = flatten_prediction(predictions[i])
-    #         writer.writerow([f"{task_id}_{i}", flat_pred + " " + flat_pred])
-
+    return None
 
-    # since right now, we are only making one guess, we just repeat it twice to fill up our guesses (checking correctness does not take long). Further, we ignore tasks with two training inputs so we just output the prediction for the first twice.
-    with open("submission.csv", "a") as submission:
-        writer = csv.writer(submission, quoting=csv.QUOTE_NONE)
 
-        if len(task.test) == 2:
-            writer.writerow([f'{task_id}_0', flattened_pred + ' ' + flattened_pred])
-            writer.writerow([f'{task_id}_1', flattened_pred + ' ' + flattened_pred])
-        else:
-            print(len(task.test))
-            writer.writerow([f'{task_id}_0', flattened_pred + ' ' + flattened_pred])
+def predict_tasks(tasks, workers=None, timeout=TASK_TIMEOUT):
+    # The predictions of predict_output in task order, see task_runner.py
+    return task_runner.predict_tasks(predict_output, tasks, workers=workers, timeout=timeout)
 
 
-
-def training_run():
+def training_run(workers=None, timeout=TASK_TIMEOUT):
     train_set, _ = arckit.load_data()
 
-    with open("submission.csv", "w") as submission:
-        writer = csv.writer(submission, quoting=csv.QUOTE_NONE)
-        writer.writerow(["output_id", "output"])
-
-    for task in train_set:
-        task = get_problem_4()
-        predictions = predict_output(task)
-        submit_task(task, predictions)
-        break
+    tasks = [get_problem_4()]  # for now we only debug on one problem, use list(train_set) to run on the whole training set
+    predictions = predict_tasks(tasks, workers=workers, timeout=timeout)
+    write_submission(tasks, predictions)
     # TODO: evaluate with arc kit
 
 
-def evaluation_run():
+def evaluation_run(workers=None, timeout=TASK_TIMEOUT):
     _, eval_set = arckit.load_data()
 
-    with open("submission.csv", "w") as submission:
-        writer = csv.writer(submission, quoting=csv.QUOTE_NONE)
-        writer.writerow(["output_id", "output"])
-
-    for task in eval_set:
-        predictions = predict_output(task)
-        submit_task(task, predictions)
+    tasks = list(eval_set)
+    predictions = predict_tasks(tasks, workers=workers, timeout=timeout)
+    write_submission(tasks, predictions)
 
     score = eval_set.score_submission(
         "submission.csv",  # Submission with two columns output_id,output in Kaggle fomrat
@@ -302,4 +328,5 @@ def evaluation_run():
     print("Score:" + str(score))
 
 
-training_run()
+if __name__ == "__main__":  # the worker processes import this module, they must not start a run themselves
+    training_run()
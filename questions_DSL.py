@@ -8,11 +8,20 @@ import numpy
 from collections import Counter
 
 
+def describe_scale(row_factor, col_factor, inverse=False):
+    # "Scaled x2", "Scaled x0.5", or the factors per axis if they differ
+    if inverse:
+        row_factor, col_factor = 1 / row_factor, 1 / col_factor
+    if row_factor == col_factor:
+        return f"Scaled x{row_factor:g}"
+    return f"Scaled x{row_factor:g} vertically, x{col_factor:g} horizontally"
+
+
 def questions(task, db_manager, ex):
     answers = []
     #check if grid is changed, just on task
 
-    props = db_manager.get_shared_properties(example_id=ex, batch_size=100)
+    props = db_manager.get_shared_properties(example_id=ex)
             
             # Do matching on the properties and take the first five objects
     top_5_pairs = get_top_n_pairs_unique_output(
@@ -39,10 +48,10 @@ def questions(task, db_manager, ex):
         shape_2 = np.array(shape2)
         if is_same_shape(shape_1, shape_2): 
             changes["shape"] = "No change"
-        elif is_scaled_quadratic(shape_1,shape_2): 
-            changes["shape"] = "Scaled x2"
-        elif is_scaled_quadratic_inverse(shape_1, shape_2):
-            changes["shape"] = "Scaled x0.5"
+        elif scale_factors(shape_1, shape_2) is not None:
+            changes["shape"] = describe_scale(*scale_factors(shape_1, shape_2))
+        elif scale_factors(shape_2, shape_1) is not None:
+            changes["shape"] = describe_scale(*scale_factors(shape_2, shape_1), inverse=True)
         elif is_flip(shape_1, shape_2): 
             changes["shape"] = "Flip"
         elif is_rotation(shape_1, shape_2):
@@ -103,7 +112,7 @@ def accumulate_input_output_ids(db_manager):
     # Iterate over example_id values (1, 2, 3 in this case)
     for ex in range(1, 4):  # Adjust this range if you need more examples
         # Fetch shared properties for the current example_id
-        props = db_manager.get_shared_properties(example_id=ex, batch_size=100)
+        props = db_manager.get_shared_properties(example_id=ex)
         
         # Get the top 5 unique pairs based on similarity threshold
         top_5_pairs = get_top_n_pairs_unique_output(
@@ -0,0 +1,244 @@
+from typing import Any, Callable, List, Tuple
+
+import numpy as np
+
+from dsl.dsl import Constraints
+from dsl.dsl_array import DSL_ARRAY_CASES, DSL_ARRAY_METHODS, KEEP, SKIP, object_to_array
+from dsl.program_encoding import OperatorTable
+from search.program_search_problem import OPERATOR_ERRORS, is_canonical_extension, program_goal_test
+
+# Batched evaluation of many candidate programs at once. goal_test and apply_operator look at one state at a time, so
+# with thousands of programs per depth most of the time goes to Python overhead. Here the states of a whole BFS layer
+# are stored in the array format of dsl/dsl_array.py: all states whose outcomes have the same grid dimensions on every
+# training pair form a Batch with one stacked (n, grid_height, grid_width) array per pair. An operator is applied to
+# the whole stack in one call, and the goal test compares every stack with the goal grid of its pair in one
+# vectorized equality check.
+#
+# The array operators give the outcomes of the set DSL (tests/test_dsl_array.py), so a layer holds the same states as
+# the one of BreadthFirstSearch. The exception are outcomes with pixels outside their grid (project_half on a grid of
+# odd size), which the array format cannot hold: the states are split by DSL_ARRAY_CASES before an operator is applied
+# and these are not followed. A program that solves the problem in the array format is still replayed with the set
+# DSL before it is returned.
+
+
+class Batch:
+    def __init__(self, grids, constraints, programs, last):
+        self.grids = grids              # one (n, grid_height, grid_width) int8 array per training pair
+        self.constraints = constraints  # one Constraints per training pair, shared by all n states
+        self.programs = programs        # n programs (tuples of operator codes, see dsl/program_encoding.py)
+        self.last = last                # (n,) index of the last operator of every program, -1 for the empty program
+
+    def __len__(self):
+        return len(self.programs)
+
+    def dimensions(self):
+        return tuple((constraints.grid_width, constraints.grid_height) for constraints in self.constraints)
+
+    def keys(self):
+        # one row of bytes per state: all its grids flattened and put next to each other
+        return np.concatenate([grid.reshape(len(self), -1) for grid in self.grids], axis=1)
+
+    def select(self, mask):
+        return Batch([grid[mask] for grid in self.grids], self.constraints,
+                     [program for program, keep in zip(self.programs, mask) if keep], self.last[mask])
+
+
+def concatenate_batches(batches):
+    # batches with the same dimensions, in order
+    if len(batches) == 1:
+        return batches[0]
+    return Batch([np.concatenate(grids) for grids in zip(*(batch.grids for batch in batches))], batches[0].constraints,
+                 [program for batch in batches for program in batch.programs],
+                 np.concatenate([batch.last for batch in batches]))
+
+
+def initial_batch(problem):
+    grids = [object_to_array(initial_object, constraints.grid_width, constraints.grid_height)[np.newaxis]
+             for initial_object, _, constraints in problem]
+    return Batch(grids, tuple(constraints for _, _, constraints in problem), [()], np.array([-1]))
+
+
+def split_by_cases(batch, cases):
+    # Splits the batch by the cases of an operator (see DSL_ARRAY_CASES) on every training pair. Returns a list of
+    # (keep, batch), keep tells for every training pair whether the operator leaves its grids as they are. States the
+    # operator has no outcome for on one of the pairs are left out, like apply_operator returns None for them
+    per_pair = np.stack([cases(constraints, grid) for grid, constraints in zip(batch.grids, batch.constraints)], axis=1)
+    applies = (per_pair != SKIP).all(axis=1)
+    keeps = per_pair == KEEP
+    groups = []
+    for keep in np.unique(keeps[applies], axis=0):
+        groups.append((tuple(keep.tolist()), batch.select(applies & (keeps == keep).all(axis=1))))
+    return groups
+
+
+def apply_operator_batch(batch, operator, keep=None):
+    # Applies an array operator (see DSL_ARRAY_METHODS) to all states of the batch, except on the training pairs keep
+    # (from split_by_cases) marks. Returns None if it cannot be applied to one of the training pairs, like
+    # apply_operator does for a single state
+    grids, constraints = [], []
+    for index, (grid, pair_constraints) in enumerate(zip(batch.grids, batch.constraints)):
+        if keep is not None and keep[index]:
+            grids.append(grid)
+            constraints.append(pair_constraints)
+            continue
+        try:
+            new_grid, new_constraints = operator(pair_constraints, grid)
+        except OPERATOR_ERRORS:
+            return None
+        grids.append(new_grid)
+        constraints.append(new_constraints)
+    return Batch(grids, tuple(constraints), batch.programs, batch.last)
+
+
+class GoalGrids:
+    def __init__(self, problem):
+        # the goal of every training pair drawn on a grid of the dimensions of an outcome, cached per dimensions
+        self.problem = problem
+        self.grids = {}
+
+    def get(self, index, grid_width, grid_height):
+        key = (index, grid_width, grid_height)
+        if key not in self.grids:
+            goal_state = self.problem[index][1]
+            inside = all(0 <= x < grid_width and 0 <= y < grid_height for x, y, _ in goal_state)
+            # a goal with pixels outside the grid cannot be matched by any outcome of these dimensions
+            self.grids[key] = object_to_array(goal_state, grid_width, grid_height) if inside else None
+        return self.grids[key]
+
+
+def batch_goal_test(goal_grids: GoalGrids, batch: Batch) -> np.ndarray:
+    # (n,) mask of the states of the batch whose outcomes equal the goal on every training pair
+    solved = np.ones(len(batch), dtype=bool)
+    for index, (grid, constraints) in enumerate(zip(batch.grids, batch.constraints)):
+        goal = goal_grids.get(index, constraints.grid_width, constraints.grid_height)
+        if goal is None:
+            return np.zeros(len(batch), dtype=bool)
+        solved &= (grid == goal[np.newaxis]).all(axis=(1, 2))
+    return solved
+
+
+class BatchedBreadthFirstSearch:
+    def __init__(
+        self,
+        problem: List[Tuple[Any, Any, Constraints]],
+        operators: List[Callable],
+        max_depth: int,
+        algebra: dict = None
+    ):
+        """
+        Initialize the Batched Breadth-First Search class. It generates the same layers as BreadthFirstSearch with
+        observational equivalence, but applies every operator to a whole layer at once.
+
+        Args:
+            problem: List of (initial_state, goal_state, constraints), one per training pair.
+            operators: The DSL functions programs are built from (from dsl/dsl.py). Only operators with an array
+                implementation in DSL_ARRAY_METHODS can be batched, the others are left out (see skipped_operators).
+            max_depth: Maximum program length.
+            algebra: Optional operator algebra (get_dsl_algebra in dsl/dsl_dictionary.py), only canonical programs are generated.
+        """
+        self.problem = problem
+        self.operators = [operator for operator in operators if operator.__name__ in DSL_ARRAY_METHODS]
+        self.table = OperatorTable(self.operators)
+        self.skipped_operators = [operator.__name__ for operator in operators if operator.__name__ not in DSL_ARRAY_METHODS]
+        self.array_operators = [DSL_ARRAY_METHODS[operator.__name__] for operator in self.operators]
+        self.array_cases = [DSL_ARRAY_CASES.get(operator.__name__) for operator in self.operators]
+        self.max_depth = max_depth
+        self.algebra = algebra
+        self.goal_grids = GoalGrids(problem)
+
+        # allowed[previous + 1, index] tells whether operator index may follow operator previous (-1 for none)
+        previous_operators = [None] + self.operators
+        self.allowed = np.array([[is_canonical_extension(previous, operator, algebra) for operator in self.operators]
+                                 for previous in previous_operators], dtype=bool)
+        # successors[previous + 1] numbers the distinct rows of allowed. It is part of the key of a state: a state
+        # reached by programs whose last operators allow different successors is kept once per program (see
+        # forbidden_successors in search/program_search_problem.py)
+        self.successors = np.unique(self.allowed, axis=0, return_inverse=True)[1].reshape(-1)
+
+        self.generated_per_depth = {}  # depth -> number of programs generated in the last search
+        self.states_per_depth = {}     # depth -> number of distinct states kept in the last search
+        self.rejected = 0              # programs that solved the array version but not the set version
+
+    def expand_layer(self, layer, visited, depth):
+        # every canonical extension of every state of the layer, grouped by dimensions, without the states seen before
+        children = {}
+        for batch in layer.values():
+            for index, array_operator in enumerate(self.array_operators):
+                mask = self.allowed[batch.last + 1, index]
+                if not mask.any():
+                    continue
+                parent = batch if mask.all() else batch.select(mask)
+                cases = self.array_cases[index]
+                for keep, group in [(None, parent)] if cases is None else split_by_cases(parent, cases):
+                    if keep is not None and all(keep):
+                        continue  # the operator leaves these states as they are, they were seen before
+                    child = apply_operator_batch(group, array_operator, keep)
+                    if child is None:
+                        continue
+                    child.programs = [program + (index,) for program in child.programs]
+                    child.last = np.full(len(child), index)
+                    children.setdefault(child.dimensions(), []).append(child)
+                    self.generated_per_depth[depth] = self.generated_per_depth.get(depth, 0) + len(child)
+
+        new_layer = {}
+        for dimensions, batches in children.items():
+            batch = concatenate_batches(batches)
+            # keep the first program per state, the rows are compared as bytes which is much faster than np.unique
+            # on rows (that sorts them as structured values)
+            keys = batch.keys()
+            successors = self.successors[batch.last + 1].tolist()
+            seen = visited.setdefault(dimensions, set())
+            keep = np.zeros(len(batch), dtype=bool)
+            for position, row in enumerate(keys):
+                key = (successors[position], row.tobytes())
+                if key not in seen:
+                    seen.add(key)
+                    keep[position] = True
+            if keep.any():
+                new_layer[dimensions] = batch.select(keep)
+        self.states_per_depth[depth] = sum(len(batch) for batch in new_layer.values())
+        return new_layer
+
+    def solution(self, layer):
+        # the first program of the layer that solves the problem in both formats
+        for batch in layer.values():
+            for position in np.flatnonzero(batch_goal_test(self.goal_grids, batch)):
+                program = self.table.decode(batch.programs[position])
+                if program_goal_test(self.problem, program):
+                    return program
+                self.rejected += 1
+        return None
+
+    def search(self) -> Any:
+        """
+        Perform the batched Breadth-First Search for program synthesis.
+
+        Returns:
+            The synthesized program (operators from dsl/dsl.py) if a solution is found, or None if no solution exists.
+        """
+        self.generated_per_depth = {}
+        self.states_per_depth = {}
+        self.rejected = 0
+
+        root = initial_batch(self.problem)
+        layer = {root.dimensions(): root}
+        visited = {root.dimensions(): {(int(self.successors[0]), root.keys()[0].tobytes())}}
+        self.states_per_depth[0] = 1
+
+        for depth in range(self.max_depth + 1):
+            program = self.solution(layer)
+            if program is not None:
+                return program
+            if depth == self.max_depth or not layer:
+                break
+            layer = self.expand_layer(layer, visited, depth + 1)
+
+        # Return None if no solution is found
+        return None
+
+    def stats(self):
+        # how many programs the last search generated and how many distinct states it kept per depth
+        return {
+            depth: {'generated': self.generated_per_depth.get(depth, 0), 'states': states}
+            for depth, states in sorted(self.states_per_depth.items())
+        }
@@ -1,61 +1,112 @@
 import heapq
+from itertools import count
 from typing import Any, Callable, List, Tuple
 
 from dsl.dsl import Constraints
+from dsl.memo import OperatorCache
+from dsl.program_encoding import OperatorTable
+from search.heuristics import pixel_difference
 from search.node import Node
+from search.program_search_problem import initial_state, expand, forbidden_successors, state_key
 
 class BestFirstSearch:
     def __init__(
         self,
-        problem: Tuple[List[Tuple[Any, Any]], Constraints],
-        goal_test: Callable[[Any], bool],
-        heuristic: Callable[[Any], float],
-        expand: Callable[[Any], List[Tuple[Any, float]]]
+        problem: List[Tuple[Any, Any, Constraints]],
+        goal_test: Callable[[Any, Any], bool],
+        operators: List[Callable],
+        max_depth: int,
+        heuristic: Callable[[Any, Any], float] = pixel_difference,
+        heuristic_weight: float = 1.0,
+        max_expansions: int = None,
+        operator_cache: OperatorCache = None,
+        algebra: dict = None
     ):
         """
         Initialize the Best-First Search class.
 
         Args:
-            initial_state: The starting point of the search (e.g., empty program).
-            goal_test: A function to check if a given state satisfies the synthesis goal.
-            heuristic: A function to compute the estimated cost to the goal from a given state.
-            expand: A function to generate successor states and their associated costs.
+            problem: List of (initial_state, goal_state, constraints), one per training pair.
+            goal_test: A function to check if a given state (the outcomes on all training pairs) satisfies the synthesis goal.
+            operators: The DSL functions programs are built from.
+            max_depth: Maximum program length.
+            heuristic: A function heuristic(problem, state) estimating the distance of a state to the goal, see search/heuristics.py.
+            heuristic_weight: Weight of the heuristic, nodes are ordered by cost + heuristic_weight * heuristic.
+            max_expansions: Stop after expanding this many nodes (None for no limit).
+            operator_cache: Optional OperatorCache (see dsl/memo.py) the operators are applied through.
+            algebra: Optional operator algebra (get_dsl_algebra in dsl/dsl_dictionary.py), only canonical programs are generated.
         """
         self.problem = problem
         self.goal_test = goal_test
+        self.operators = operators if operator_cache is None else operator_cache.wrap_all(operators)
+        self.table = OperatorTable(self.operators)  # programs are tuples of codes into this table, see dsl/program_encoding.py
+        self.operator_cache = operator_cache
+        self.max_depth = max_depth
+        self.algebra = algebra
         self.heuristic = heuristic
-        self.expand = expand
+        self.heuristic_weight = heuristic_weight
+        self.max_expansions = max_expansions
+        self.expansions = 0  # number of expanded nodes of the last search
+        # per operator code the operators that may not follow it, part of the key of a state (see forbidden_successors)
+        self.forbidden = [forbidden_successors(operator, self.table.operators, algebra) for operator in self.table.operators]
+
+    def make_node(self, program, cost, state) -> Node:
+        return Node(program, cost, self.heuristic_weight * self.heuristic(self.problem, state), state)
+
+    def key(self, program, state):
+        # a state reached by programs whose last operators rule out different successors is kept once per program
+        return state_key(state), self.forbidden[program[-1]] if program else frozenset()
 
     def search(self) -> Any:
         """
-        Perform Best-First Search for program synthesis.
+        Perform Best-First Search for program synthesis. With an admissible heuristic and heuristic_weight 1 this is A*
+        and returns a shortest program, the heuristics in search/heuristics.py are not admissible (one operator can fix
+        many pixels), so the program found is not necessarily the shortest one.
 
         Returns:
             The synthesized program if a solution is found, or None if no solution exists.
         """
-        # Priority queue for managing the frontier
-        frontier = []
-        heapq.heappush(frontier, Node(self.initial_state, 0, self.heuristic(self.initial_state)))
+        self.expansions = 0
+        root = self.make_node((), 0, initial_state(self.problem))
 
-        # Set for visited states to avoid redundant work
-        visited = set()
+        # Priority queue for managing the frontier. Nodes with equal f value are taken in the order they were
+        # created (by the counter), which makes the search deterministic
+        tie_breaker = count()
+        frontier = [(root.f_value, next(tie_breaker), root)]
+
+        # Cheapest cost with which we reached each state (see key), a state reached again at a higher cost is not enqueued
+        best_cost = {self.key(root.program, root.state): 0}
 
         while frontier:
             # Get the node with the lowest cost
-            current_node = heapq.heappop(frontier)
+            _, _, current_node = heapq.heappop(frontier)
             current_program = current_node.program
 
+            # Skip nodes whose state was reached more cheaply after they were enqueued
+            if current_node.cost > best_cost[self.key(current_program, current_node.state)]:
+                continue
+
             # Check if the current program solves the synthesis problem
-            if self.goal_test(self.initial_goal_pairs, current_program):
-                return current_program
+            if self.goal_test(self.problem, current_node.state):
+                return self.table.decode(current_program)
 
-            # Mark the current program as visited
-            visited.add(current_program)
+            if len(current_program) >= self.max_depth:
+                continue
+            if self.max_expansions is not None and self.expansions >= self.max_expansions:
+                break
+            self.expansions += 1
 
             # Expand the current node to generate successors
-            for successor, generation_cost in self.expand(current_program):
-                if successor not in visited:
-                    heapq.heappush(frontier, Node(successor, current_node.cost + generation_cost, self.heuristic(successor)))
+            previous_operator = self.table[current_program[-1]] if current_program else None
+            for operator, new_state, operator_cost in expand(current_node.state, self.operators, previous_operator, self.algebra):
+                new_cost = current_node.cost + operator_cost
+                new_program = current_program + (self.table.code(operator),)
+                key = self.key(new_program, new_state)
+                if key in best_cost and best_cost[key] <= new_cost:
+                    continue
+                best_cost[key] = new_cost
+                child = self.make_node(new_program, new_cost, new_state)
+                heapq.heappush(frontier, (child.f_value, next(tie_breaker), child))
 
         # Return None if no solution is found
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,191 @@
+from typing import Any, Callable, List, Tuple
+
+from dsl.dsl import Constraints
+from dsl.dsl_dictionary import get_dsl_algebra
+from search.program_search_problem import OPERATOR_ERRORS, initial_state, apply_operator, state_key
+
+# Meet-in-the-middle search. A forward BFS starts from the inputs and a backward BFS starts from the goals, the
+# backward one steps over an operator by computing a preimage of the state (an outcome the operator maps onto it).
+# As soon as a forward state equals a backward state, the forward program followed by the backward operators solves
+# the problem. For a program of length d this builds two tables of about b^(d/2) states instead of one of b^d.
+#
+# Preimages come from the inverse_of column of the operator algebra (flip_xax is its own inverse, move_left undoes
+# move_right, ...) and from the functions below for the grid mutations and projections, which have no inverse in the
+# DSL. Every preimage is checked by applying the operator forward again, so an inverse that only holds for some
+# objects (e.g. nothing was moved out of the grid) never leads to a wrong program.
+
+
+# Preimages of the grid mutations and projections
+def crop(constraints, object, left=0, top=0, right=0, bottom=0):
+    # removes the given number of lines from the borders of the grid
+    grid_width = constraints.grid_width - left - right
+    grid_height = constraints.grid_height - top - bottom
+    if grid_width <= 0 or grid_height <= 0:
+        return None
+    outcome = set((x - left, y - top, color) for x, y, color in object
+                  if left <= x < constraints.grid_width - right and top <= y < constraints.grid_height - bottom)
+    return outcome, constraints.replace(grid_width=grid_width, grid_height=grid_height)
+
+def downscale(constraints, object, factor):
+    # keeps the top left pixel of every factor x factor block
+    if constraints.grid_width % factor != 0 or constraints.grid_height % factor != 0:
+        return None
+    outcome = set((x // factor, y // factor, color) for x, y, color in object if x % factor == 0 and y % factor == 0)
+    return outcome, constraints.replace(grid_width=constraints.grid_width // factor, grid_height=constraints.grid_height // factor)
+
+GRID_PREIMAGES = {
+    'grid_add_down': lambda constraints, object: crop(constraints, object, bottom=1),
+    'grid_add_up': lambda constraints, object: crop(constraints, object, top=1),
+    'grid_add_right': lambda constraints, object: crop(constraints, object, right=1),
+    'grid_add_left': lambda constraints, object: crop(constraints, object, left=1),
+    'grid_add_up_and_down': lambda constraints, object: crop(constraints, object, top=1, bottom=1),
+    'grid_add_left_and_right': lambda constraints, object: crop(constraints, object, left=1, right=1),
+    'grid_duplicate_down': lambda constraints, object: crop(constraints, object, bottom=1),
+    'grid_duplicate_up': lambda constraints, object: crop(constraints, object, top=1),
+    'grid_duplicate_right': lambda constraints, object: crop(constraints, object, right=1),
+    'grid_duplicate_left': lambda constraints, object: crop(constraints, object, left=1),
+    'grid_duplicate_up_and_down': lambda constraints, object: crop(constraints, object, top=1, bottom=1),
+    'grid_duplicate_left_and_right': lambda constraints, object: crop(constraints, object, left=1, right=1),
+    'project_dupliate': lambda constraints, object: downscale(constraints, object, 2),
+    'project_triplicate': lambda constraints, object: downscale(constraints, object, 3),
+    'project_quintuplicate': lambda constraints, object: downscale(constraints, object, 5),
+}
+
+
+def preimage_functions(operators, algebra):
+    # maps every operator that can be stepped over backwards to a function (constraints, object) -> candidate preimage
+    by_name = {operator.__name__: operator for operator in operators}
+    preimages = {}
+    for operator in operators:
+        name = operator.__name__
+        if name in GRID_PREIMAGES:
+            preimages[operator] = GRID_PREIMAGES[name]
+            continue
+        properties = algebra.get(name, {})
+        # operator undoes the inverse, so applying the inverse first gives an object operator maps back exactly
+        inverse = by_name.get(properties.get('inverse_of'))
+        if inverse is None:
+            # or an operator in the list undoes this one
+            inverse = next((other for other in operators if algebra.get(other.__name__, {}).get('inverse_of') == name), None)
+        if inverse is not None:
+            preimages[operator] = lambda constraints, object, inverse=inverse: inverse(constraints, object)
+    return preimages
+
+
+def estimate_goal_constraints(problem):
+    # without the goal grid sizes we assume the goal grid ends at the last goal pixel
+    return [constraints.replace(grid_width=max((x for x, _, _ in goal_state), default=-1) + 1,
+                                grid_height=max((y for _, y, _ in goal_state), default=-1) + 1)
+            for _, goal_state, constraints in problem]
+
+
+class BidirectionalSearch:
+    def __init__(
+        self,
+        problem: List[Tuple[Any, Any, Constraints]],
+        operators: List[Callable],
+        max_depth: int,
+        goal_constraints: List[Constraints] = None,
+        algebra: dict = None
+    ):
+        """
+        Initialize the Bidirectional Search class.
+
+        Args:
+            problem: List of (initial_state, goal_state, constraints), one per training pair.
+            operators: The DSL functions programs are built from. Operators without a preimage are only used forward.
+            max_depth: Maximum program length, the forward and backward search each go about half of it.
+            goal_constraints: Constraints (grid size) of the goal of every training pair. Estimated from the goal
+                pixels if not given, which only works if the goal grids have no empty last rows or columns.
+            algebra: Operator algebra (get_dsl_algebra in dsl/dsl_dictionary.py), read from dsl_algebra.csv if not given.
+        """
+        self.problem = problem
+        self.operators = operators
+        self.max_depth = max_depth
+        self.goal_constraints = goal_constraints if goal_constraints is not None else estimate_goal_constraints(problem)
+        self.preimages = preimage_functions(operators, algebra if algebra is not None else get_dsl_algebra())
+        self.forward_states = 0   # size of the forward table of the last search
+        self.backward_states = 0  # size of the backward table of the last search
+
+    def goal_state(self):
+        # the goal grids with the color of the input constraints, which the operators draw with on both sides
+        return tuple((goal_state, goal_constraints.replace(color=constraints.color))
+                     for (_, goal_state, constraints), goal_constraints in zip(self.problem, self.goal_constraints))
+
+    def step_backward(self, state, operator):
+        # a state the operator maps onto state, or None if there is none we can find
+        preimage = []
+        for outcome, constraints in state:
+            try:
+                candidate = self.preimages[operator](constraints, outcome)
+            except OPERATOR_ERRORS:
+                return None
+            if candidate is None:
+                return None
+            preimage.append(candidate)
+        preimage = tuple(preimage)
+        forward = apply_operator(preimage, operator)
+        if forward is None or state_key(forward) != state_key(state):
+            return None
+        return preimage
+
+    def search(self) -> Any:
+        """
+        Perform the bidirectional search for program synthesis. Both directions are expanded a whole layer at a time,
+        always the one with the smaller frontier, so the program found is a shortest one among the programs whose
+        backward part only uses operators with a preimage.
+
+        Returns:
+            The synthesized program if a solution is found, or None if no solution exists.
+        """
+        start, goal = initial_state(self.problem), self.goal_state()
+        # state key -> (program from the input to the state) and (program from the state to the goal)
+        forward = {state_key(start): []}
+        backward = {state_key(goal): []}
+        forward_frontier, backward_frontier = [start], [goal]
+        self.forward_states, self.backward_states = 1, 1
+
+        if state_key(start) in backward:
+            return []
+
+        depth = 0
+        while depth < self.max_depth and (forward_frontier or backward_frontier):
+            depth += 1
+            expand_forward = not backward_frontier or (forward_frontier and len(forward_frontier) <= len(backward_frontier))
+            new_frontier = []
+            if expand_forward:
+                for state in forward_frontier:
+                    program = forward[state_key(state)]
+                    for operator in self.operators:
+                        new_state = apply_operator(state, operator)
+                        if new_state is None:
+                            continue
+                        key = state_key(new_state)
+                        if key in forward:
+                            continue
+                        forward[key] = program + [operator]
+                        if key in backward:
+                            self.forward_states, self.backward_states = len(forward), len(backward)
+                            return forward[key] + backward[key]
+                        new_frontier.append(new_state)
+                forward_frontier = new_frontier
+            else:
+                for state in backward_frontier:
+                    program = backward[state_key(state)]
+                    for operator in self.preimages:
+                        new_state = self.step_backward(state, operator)
+                        if new_state is None:
+                            continue
+                        key = state_key(new_state)
+                        if key in backward:
+                            continue
+                        backward[key] = [operator] + program
+                        if key in forward:
+                            self.forward_states, self.backward_states = len(forward), len(backward)
+                            return forward[key] + backward[key]
+                        new_frontier.append(new_state)
+                backward_frontier = new_frontier
+            self.forward_states, self.backward_states = len(forward), len(backward)
+
+        # Return None if no solution is found
+        return None
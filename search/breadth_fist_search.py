@@ -1,50 +1,109 @@
 from collections import deque
 from typing import Any, Callable, List, Tuple
 from dsl.dsl import Constraints
+from dsl.memo import OperatorCache
+from dsl.program_encoding import OperatorTable
+from search.node import Node
+from search.program_search_problem import initial_state, expand, forbidden_successors, state_key
 
 class BreadthFirstSearch:
     def __init__(
         self,
         problem: List[Tuple[Any, Any, Constraints]],
-        goal_test: Callable[[Any], bool],
-        operators: List [Callable],
-        max_depth: int
+        goal_test: Callable[[Any, Any], bool],
+        operators: List[Callable],
+        max_depth: int,
+        lower_bound: Callable[[Any, Any], int] = None,
+        operator_cache: OperatorCache = None,
+        algebra: dict = None,
+        observational_equivalence: bool = True
     ):
         """
-        Initialize the Best-First Search class.
+        Initialize the Breadth-First Search class. Programs are enumerated by length, so the first program found is
+        a shortest one.
 
         Args:
-            initial_state: The starting point of the search (e.g., empty program).
-            goal_test: A function to check if a given state satisfies the synthesis goal.
-            heuristic: A function to compute the estimated cost to the goal from a given state.
-            expand: A function to generate successor states and their associated costs.
+            problem: List of (initial_state, goal_state, constraints), one per training pair.
+            goal_test: A function to check if a given state (the outcomes on all training pairs) satisfies the synthesis goal.
+            operators: The DSL functions programs are built from.
+            max_depth: Maximum program length.
+            lower_bound: Optional admissible heuristic(problem, state) (see search/heuristics.py). Children that need more
+                operators than the depth limit leaves are not enqueued.
+            operator_cache: Optional OperatorCache (see dsl/memo.py) the operators are applied through.
+            algebra: Optional operator algebra (get_dsl_algebra in dsl/dsl_dictionary.py), only canonical programs are generated.
+            observational_equivalence: Keep only the first (shortest) program per fingerprint of its outcomes on all training
+                pairs (see state_key, with an algebra also forbidden_successors). Without it every program up to
+                max_depth is enumerated.
         """
         self.problem = problem
         self.goal_test = goal_test
-        self.operators = operators
+        self.operators = operators if operator_cache is None else operator_cache.wrap_all(operators)
+        self.table = OperatorTable(self.operators)  # programs are tuples of codes into this table, see dsl/program_encoding.py
+        self.operator_cache = operator_cache
         self.max_depth = max_depth
+        self.algebra = algebra
+        self.lower_bound = lower_bound
+        self.observational_equivalence = observational_equivalence
+        # per operator code the operators that may not follow it, part of the key of a state (see forbidden_successors)
+        self.forbidden = [forbidden_successors(op, self.table.operators, algebra) for op in self.table.operators]
+        self.expansions = 0  # number of expanded nodes of the last search
+        self.generated_per_depth = {}  # depth -> number of programs generated in the last search
+        self.collapsed_per_depth = {}  # depth -> number of programs dropped as equivalent to a shorter or earlier one
 
     def search(self) -> Any:
         """
-        Perform Best-First Search for program synthesis.
+        Perform Breadth-First Search for program synthesis.
 
         Returns:
             The synthesized program if a solution is found, or None if no solution exists.
         """
-        queue = deque([([])])  # Start with an empty program
+        # Start with an empty program. Every node carries the outcome of its program on all training pairs,
+        # so a child only has to apply its last operator instead of replaying the whole program
+        self.expansions = 0
+        self.generated_per_depth = {}
+        self.collapsed_per_depth = {}
+        root = Node((), 0, 0, initial_state(self.problem))
+        queue = deque([root])
+
+        # Fingerprints of the outcomes we have already reached. Programs that lead to an outcome seen before (e.g.
+        # move_left followed by move_right, or flip_xax twice) are observationally equivalent to a program that is
+        # already in the queue, and since BFS goes depth by depth that one is at most as long. With an algebra the
+        # key also holds the operators the last operator rules out, so the dropped program could not be continued
+        # in a way the kept one cannot
+        visited = {(state_key(root.state), frozenset())}
 
         while queue:
-            current_program = queue.popleft()
+            current_node = queue.popleft()
+            current_program = current_node.program
         
             # Check if the current program solves the synthesis problem
-            if self.goal_test(self.problem, current_program):
-                return current_program
+            if self.goal_test(self.problem, current_node.state):
+                return self.table.decode(current_program)
 
               # Expand search if within depth limit
             if len(current_program) < self.max_depth:
-                for op in self.operators:
-                    new_program = current_program + [op]
-                    queue.append(new_program)
+                self.expansions += 1
+                previous_operator = self.table[current_program[-1]] if current_program else None
+                for operator, new_state, _ in expand(current_node.state, self.operators, previous_operator, self.algebra):
+                    code = self.table.code(operator)
+                    depth = len(current_program) + 1
+                    self.generated_per_depth[depth] = self.generated_per_depth.get(depth, 0) + 1
+                    if self.observational_equivalence:
+                        key = (state_key(new_state), self.forbidden[code])
+                        if key in visited:
+                            self.collapsed_per_depth[depth] = self.collapsed_per_depth.get(depth, 0) + 1
+                            continue
+                        visited.add(key)
+                    if self.lower_bound is not None and depth + self.lower_bound(self.problem, new_state) > self.max_depth:
+                        continue
+                    queue.append(Node(current_program + (code,), current_node.cost + 1, 0, new_state))
     
         # Return None if no solution is found
-        return None
\ No newline at end of file
+        return None
+
+    def stats(self):
+        # how many programs the last search generated and collapsed per depth
+        return {
+            depth: {'generated': generated, 'collapsed': self.collapsed_per_depth.get(depth, 0)}
+            for depth, generated in sorted(self.generated_per_depth.items())
+        }
\ No newline at end of file
@@ -0,0 +1,139 @@
+import math
+
+import numpy as np
+
+from dsl.dsl_array import EMPTY, NUM_COLORS
+
+# Heuristics for the informed searches. A heuristic takes the problem (list of (initial, goal, constraints) per
+# training pair) and a search state (see search/program_search_problem.py) and estimates how far the outcomes of the
+# state are from the goals, summed over all training pairs. Lower is better, 0 means every outcome equals its goal.
+#
+# The distances below compare a single outcome (with its constraints) with a goal object, the heuristics are built
+# from them with summed_heuristic and lower_bound_heuristic.
+
+# Outcomes may hold pixels without an ARC color: color_max and color_min return None for an object that only has
+# pixels of color 1, and constraints.color is not checked. The distances treat all of them as one extra color, so
+# they differ from every ARC color and from empty cells.
+NO_COLOR = NUM_COLORS
+ARC_COLORS = frozenset(range(NUM_COLORS))
+
+
+# Helpers
+def pixel_array(object) -> np.ndarray:
+    # the pixels of an object as an (n, 3) array with columns x, y, color, colors that are no ARC color become NO_COLOR
+    if not object:
+        return np.empty((0, 3), dtype=np.int64)
+    return np.array([(x, y, c if c in ARC_COLORS else NO_COLOR) for x, y, c in object], dtype=np.int64)
+
+def canvas(pixels: np.ndarray, grid_width, grid_height) -> np.ndarray:
+    # draws the pixels (from pixel_array, so the colors fit into int8) on a grid of the given size, pixels outside of
+    # it are dropped
+    grid = np.full((grid_height, grid_width), EMPTY, dtype=np.int8)
+    inside = (pixels[:, 0] >= 0) & (pixels[:, 0] < grid_width) & (pixels[:, 1] >= 0) & (pixels[:, 1] < grid_height)
+    grid[pixels[inside, 1], pixels[inside, 0]] = pixels[inside, 2]
+    return grid
+
+def bounding_box(pixels: np.ndarray) -> np.ndarray:
+    # (min_x, min_y, max_x, max_y), all -1 for an empty object
+    if len(pixels) == 0:
+        return np.full(4, -1)
+    return np.concatenate([pixels[:, :2].min(axis=0), pixels[:, :2].max(axis=0)])
+
+
+# Distances between an outcome and its goal
+def hamming_distance(outcome, constraints, goal_state):
+    # number of cells that differ when outcome and goal are drawn on the same grid. The grid is the outcome grid,
+    # grown to fit the goal if the goal reaches beyond it
+    outcome_pixels, goal_pixels = pixel_array(outcome), pixel_array(goal_state)
+    grid_width = max(constraints.grid_width, goal_pixels[:, 0].max(initial=-1) + 1)
+    grid_height = max(constraints.grid_height, goal_pixels[:, 1].max(initial=-1) + 1)
+    return int(np.count_nonzero(canvas(outcome_pixels, grid_width, grid_height) != canvas(goal_pixels, grid_width, grid_height)))
+
+def bounding_box_mismatch(outcome, constraints, goal_state):
+    # sum of the differences of the bounding box coordinates
+    return int(np.abs(bounding_box(pixel_array(outcome)) - bounding_box(pixel_array(goal_state))).sum())
+
+def dimension_mismatch(outcome, constraints, goal_state):
+    # how many rows and columns the outcome grid is missing to hold the goal. The goal grid itself is not stored in
+    # the problem, so its size is estimated by the extent of the goal pixels
+    goal_pixels = pixel_array(goal_state)
+    missing_columns = max(goal_pixels[:, 0].max(initial=-1) + 1 - constraints.grid_width, 0)
+    missing_rows = max(goal_pixels[:, 1].max(initial=-1) + 1 - constraints.grid_height, 0)
+    return int(missing_columns + missing_rows)
+
+def color_histogram_l1(outcome, constraints, goal_state):
+    # L1 distance between the color histograms of outcome and goal, ignores where the pixels are
+    outcome_colors = np.bincount(pixel_array(outcome)[:, 2], minlength=NUM_COLORS + 1)
+    goal_colors = np.bincount(pixel_array(goal_state)[:, 2], minlength=NUM_COLORS + 1)
+    return int(np.abs(outcome_colors - goal_colors).sum())
+
+def shape_iou_distance(outcome, constraints, goal_state):
+    # 1 - intersection over union of the shapes, both moved to the origin and ignoring colors. 0 if the shapes are
+    # equal up to a translation
+    outcome_pixels, goal_pixels = pixel_array(outcome), pixel_array(goal_state)
+    if len(outcome_pixels) == 0 or len(goal_pixels) == 0:
+        return 0.0 if len(outcome_pixels) == len(goal_pixels) else 1.0
+    outcome_shape = outcome_pixels[:, :2] - outcome_pixels[:, :2].min(axis=0)
+    goal_shape = goal_pixels[:, :2] - goal_pixels[:, :2].min(axis=0)
+    width, height = np.maximum(outcome_shape.max(axis=0), goal_shape.max(axis=0)) + 1
+    outcome_mask = np.zeros((height, width), dtype=bool)
+    goal_mask = np.zeros((height, width), dtype=bool)
+    outcome_mask[outcome_shape[:, 1], outcome_shape[:, 0]] = True
+    goal_mask[goal_shape[:, 1], goal_shape[:, 0]] = True
+    return 1.0 - np.count_nonzero(outcome_mask & goal_mask) / np.count_nonzero(outcome_mask | goal_mask)
+
+def centroid_offset(outcome, constraints, goal_state):
+    # manhattan distance between the centroids of the outcome and the goal
+    outcome_pixels, goal_pixels = pixel_array(outcome), pixel_array(goal_state)
+    if len(outcome_pixels) == 0 or len(goal_pixels) == 0:
+        return 0.0 if len(outcome_pixels) == len(goal_pixels) else math.inf
+    return float(np.abs(outcome_pixels[:, :2].mean(axis=0) - goal_pixels[:, :2].mean(axis=0)).sum())
+
+
+# Heuristics
+def summed_heuristic(distance):
+    # heuristic(problem, state) that sums distance over all training pairs
+    def heuristic(problem, state):
+        return sum(distance(outcome, constraints, goal_state) for (outcome, constraints), (_, goal_state, _) in zip(state, problem))
+    heuristic.__name__ = distance.__name__
+    return heuristic
+
+def lower_bound_heuristic(distance, max_change_per_operator=None):
+    """
+    Admissible heuristic from a distance: a lower bound on the number of operators still needed.
+
+    The same program runs on all training pairs, so the bound of the state is the largest bound of its pairs. Without
+    max_change_per_operator the bound is 1 for every pair that is not solved yet. This holds for any DSL, since the
+    edge moves and projections can change every distance above by an arbitrary amount in one step. If the operators
+    of the search change the distance by at most max_change_per_operator per step (e.g. 1 for centroid_offset with
+    the single step moves only), the bound is ceil(distance / max_change_per_operator).
+    """
+    def heuristic(problem, state):
+        bound = 0
+        for (outcome, constraints), (_, goal_state, _) in zip(state, problem):
+            value = distance(outcome, constraints, goal_state)
+            if value <= 0:
+                continue
+            pair_bound = 1 if max_change_per_operator is None else math.ceil(value / max_change_per_operator)
+            bound = max(bound, pair_bound)
+        return bound
+    heuristic.__name__ = distance.__name__ + '_lower_bound'
+    return heuristic
+
+def pixel_difference(problem, state):
+    # number of pixels that are in the outcome or in the goal but not in both (a pixel with the wrong color counts twice)
+    return sum(len(outcome ^ goal_state) for (outcome, _), (_, goal_state, _) in zip(state, problem))
+
+def no_heuristic(problem, state):
+    # turns the best-first search into a uniform cost search
+    return 0
+
+hamming = summed_heuristic(hamming_distance)
+bounding_box_heuristic = summed_heuristic(bounding_box_mismatch)
+dimension_heuristic = summed_heuristic(dimension_mismatch)
+color_histogram_distance = summed_heuristic(color_histogram_l1)
+shape_iou = summed_heuristic(shape_iou_distance)
+centroid = summed_heuristic(centroid_offset)
+
+# 0 for solved states and 1 otherwise, admissible for any set of operators
+unsolved_lower_bound = lower_bound_heuristic(hamming_distance)
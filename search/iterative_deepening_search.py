@@ -0,0 +1,147 @@
+import time
+from typing import Any, Callable, List, Tuple
+
+from dsl.dsl import Constraints
+from dsl.memo import OperatorCache
+from dsl.program_encoding import OperatorTable
+from search.heuristics import pixel_difference
+from search.program_search_problem import initial_state, expand, state_key
+
+
+class BudgetExhausted(Exception):
+    # raised inside the depth first search when the time or node budget is used up
+    pass
+
+
+class IterativeDeepeningSearch:
+    def __init__(
+        self,
+        problem: List[Tuple[Any, Any, Constraints]],
+        goal_test: Callable[[Any, Any], bool],
+        operators: List[Callable],
+        max_depth: int,
+        time_budget: float = None,
+        node_budget: int = None,
+        heuristic: Callable[[Any, Any], float] = pixel_difference,
+        operator_cache: OperatorCache = None,
+        algebra: dict = None
+    ):
+        """
+        Initialize the Iterative Deepening Search class. It runs a depth first search with depth limit 0, 1, ...,
+        max_depth, so it finds a shortest program like BreadthFirstSearch but only keeps the current path in memory
+        instead of a whole layer of programs.
+
+        Args:
+            problem: List of (initial_state, goal_state, constraints), one per training pair.
+            goal_test: A function to check if a given state (the outcomes on all training pairs) satisfies the synthesis goal.
+            operators: The DSL functions programs are built from.
+            max_depth: Maximum program length.
+            time_budget: Seconds after which the search stops (None for no limit).
+            node_budget: Number of visited nodes after which the search stops (None for no limit).
+            heuristic: heuristic(problem, state) (see search/heuristics.py). Children are visited in the order of
+                their heuristic value, and the state with the lowest value is kept as best partial result.
+            operator_cache: Optional OperatorCache (see dsl/memo.py) the operators are applied through.
+            algebra: Optional operator algebra (get_dsl_algebra in dsl/dsl_dictionary.py), only canonical programs are generated.
+        """
+        self.problem = problem
+        self.goal_test = goal_test
+        self.operators = operators if operator_cache is None else operator_cache.wrap_all(operators)
+        self.table = OperatorTable(self.operators)  # programs are tuples of codes into this table, see dsl/program_encoding.py
+        self.operator_cache = operator_cache
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.node_budget = node_budget
+        self.heuristic = heuristic
+        self.algebra = algebra
+
+        # results of the last search
+        self.nodes = 0                   # number of visited nodes over all iterations
+        self.depth_completed = -1        # largest depth limit that was searched completely
+        self.budget_exhausted = False
+        self.best_codes = ()             # program with the lowest heuristic value seen so far (as codes)
+        self.best_score = None
+        self.elapsed = 0.0
+
+    @property
+    def best_program(self):
+        return self.table.decode(self.best_codes)
+
+    def check_budget(self):
+        self.nodes += 1
+        if self.node_budget is not None and self.nodes > self.node_budget:
+            raise BudgetExhausted
+        if self.time_budget is not None and time.monotonic() - self.start > self.time_budget:
+            raise BudgetExhausted
+
+    def visit(self, program, score):
+        # counts the node and remembers it if it is the best partial result so far (ties go to the shorter program)
+        self.check_budget()
+        if self.best_score is None or score < self.best_score or (score == self.best_score and len(program) < len(self.best_codes)):
+            self.best_score = score
+            self.best_codes = program
+
+    def depth_limited_search(self, program, state, score, limit, path_keys):
+        # depth first search below state (with heuristic value score), path_keys holds the states on the current path
+        # to avoid cycles
+        self.visit(program, score)
+        if self.goal_test(self.problem, state):
+            return self.table.decode(program)
+        if len(program) >= limit:
+            return None
+
+        previous_operator = self.table[program[-1]] if program else None
+        children = [(self.heuristic(self.problem, new_state), operator, new_state)
+                    for operator, new_state, _ in expand(state, self.operators, previous_operator, self.algebra)]
+        # most promising children first, the sort is stable so equal values keep the operator order
+        children.sort(key=lambda child: child[0])
+        for child_score, operator, new_state in children:
+            key = state_key(new_state)
+            if key in path_keys:
+                continue
+            path_keys.add(key)
+            result = self.depth_limited_search(program + (self.table.code(operator),), new_state, child_score, limit, path_keys)
+            path_keys.discard(key)
+            if result is not None:
+                return result
+        return None
+
+    def search(self) -> Any:
+        """
+        Perform Iterative Deepening Search for program synthesis.
+
+        Returns:
+            The synthesized program if a solution is found, or None if no solution exists or the budget ran out.
+            In both cases best_program holds the best partial result and stats() describes the search.
+        """
+        self.start = time.monotonic()
+        self.nodes = 0
+        self.depth_completed = -1
+        self.budget_exhausted = False
+        self.best_codes = ()
+        self.best_score = None
+
+        root = initial_state(self.problem)
+        root_score = self.heuristic(self.problem, root)
+        try:
+            for limit in range(self.max_depth + 1):
+                program = self.depth_limited_search((), root, root_score, limit, {state_key(root)})
+                if program is not None:
+                    return program
+                self.depth_completed = limit
+        except BudgetExhausted:
+            self.budget_exhausted = True
+        finally:
+            self.elapsed = time.monotonic() - self.start
+
+        # Return None if no solution is found
+        return None
+
+    def stats(self):
+        return {
+            'nodes': self.nodes,
+            'depth_completed': self.depth_completed,
+            'budget_exhausted': self.budget_exhausted,
+            'elapsed': self.elapsed,
+            'best_program': [operator.__name__ for operator in self.best_program],
+            'best_score': self.best_score,
+        }
@@ -1,11 +1,12 @@
-from typing import Callable, List
+from typing import Any, Tuple
 
 class Node:
-    def __init__(self, program: List[Callable], cost: float, heuristic_value: float):
-        self.program = program 
+    def __init__(self, program: Tuple[int, ...], cost: float, heuristic_value: float, state: Any = None):
+        self.program = program  # tuple of operator codes, see dsl/program_encoding.py
         self.cost = cost
         self.heuristic_value = heuristic_value
         self.f_value = cost + heuristic_value
+        self.state = state  # outcome of the program on every training pair, see search/program_search_problem.py
 
     def __lt__(self, other: 'Node') -> bool:
         return self.f_value < other.f_value
@@ -0,0 +1,190 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product, repeat
+from typing import Any, Callable, List, Tuple
+
+from dsl.dsl import Constraints
+from dsl.memo import OperatorCache
+from dsl.program_encoding import OperatorTable
+from search.program_search_problem import initial_state, apply_operator, is_canonical_extension, state_key
+
+# Parallel exhaustive search. For every program length 1, 2, ..., max_depth the programs are split by their first
+# prefix_depth operators, and every prefix is searched depth first by a worker process. Programs are ordered by the
+# position of their operators in the operator list, so the prefixes are numbered in lexicographic order and the
+# program returned is always the lexicographically first of the shortest programs, no matter how many workers run or
+# which of them finishes first.
+#
+# A worker that finds a program writes the number of its prefix to a shared value. Workers on later prefixes see it and
+# stop, workers on earlier prefixes keep going, since a program they find comes first.
+
+CANCEL_CHECK_INTERVAL = 64  # nodes between two looks at the shared value
+
+_worker = {}  # problem, goal_test, operators, algebra and the shared value of the current process
+
+
+class Cancelled(Exception):
+    # raised inside a worker when an earlier prefix already has a program
+    pass
+
+
+def _init_worker(problem, goal_test, operators, algebra, solved_rank, operator_cache=None):
+    # the operators are wrapped here, the wrapped functions cannot be sent to a worker process
+    if operator_cache is not None:
+        operators = operator_cache.wrap_all(operators)
+    _worker.update(problem=problem, goal_test=goal_test, operators=operators, algebra=algebra, solved_rank=solved_rank)
+
+
+def _cancelled(rank):
+    return _worker['solved_rank'].value < rank
+
+
+def _depth_first(state, program, length, rank, failed, counter):
+    # program is a tuple of operator codes (positions in the operator list), failed holds (state key, remaining length, previous operator) of the
+    # states that have no solution (with an algebra the allowed next operators depend on the previous one)
+    problem, operators, algebra = _worker['problem'], _worker['operators'], _worker['algebra']
+    counter[0] += 1
+    if counter[0] % CANCEL_CHECK_INTERVAL == 0 and _cancelled(rank):
+        raise Cancelled
+
+    remaining = length - len(program)
+    if remaining == 0:
+        return program if _worker['goal_test'](problem, state) else None
+
+    key = (state_key(state), remaining, program[-1] if algebra is not None and program else None)
+    if key in failed:
+        return None
+
+    previous_operator = operators[program[-1]] if program else None
+    for index, operator in enumerate(operators):
+        if not is_canonical_extension(previous_operator, operator, algebra):
+            continue
+        new_state = apply_operator(state, operator)
+        if new_state is None:
+            continue
+        result = _depth_first(new_state, program + (index,), length, rank, failed, counter)
+        if result is not None:
+            return result
+
+    # every path below this state was searched in order, so reaching it again with the same remaining length is
+    # pointless (and a lexicographically earlier program cannot be found that way)
+    failed.add(key)
+    return None
+
+
+def _search_prefix(prefix, length, rank):
+    # searches all programs of the given length that start with prefix, returns the first one that solves the problem
+    problem, operators, algebra = _worker['problem'], _worker['operators'], _worker['algebra']
+    if _cancelled(rank):
+        return None
+
+    state = initial_state(problem)
+    previous_operator = None
+    for index in prefix:
+        operator = operators[index]
+        if not is_canonical_extension(previous_operator, operator, algebra):
+            return None
+        state = apply_operator(state, operator)
+        if state is None:
+            return None
+        previous_operator = operator
+
+    try:
+        program = _depth_first(state, tuple(prefix), length, rank, set(), [0])
+    except Cancelled:
+        return None
+
+    if program is not None:
+        solved_rank = _worker['solved_rank']
+        with solved_rank.get_lock():
+            if rank < solved_rank.value:
+                solved_rank.value = rank
+    return program
+
+
+class ParallelSearch:
+    def __init__(
+        self,
+        problem: List[Tuple[Any, Any, Constraints]],
+        goal_test: Callable[[Any, Any], bool],
+        operators: List[Callable],
+        max_depth: int,
+        workers: int = None,
+        prefix_depth: int = 2,
+        algebra: dict = None,
+        operator_cache: OperatorCache = None
+    ):
+        """
+        Initialize the Parallel Search class.
+
+        Args:
+            problem: List of (initial_state, goal_state, constraints), one per training pair.
+            goal_test: A function to check if a given state (the outcomes on all training pairs) satisfies the synthesis goal.
+            operators: The DSL functions programs are built from, their order defines the lexicographic order. They are
+                sent to the worker processes, so they have to be plain module level functions (pass operator_cache
+                instead of operators wrapped by an OperatorCache).
+            max_depth: Maximum program length.
+            workers: Number of worker processes (None for one per core, 1 runs in this process).
+            prefix_depth: Length of the prefixes the programs are split by, len(operators) ** prefix_depth tasks per length.
+            algebra: Optional operator algebra (get_dsl_algebra in dsl/dsl_dictionary.py), only canonical programs are
+                generated and the result is the lexicographically first shortest canonical program.
+            operator_cache: Optional OperatorCache (see dsl/memo.py) the operators are applied through. With one worker
+                this cache is used, otherwise every worker process fills its own cache with the same limits (a cache
+                cannot be shared between processes), and operator_cache itself stays as it is.
+        """
+        self.problem = problem
+        self.goal_test = goal_test
+        self.operators = operators
+        self.table = OperatorTable(operators)
+        self.max_depth = max_depth
+        self.workers = workers
+        self.prefix_depth = prefix_depth
+        self.algebra = algebra
+        self.operator_cache = operator_cache
+        self.tasks = 0  # number of prefixes searched in the last search
+
+    def search_length(self, length, map_function):
+        # searches all programs of exactly this length, map_function (map or executor.map) returns the results in prefix order
+        prefixes = list(product(range(len(self.operators)), repeat=min(self.prefix_depth, length)))
+        self.solved_rank.value = len(prefixes)  # no prefix solved yet
+        self.tasks += len(prefixes)
+        for program in map_function(_search_prefix, prefixes, repeat(length), range(len(prefixes))):
+            if program is not None:
+                return self.table.decode(program)
+        return None
+
+    def search(self) -> Any:
+        """
+        Perform the parallel search for program synthesis.
+
+        Returns:
+            The lexicographically first shortest program, or None if there is no program up to max_depth.
+        """
+        self.tasks = 0
+        if self.goal_test(self.problem, initial_state(self.problem)):
+            return []
+
+        self.solved_rank = multiprocessing.Value('i', 0)
+        initargs = (self.problem, self.goal_test, self.operators, self.algebra, self.solved_rank)
+
+        if self.workers == 1:
+            _init_worker(*initargs, self.operator_cache)
+            for length in range(1, self.max_depth + 1):
+                program = self.search_length(length, map)
+                if program is not None:
+                    return program
+            return None
+
+        if self.operator_cache is not None:
+            # an empty cache, every worker unpickles its own copy
+            initargs += (OperatorCache(self.operator_cache.max_entries, self.operator_cache.max_pixels),)
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=initargs)
+        try:
+            for length in range(1, self.max_depth + 1):
+                # executor.map yields the results in prefix order, so the first program is the lexicographically first
+                program = self.search_length(length, executor.map)
+                if program is not None:
+                    return program
+            return None
+        finally:
+            # the workers on later prefixes stop on their own, the ones that did not start yet are dropped
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -1,25 +1,91 @@
 from typing import List, Callable
-from dsl import DSL_METHODS
 
-def _goal_test(initial_state, goal_state, constraints, program) -> bool:
-    outcome = initial_state
+# A search state holds, for every training pair, the outcome of the program so far together with the constraints
+# (grid dimensions) that outcome lives in. Storing it on the search nodes means a child only applies its last operator.
+
+# The failures an operator may legitimately raise for an outcome it cannot be applied to, e.g. x_max of an object
+# without pixels (ValueError). Anything else is a bug in the DSL and is not hidden by the searches.
+OPERATOR_ERRORS = (IndexError, ValueError)
+
+def initial_state(problem):
+    return tuple((initial_object, constraints) for initial_object, _, constraints in problem)
+
+def apply_operator(state, operator):
+    # Extends a state by one operator. Returns None if the operator cannot be applied to one of the outcomes
+    # (e.g. all pixels were moved out of the grid, see OPERATOR_ERRORS)
+    new_state = []
+    for outcome, constraints in state:
+        # Operators never modify their inputs, so states can be shared between sibling nodes
+        try:
+            new_outcome, new_constraints = operator(constraints, outcome)
+        except OPERATOR_ERRORS:
+            return None
+        new_state.append((new_outcome, new_constraints))
+    return tuple(new_state)
+
+def execute_program(problem, program):
+    # Runs a whole program from the initial state; the searches use apply_operator instead
+    state = initial_state(problem)
     for step in program:
-        outcome = step(constraints, outcome)
-    return outcome == goal_state
-
-def goal_test(problem, program):
-    initial_goal_state_pairs = problem
-    for initial_state, goal_state, constraints in initial_goal_state_pairs:
-        if not _goal_test(initial_state, goal_state, constraints, program):
-            return False 
+        state = apply_operator(state, step)
+        if state is None:
+            return None
+    return state
+
+def goal_test(problem, state):
+    for (outcome, _), (_, goal_state, _) in zip(state, problem):
+        if outcome != goal_state:
+            return False
+    return True
+
+def program_goal_test(problem, program):
+    # Checks a program by replaying it on all training pairs
+    state = execute_program(problem, program)
+    return state is not None and goal_test(problem, state)
+
+def state_key(state):
+    # Canonical key of a state (pixels plus grid dimensions on all training pairs).
+    # Two programs with the same key are interchangeable for the rest of the search.
+    return tuple((frozenset(outcome), constraints.grid_width, constraints.grid_height) for outcome, constraints in state)
+
+def is_canonical_extension(previous_operator, operator, algebra):
+    # Uses the operator algebra (see get_dsl_algebra in dsl/dsl_dictionary.py) to decide whether operator may follow
+    # previous_operator. Pairs that undo each other or repeat an idempotent operator are equivalent to a shorter
+    # program, and of two commuting operators only the alphabetical order is kept, so every program is only
+    # enumerated in one ordering
+    if previous_operator is None or algebra is None:
+        return True
+    previous_name, name = previous_operator.__name__, operator.__name__
+    properties = algebra.get(name)
+    if properties is None:
+        return True
+    if properties['inverse_of'] == previous_name:
+        return False
+    if name == previous_name and properties['idempotent']:
+        return False
+    if previous_name in properties['commutes_with'] and name < previous_name:
+        return False
     return True
 
-def heuristic(program):
-    # Estimate how far the program is from the goal (lower is better)
-    return len(program)  # Example: shorter programs are better
+def forbidden_successors(previous_operator, operators, algebra):
+    # The operators is_canonical_extension does not allow after previous_operator. With an algebra two programs that
+    # reach the same state are only interchangeable if they may also be continued with the same operators: the first
+    # program to reach a state may end with an operator that rules out the continuation the second one needs. The
+    # searches that keep one program per state therefore key their states by state_key and this set
+    if previous_operator is None or algebra is None:
+        return frozenset()
+    return frozenset(operator.__name__ for operator in operators
+                     if not is_canonical_extension(previous_operator, operator, algebra))
 
-def expand(program: List[Callable]):
-    # Generate possible expansions of the current program
-    # Each expansion is a tuple (new_program, cost_of_expansion)
-    candidates = [program.copy().append() for func in DSL_METHODS]
-    return candidates
+def expand(state, operators: List[Callable], previous_operator=None, algebra=None):
+    # Generates the successors of a state as (operator, new_state, cost) tuples, every operator costs 1.
+    # Operators that cannot be applied to the state are left out, and with an algebra also the ones that would not
+    # give a canonical program (see is_canonical_extension)
+    successors = []
+    for operator in operators:
+        if not is_canonical_extension(previous_operator, operator, algebra):
+            continue
+        new_state = apply_operator(state, operator)
+        if new_state is not None:
+            successors.append((operator, new_state, 1))
+    return successors
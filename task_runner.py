@@ -0,0 +1,109 @@
+# Predicting many tasks and writing the submission. Nothing in here needs arckit or the knowledge graph, main.py passes
+# its predict_output to predict_tasks
+
+import csv
+import signal
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+
+class TaskTimeout(BaseException):
+    # Raised by the alarm of predict_with_timeout. It is no Exception, so the "except Exception" handlers in the
+    # knowledge graph and search code the task is running in cannot swallow it
+    pass
+
+
+def predict_with_timeout(predict, task, timeout):
+    # Runs predict(task) in a worker process. A task that fails or takes longer than timeout seconds gets no prediction, so a single task cannot stall the whole run
+    def raise_timeout(signum, frame):
+        raise TaskTimeout
+
+    use_alarm = timeout is not None and hasattr(signal, "SIGALRM")  # no SIGALRM on windows, there the timeout is ignored
+    if use_alarm:
+        signal.signal(signal.SIGALRM, raise_timeout)
+        signal.alarm(timeout)
+    try:
+        return predict(task)
+    except TaskTimeout:
+        print(f"Task {task.id} timed out after {timeout} seconds")
+        return None
+    except Exception as e:
+        print(f"Task {task.id} failed: {e}")
+        return None
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+
+def predict_tasks(predict, tasks, workers=None, timeout=None):
+    # Tasks are independent, so we predict them in a pool of worker processes (by default one per core). The predictions are returned in task order.
+    # predict has to be a function at the top level of a module, so the workers can unpickle it
+    tasks = list(tasks)
+    if workers == 1:
+        return [predict_with_timeout(predict, task, timeout) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(predict_with_timeout, repeat(predict), tasks, repeat(timeout)))
+
+
+# array flattener from kaggle to put the output in the correct format as required by the arckit evaluator
+def flatten_prediction(prediction):
+    str_pred = str([row for row in prediction])
+    str_pred = str_pred.replace(", ", "")
+    str_pred = str_pred.replace("[[", "|")
+    str_pred = str_pred.replace("][", "|")
+    str_pred = str_pred.replace("]]", "|")
+    return str_pred
+
+
+def submit_task(task, predictions):
+    task_id = task.id
+
+    # TODO transform predictions from np.arrays to list format
+
+
+    if predictions is None or not predictions.any():  # If no solution: return shark picture
+        fail_pred = [
+            [0, 0, 0, 0, 1, 1, 1, 0, 0, 0],
+            [0, 0, 0, 1, 1, 1, 1, 1, 0, 0],
+            [0, 0, 1, 1, 1, 1, 1, 1, 0, 0],
+            [0, 1, 1, 1, 1, 1, 1, 1, 0, 0],
+            [0, 1, 1, 1, 1, 1, 1, 1, 0, 0],
+            [0, 0, 1, 1, 1, 1, 1, 0, 0, 0],
+            [0, 0, 0, 1, 1, 1, 0, 0, 0, 0],
+            [0, 0, 0, 0, 1, 1, 0, 0, 0, 0],
+            [0, 0, 0, 1, 1, 0, 0, 0, 0, 0],
+            [0, 0, 0, 1, 0, 0, 0, 0, 0, 0],
+        ]
+
+        predictions = np.array(fail_pred)
+
+    # flatten prediction
+    flattened_pred = flatten_prediction(predictions.tolist())
+
+    # for i, pred in enumerate(predictions):
+    #         flat_pred = flatten_prediction(predictions[i])
+    #         writer.writerow([f"{task_id}_{i}", flat_pred + " " + flat_pred])
+
+
+    # since right now, we are only making one guess, we just repeat it twice to fill up our guesses (checking correctness does not take long). Further, we ignore tasks with two training inputs so we just output the prediction for the first twice.
+    with open("submission.csv", "a") as submission:
+        writer = csv.writer(submission, quoting=csv.QUOTE_NONE)
+
+        if len(task.test) == 2:
+            writer.writerow([f'{task_id}_0', flattened_pred + ' ' + flattened_pred])
+            writer.writerow([f'{task_id}_1', flattened_pred + ' ' + flattened_pred])
+        else:
+            print(len(task.test))
+            writer.writerow([f'{task_id}_0', flattened_pred + ' ' + flattened_pred])
+
+
+
+def write_submission(tasks, predictions):
+    with open("submission.csv", "w") as submission:
+        writer = csv.writer(submission, quoting=csv.QUOTE_NONE)
+        writer.writerow(["output_id", "output"])
+
+    for task, task_predictions in zip(tasks, predictions):
+        submit_task(task, task_predictions)
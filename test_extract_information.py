@@ -28,7 +28,7 @@ for i in range(min(20, len(train_set))):
 
 
         # Get shared properties for the specific example_id
-        shared_properties = db_manager.get_shared_properties(example_id=1, batch_size=50)
+        shared_properties = db_manager.get_shared_properties(example_id=1)
 
         # Sort the shared properties by normalized similarity
         sorted_properties = sorted(shared_properties, key=lambda x: x['normalized_similarity'], reverse=True)
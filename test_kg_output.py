@@ -18,7 +18,7 @@ def print_kg_output(task):
 
     example_id = 1
     
-    shared_properties = db_manager.get_shared_properties(example_id=example_id, batch_size=50)
+    shared_properties = db_manager.get_shared_properties(example_id=example_id)
     print("Total rows in shared_properties:", len(shared_properties))
 
 
@@ -0,0 +1,116 @@
+# Random grids and plain reference versions of the knowledge graph functions, shared by the tests of knowledge_graph/
+
+import numpy as np
+from scipy.ndimage import binary_dilation, label
+
+from grid_utils.morphology import StructuringElementMode
+
+MODES = ["direct", "diagonal", "8-way"]
+
+
+def random_grid(seed):
+    rng = np.random.default_rng(seed)
+    height, width = rng.integers(1, 12, size=2)
+    # few colors and a lot of background, so there are components of many sizes
+    return np.where(rng.random((height, width)) < 0.4, 0, rng.integers(1, 4, size=(height, width)))
+
+
+def reference_label_components(grid, example_id, mode):
+    # one call of label per color and one mask per component
+    structure = StructuringElementMode(mode).get_structuring_element()
+    out = np.zeros_like(grid, dtype=int)
+    for color_value in np.unique(grid):
+        if color_value == 0:
+            continue
+        labeled_mask, n_components = label(grid == color_value, structure=structure)
+        for comp_id in range(1, n_components + 1):
+            out[labeled_mask == comp_id] = 10_000 * example_id + color_value * 1000 + comp_id
+    return out
+
+
+def reference_object(labeled, lbl):
+    # bounding box, pixel count, centroid and shape of one label from its coordinates
+    coordinates = np.argwhere(labeled == lbl)
+    (min_row, min_col), (max_row, max_col) = coordinates.min(axis=0), coordinates.max(axis=0)
+    shape = (labeled[min_row:max_row + 1, min_col:max_col + 1] == lbl).astype(int)
+    return min_row, min_col, max_row - min_row + 1, max_col - min_col + 1, len(coordinates), coordinates.mean(axis=0), shape
+
+
+def reference_adjacency(labeled_array, mode):
+    # one dilation per label
+    structure = StructuringElementMode(mode).get_structuring_element()
+    adjacency = {}
+    for lbl in np.unique(labeled_array):
+        if lbl == 0:
+            continue
+        neighbor_labels = np.unique(labeled_array[binary_dilation(labeled_array == lbl, structure=structure)])
+        adjacency[lbl] = set(neighbor_labels[(neighbor_labels != 0) & (neighbor_labels != lbl)])
+    return adjacency
+
+
+def upscaled(shape, row_factor, col_factor):
+    return np.kron(shape, np.ones((row_factor, col_factor), dtype=int))
+
+
+def random_shapes(seed, count=40):
+    # small shapes, so many of them are rotations, flips or scaled versions of each other
+    rng = np.random.default_rng(seed)
+    shapes = []
+    for _ in range(count):
+        shape = (rng.random(tuple(rng.integers(1, 4, size=2))) < 0.6).astype(int)
+        if rng.random() < 0.3:
+            shape = upscaled(shape, *rng.integers(1, 4, size=2))
+        shapes.append(shape)
+    return shapes
+
+
+def as_tuple(shape):
+    return shape.shape, tuple(np.asarray(shape).ravel().tolist())
+
+
+def rotations(shape):
+    return {as_tuple(np.rot90(shape, k)) for k in range(4)}
+
+
+def rotations_and_flips(shape):
+    return rotations(shape) | rotations(shape.T)
+
+
+def random_shape_pairs(seed, count=60):
+    # a second shape that is often an upscaled version of the first one, sometimes with one cell flipped
+    rng = np.random.default_rng(seed)
+    pairs = []
+    for _ in range(count):
+        shape1 = (rng.random(tuple(rng.integers(1, 4, size=2))) < 0.6).astype(int)
+        if rng.random() < 0.6:
+            shape2 = upscaled(shape1, *rng.integers(1, 4, size=2))
+            if rng.random() < 0.3:
+                shape2[tuple(rng.integers(dimension) for dimension in shape2.shape)] ^= 1
+        else:
+            shape2 = (rng.random(tuple(rng.integers(1, 7, size=2))) < 0.6).astype(int)
+        pairs.append((shape1, shape2))
+    return pairs
+
+
+def reference_scale_factors(shape1, shape2):
+    # try every pair of factors the dimensions allow
+    (rows1, cols1), (rows2, cols2) = shape1.shape, shape2.shape
+    for row_factor in range(1, rows2 + 1):
+        for col_factor in range(1, cols2 + 1):
+            if (rows1 * row_factor, cols1 * col_factor) == (rows2, cols2) and np.array_equal(
+                    upscaled(shape1, row_factor, col_factor), shape2):
+                return row_factor, col_factor
+    return None
+
+
+def reference_is_scaled_quadratic(shape1, shape2):
+    # the cell by cell check of the first version
+    r1, c1 = shape1.shape
+    r2, c2 = shape2.shape
+    if r2 != 2 * r1 or c2 != 2 * c1:
+        return False
+    for i in range(r1):
+        for j in range(c1):
+            if not np.all(shape2[2 * i:2 * i + 2, 2 * j:2 * j + 2] == shape1[i, j]):
+                return False
+    return True
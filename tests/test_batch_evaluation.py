@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from dsl import dsl
+from dsl.dsl import Constraints
+from dsl.dsl_dictionary import get_dsl_algebra
+from search.batch_evaluation import BatchedBreadthFirstSearch
+from search.breadth_fist_search import BreadthFirstSearch
+from search.program_search_problem import goal_test, program_goal_test
+
+OPERATORS = [dsl.flip_xax, dsl.flip_yax, dsl.move_right, dsl.move_left, dsl.move_down, dsl.move_up_edge,
+             dsl.move_right_edge, dsl.grid_add_down, dsl.grid_duplicate_left, dsl.project_dupliate, dsl.project_half]
+
+
+def fits(object, constraints):
+    return all(0 <= x < constraints.grid_width and 0 <= y < constraints.grid_height for x, y, _ in object)
+
+
+def inside_grid(operator):
+    # the array format cannot hold pixels outside the grid, so the batched search does not follow those states
+    def operator_inside_grid(constraints, object):
+        outcome, outcome_constraints = operator(constraints, object)
+        if not fits(outcome, outcome_constraints):
+            raise ValueError("pixels outside the grid")
+        return outcome, outcome_constraints
+    operator_inside_grid.__name__ = operator.__name__
+    return operator_inside_grid
+
+
+def random_problem(rng, length):
+    # like the goals of a task, the goal of every training pair lies in its grid
+    while True:
+        problem = try_random_problem(rng, length)
+        if problem is not None:
+            return problem
+
+
+def try_random_problem(rng, length):
+    program = [OPERATORS[index] for index in rng.integers(len(OPERATORS), size=length)]
+    problem = []
+    for _ in range(2):
+        grid_width, grid_height = int(rng.integers(2, 6)), int(rng.integers(2, 6))
+        colors = rng.integers(10, size=(grid_height, grid_width))
+        rows, columns = np.nonzero(rng.random((grid_height, grid_width)) < 0.4)
+        object = set(zip(columns.tolist(), rows.tolist(), colors[rows, columns].tolist()))
+        constraints = Constraints(color=int(rng.integers(10)), grid_width=grid_width, grid_height=grid_height)
+        outcome, outcome_constraints = object, constraints
+        for operator in program:
+            try:
+                outcome, outcome_constraints = operator(outcome_constraints, outcome)
+            except ValueError:
+                return None
+        if not fits(outcome, outcome_constraints):
+            return None
+        problem.append((object, outcome, constraints))
+    return problem
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_same_layers_as_breadth_first_search(seed):
+    rng = np.random.default_rng(seed)
+    problem = random_problem(rng, int(rng.integers(1, 4)))
+    reference = BreadthFirstSearch(problem, goal_test, [inside_grid(operator) for operator in OPERATORS], max_depth=3)
+    expected = reference.search()
+    search = BatchedBreadthFirstSearch(problem, OPERATORS, max_depth=3)
+    program = search.search()
+    assert (program is None) == (expected is None)
+    if program is not None:
+        assert len(program) == len(expected)
+        assert program_goal_test(problem, program)
+    assert search.rejected == 0
+    # the layers both searches went through completely hold the same distinct states
+    reference_stats = reference.stats()
+    for depth in range(1, 4 if expected is None else len(expected) + 1):
+        stats = reference_stats.get(depth, {'generated': 0, 'collapsed': 0})
+        assert search.states_per_depth.get(depth, 0) == stats['generated'] - stats['collapsed']
+
+
+def test_algebra_and_skipped_operators():
+    problem = [({(0, 0, 3), (1, 1, 4)}, {(2, 3, 4), (3, 2, 3)}, Constraints(color=2, grid_width=4, grid_height=4))]
+    search = BatchedBreadthFirstSearch(problem, OPERATORS + [dsl.color_object_max], max_depth=3,
+                                       algebra=get_dsl_algebra())
+    program = search.search()
+    assert search.skipped_operators == ['color_object_max']
+    assert program is not None and program_goal_test(problem, program)
+    assert len(program) == len(BreadthFirstSearch(problem, goal_test, OPERATORS, max_depth=3).search())
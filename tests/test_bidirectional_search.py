@@ -0,0 +1,51 @@
+import pytest
+
+from dsl import dsl
+from dsl.dsl import Constraints
+from dsl.dsl_dictionary import get_dsl_algebra
+from search.bidirectional_search import BidirectionalSearch
+from search.program_search_problem import program_goal_test
+
+
+OPERATORS = [dsl.flip_xax, dsl.flip_yax, dsl.move_left, dsl.move_right, dsl.grid_add_down, dsl.grid_duplicate_left,
+             dsl.project_dupliate]
+
+
+def make_problem(objects, program, grid_width=3, grid_height=3):
+    problem, goal_constraints = [], []
+    for object in objects:
+        constraints = Constraints(color=2, grid_width=grid_width, grid_height=grid_height)
+        outcome = object
+        for operator in program:
+            outcome, constraints = operator(constraints, outcome)
+        problem.append((object, outcome, Constraints(color=2, grid_width=grid_width, grid_height=grid_height)))
+        goal_constraints.append(constraints)
+    return problem, goal_constraints
+
+
+def test_finds_a_program_through_preimages():
+    program = [dsl.flip_xax, dsl.grid_add_down, dsl.grid_duplicate_left, dsl.project_dupliate]
+    problem, goal_constraints = make_problem([{(0, 0, 3), (1, 0, 4), (2, 2, 5)}, {(0, 1, 6), (2, 0, 7)}], program)
+    search = BidirectionalSearch(problem, OPERATORS, len(program), goal_constraints=goal_constraints,
+                                 algebra=get_dsl_algebra())
+    found = search.search()
+    assert found is not None and len(found) <= len(program)
+    assert program_goal_test(problem, found)
+    assert search.backward_states > 1
+
+
+def test_step_backward_skips_failed_preimages_but_not_bugs():
+    problem, goal_constraints = make_problem([{(0, 0, 3)}], [dsl.move_left])
+    search = BidirectionalSearch(problem, OPERATORS, 2, goal_constraints=goal_constraints, algebra=get_dsl_algebra())
+    empty_state = ((set(), goal_constraints[0]),)
+
+    # an operator that cannot be applied to an object without pixels (x_min raises ValueError)
+    search.preimages[dsl.flip_xax] = dsl.move_left_edge
+    assert search.step_backward(empty_state, dsl.flip_xax) is None
+
+    def broken(constraints, object):
+        return object.missing_method(), constraints
+
+    search.preimages[dsl.flip_xax] = broken
+    with pytest.raises(AttributeError):
+        search.step_backward(empty_state, dsl.flip_xax)
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from dsl import dsl
+from dsl.dsl import Constraints
+from dsl.dsl_dictionary import get_dsl_algebra
+from search.batch_evaluation import BatchedBreadthFirstSearch
+from search.best_first_search import BestFirstSearch
+from search.breadth_fist_search import BreadthFirstSearch
+from search.heuristics import no_heuristic
+from search.program_search_problem import forbidden_successors, goal_test, program_goal_test
+
+OPERATORS = [dsl.flip_xax, dsl.flip_yax, dsl.move_right, dsl.move_left, dsl.move_up, dsl.move_down,
+             dsl.move_left_edge, dsl.move_down_edge, dsl.color_object_max, dsl.fill_pixel_right, dsl.grid_add_down]
+
+
+def random_problem(rng, length):
+    program = [OPERATORS[index] for index in rng.integers(len(OPERATORS), size=length)]
+    problem = []
+    for _ in range(int(rng.integers(1, 3))):
+        grid_width, grid_height = int(rng.integers(2, 4)), int(rng.integers(2, 4))
+        colors = rng.integers(3, size=(grid_height, grid_width))
+        rows, columns = np.nonzero(rng.random((grid_height, grid_width)) < 0.5)
+        object = set(zip(columns.tolist(), rows.tolist(), colors[rows, columns].tolist()))
+        constraints = Constraints(color=0, grid_width=grid_width, grid_height=grid_height)
+        outcome, outcome_constraints = object, constraints
+        for operator in program:
+            try:
+                outcome, outcome_constraints = operator(outcome_constraints, outcome)
+            except ValueError:
+                break
+        problem.append((object, outcome, constraints))
+    return problem
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_algebra_keeps_the_shortest_programs(seed):
+    rng = np.random.default_rng(seed)
+    problem = random_problem(rng, int(rng.integers(1, 5)))
+    expected = BreadthFirstSearch(problem, goal_test, OPERATORS, max_depth=4).search()
+    program = BreadthFirstSearch(problem, goal_test, OPERATORS, max_depth=4, algebra=get_dsl_algebra()).search()
+    assert (program is None) == (expected is None)
+    if program is not None:
+        assert len(program) == len(expected)
+        assert program_goal_test(problem, program)
+
+
+# flip_xax and flip_yax give the same state on this object, but the algebra only allows move_left (which gives the
+# goal) after flip_yax. The state has to be kept for both programs, whichever reaches it first
+def relation(inverse_of):
+    return {'inverse_of': inverse_of, 'idempotent': False, 'commutes_with': set(), 'changes_dimensions': False}
+
+ALGEBRA = {'move_left': relation('flip_xax'), 'flip_xax': relation('move_left'), 'flip_yax': relation('move_left')}
+CONSTRAINTS = Constraints(color=0, grid_width=3, grid_height=3)
+PROBLEM = [({(0, 0, 1), (2, 2, 1)}, {(1, 0, 1)}, CONSTRAINTS)]
+SEARCHES = {
+    'breadth_first': lambda algebra: BreadthFirstSearch(PROBLEM, goal_test, [dsl.flip_xax, dsl.flip_yax, dsl.move_left],
+                                                        max_depth=3, algebra=algebra),
+    'best_first': lambda algebra: BestFirstSearch(PROBLEM, goal_test, [dsl.flip_xax, dsl.flip_yax, dsl.move_left],
+                                                  max_depth=3, heuristic=no_heuristic, algebra=algebra),
+    'batched': lambda algebra: BatchedBreadthFirstSearch(PROBLEM, [dsl.flip_xax, dsl.flip_yax, dsl.move_left],
+                                                         max_depth=3, algebra=algebra),
+}
+
+
+def test_forbidden_successors():
+    operators = [dsl.flip_xax, dsl.flip_yax, dsl.move_left]
+    assert forbidden_successors(dsl.flip_xax, operators, ALGEBRA) == {'move_left'}
+    assert forbidden_successors(dsl.move_left, operators, ALGEBRA) == {'flip_xax', 'flip_yax'}
+    assert forbidden_successors(None, operators, ALGEBRA) == frozenset()
+    assert forbidden_successors(dsl.flip_xax, operators, None) == frozenset()
+
+
+@pytest.mark.parametrize("search", SEARCHES)
+def test_state_is_kept_for_each_set_of_allowed_successors(search):
+    assert dsl.flip_xax(CONSTRAINTS, PROBLEM[0][0])[0] == dsl.flip_yax(CONSTRAINTS, PROBLEM[0][0])[0]
+    program = SEARCHES[search](ALGEBRA).search()
+    assert [operator.__name__ for operator in program] == ['flip_yax', 'move_left']
+    assert len(SEARCHES[search](None).search()) == 2
+
+
+@pytest.mark.parametrize("algebra", [None, get_dsl_algebra()])
+@pytest.mark.parametrize("seed", range(30))
+def test_observational_equivalence_finds_the_same_program(seed, algebra):
+    rng = np.random.default_rng(seed)
+    problem = random_problem(rng, int(rng.integers(1, 4)))
+    plain = BreadthFirstSearch(problem, goal_test, OPERATORS, max_depth=3, algebra=algebra, observational_equivalence=False)
+    collapsing = BreadthFirstSearch(problem, goal_test, OPERATORS, max_depth=3, algebra=algebra)
+    assert collapsing.search() == plain.search()
+    assert collapsing.expansions <= plain.expansions
+
+
+def test_stats_count_the_collapsed_programs():
+    # no program gives color 7, so every program that is kept and shorter than max_depth is expanded
+    problem = [({(0, 0, 1), (1, 2, 2)}, {(0, 0, 7)}, CONSTRAINTS)]
+    plain = BreadthFirstSearch(problem, goal_test, OPERATORS, max_depth=3, observational_equivalence=False)
+    collapsing = BreadthFirstSearch(problem, goal_test, OPERATORS, max_depth=3)
+    assert plain.search() is None and collapsing.search() is None
+
+    assert all(counts['collapsed'] == 0 for counts in plain.stats().values())
+    assert plain.expansions == 1 + plain.stats()[1]['generated'] + plain.stats()[2]['generated']
+    stats = collapsing.stats()
+    assert stats[1]['generated'] == plain.stats()[1]['generated']
+    kept = {depth: counts['generated'] - counts['collapsed'] for depth, counts in stats.items()}
+    assert collapsing.expansions == 1 + kept[1] + kept[2] < plain.expansions
+    assert kept[3] < plain.stats()[3]['generated']
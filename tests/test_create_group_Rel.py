@@ -0,0 +1,43 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from kg_helpers import as_tuple, random_shapes, upscaled
+from knowledge_graph.create_group_Rel import group_is_scaled
+
+
+def reference_group_is_scaled(shapes1, shapes2):
+    # the smallest factors for which the upscaled shapes1 are the shapes of shapes2, in any order
+    if len(shapes1) != len(shapes2) or not shapes1:
+        return None
+    targets = Counter(as_tuple(shape) for shape in shapes2)
+    for row_factor in range(1, shapes2[0].shape[0] + 1):
+        for col_factor in range(1, shapes2[0].shape[1] + 1):
+            if Counter(as_tuple(upscaled(shape, row_factor, col_factor)) for shape in shapes1) == targets:
+                return row_factor, col_factor
+    return None
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_group_is_scaled_matches_every_factor_pair(seed):
+    rng = np.random.default_rng(seed)
+    shapes1 = random_shapes(seed, count=int(rng.integers(1, 4)))
+    shapes2 = [upscaled(shape, *rng.integers(1, 4, size=2)) for shape in shapes1]
+    if rng.random() < 0.5:
+        # the same factors for every shape
+        row_factor, col_factor = rng.integers(1, 4, size=2)
+        shapes2 = [upscaled(shape, row_factor, col_factor) for shape in shapes1]
+    shapes2 = [shapes2[index] for index in rng.permutation(len(shapes2))]
+    assert group_is_scaled(shapes1, shapes2) == reference_group_is_scaled(shapes1, shapes2)
+
+
+def test_group_is_scaled():
+    shapes = [np.array([[1, 0], [1, 1]]), np.array([[1]]), np.array([[1, 1, 0]])]
+    scaled = [upscaled(shape, 2, 3) for shape in reversed(shapes)]
+    assert group_is_scaled(shapes, scaled) == (2, 3)
+    assert group_is_scaled(shapes, shapes) == (1, 1)
+    # one shape scaled by other factors, or a shape missing
+    assert group_is_scaled(shapes, scaled[:2] + [upscaled(shapes[0], 2, 2)]) is None
+    assert group_is_scaled(shapes, scaled[:2]) is None
+    assert group_is_scaled([], []) is None
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from kg_helpers import MODES, random_grid, reference_label_components, reference_object
+from knowledge_graph.create_obj import (
+    extract_object_records,
+    extract_object_shapes,
+    label_components,
+    label_components_with_stats,
+    label_coordinates_dict,
+)
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("seed", range(30))
+def test_labels_match_one_label_call_per_color(seed, mode):
+    grid = random_grid(seed)
+    expected = reference_label_components(grid, 2, mode)
+    labeled, labels, bboxes, counts = label_components_with_stats(grid, 2, mode)
+    assert np.array_equal(labeled, expected)
+    assert labels.tolist() == sorted(set(expected.ravel().tolist()) - {0})
+    for lbl, (rows, cols), count in zip(labels, bboxes, counts):
+        coordinates = np.argwhere(expected == lbl)
+        assert (rows.start, cols.start) == tuple(coordinates.min(axis=0))
+        assert (rows.stop, cols.stop) == tuple(coordinates.max(axis=0) + 1)
+        assert count == len(coordinates)
+    assert np.array_equal(label_components(grid, 2, mode), expected)
+
+
+def test_empty_grid():
+    labeled, labels, bboxes, counts = label_components_with_stats(np.zeros((3, 4), dtype=int), 1)
+    assert not labeled.any() and labeled.shape == (3, 4)
+    assert len(labels) == 0 and bboxes == [] and len(counts) == 0
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        label_components(np.ones((2, 2), dtype=int), 1, mode="4-way")
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_label_coordinates_dict(seed):
+    labeled = label_components(random_grid(seed), 1)
+    expected = {lbl: list(zip(*np.where(labeled == lbl))) for lbl in np.unique(labeled) if lbl != 0}
+    assert label_coordinates_dict(labeled) == expected
+
+
+@pytest.mark.parametrize("with_stats", [False, True])
+@pytest.mark.parametrize("seed", range(30))
+def test_records_match_the_objects_of_every_label(seed, with_stats):
+    grid = random_grid(seed)
+    labeled, labels, bboxes, counts = label_components_with_stats(grid, 3, "8-way")
+    records = extract_object_records(labeled, labels, bboxes, counts) if with_stats else extract_object_records(labeled)
+    assert records['id'].tolist() == sorted(set(labeled.ravel().tolist()) - {0})
+    for record in records:
+        min_row, min_col, height, width, count, centroid, shape = reference_object(labeled, record['id'])
+        assert record['color'] == grid[labeled == record['id']][0]
+        assert (record['bbox_x'], record['bbox_y'], record['bbox_height'], record['bbox_width']) == (min_row, min_col, height, width)
+        assert record['pixel_count'] == count
+        assert np.allclose((record['centroid_row'], record['centroid_col']), centroid)
+        assert np.array_equal(record['shape'], shape)
+    shapes = extract_object_shapes(labeled)
+    assert list(shapes) == records['id'].tolist()
+    assert all(np.array_equal(shapes[lbl], reference_object(labeled, lbl)[-1]) for lbl in shapes)
+
+
+def test_no_records_for_an_empty_grid():
+    records = extract_object_records(np.zeros((2, 2), dtype=int))
+    assert len(records) == 0
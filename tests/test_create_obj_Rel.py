@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from kg_helpers import (
+    MODES,
+    random_grid,
+    random_shape_pairs,
+    reference_adjacency,
+    reference_is_scaled_quadratic,
+    reference_scale_factors,
+)
+from knowledge_graph.create_obj import label_components
+from knowledge_graph.create_obj_Rel import (
+    adjacency_matrix,
+    get_adjacent_label_pairs,
+    get_object_adjacency,
+    is_scaled,
+    is_scaled_quadratic,
+    is_scaled_quadratic_inverse,
+    scale_factors,
+    upscale,
+)
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("seed", range(30))
+def test_adjacency_matches_one_dilation_per_label(seed, mode):
+    labeled = label_components(random_grid(seed), 1, mode="direct")
+    expected = reference_adjacency(labeled, mode)
+    assert get_object_adjacency(labeled, mode) == expected
+
+    pairs = get_adjacent_label_pairs(labeled, mode)
+    assert pairs.tolist() == sorted([first, second] for first in expected for second in expected[first] if first < second)
+
+    labels = np.array(sorted(expected))
+    matrix = adjacency_matrix(labels, pairs).toarray()
+    assert matrix.tolist() == [[second in expected[first] for second in labels] for first in labels]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_scale_factors_match_every_factor_pair(seed):
+    for shape1, shape2 in random_shape_pairs(seed):
+        factors = reference_scale_factors(shape1, shape2)
+        assert scale_factors(shape1, shape2) == factors
+        assert is_scaled(shape1, shape2) == (factors is not None and factors != (1, 1))
+        assert is_scaled(shape1, shape2, factor=factors) == (factors is not None)
+        assert is_scaled_quadratic(shape1, shape2) == reference_is_scaled_quadratic(shape1, shape2)
+        assert is_scaled_quadratic_inverse(shape2, shape1) == reference_is_scaled_quadratic(shape1, shape2)
+
+
+def test_scale_factors_of_different_rows_and_columns():
+    shape = np.array([[1, 0], [1, 1]])
+    assert scale_factors(shape, upscale(shape, 3, 2)) == (3, 2)
+    assert is_scaled(shape, upscale(shape, 2, 2), factor=2)
+    assert not is_scaled(shape, upscale(shape, 3, 2), factor=2)
+    assert scale_factors(upscale(shape, 2, 2), shape) is None
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("arckit")
+
+from kg_helpers import as_tuple, random_shapes, rotations, rotations_and_flips, upscaled
+from knowledge_graph.create_obj_Rel import reduce_scale
+from knowledge_graph.create_obj_groups import canonical_shape_key, rotation_shape_key, scaled_shape_key, shape_key
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_keys_are_equal_exactly_for_equivalent_shapes(seed):
+    shapes = random_shapes(seed)
+    keys = [(shape_key(shape), rotation_shape_key(shape), canonical_shape_key(shape)) for shape in shapes]
+    for first, first_keys in zip(shapes, keys):
+        for second, second_keys in zip(shapes, keys):
+            assert (first_keys[0] == second_keys[0]) == (as_tuple(first) == as_tuple(second))
+            assert (first_keys[1] == second_keys[1]) == (as_tuple(second) in rotations(first))
+            assert (first_keys[2] == second_keys[2]) == (as_tuple(second) in rotations_and_flips(first))
+
+
+def test_shape_key_keeps_the_dimensions():
+    # the same bits in different dimensions are different shapes
+    assert shape_key(np.ones((1, 4), dtype=int)) != shape_key(np.ones((2, 2), dtype=int))
+    assert shape_key(np.array([[0, 1, 0, 1]])) == shape_key(np.array([[0, 2, 0, 5]]))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_reduce_scale_finds_the_smallest_base(seed):
+    for shape in random_shapes(seed):
+        base, row_factor, col_factor = reduce_scale(shape)
+        assert np.array_equal(upscaled(base, row_factor, col_factor), shape)
+        # no base with larger factors exists: every divisor of the dimensions that reproduces the shape divides the factors
+        for rows in range(1, shape.shape[0] + 1):
+            for cols in range(1, shape.shape[1] + 1):
+                if shape.shape[0] % rows == 0 and shape.shape[1] % cols == 0 and np.array_equal(
+                        upscaled(shape[::rows, ::cols], rows, cols), shape):
+                    assert row_factor % rows == 0 and col_factor % cols == 0
+        assert scaled_shape_key(shape) == shape_key(base)
+
+
+def test_scaled_shape_key():
+    base = np.array([[1, 0], [1, 1]])
+    assert scaled_shape_key(upscaled(base, 2, 3)) == scaled_shape_key(base) == shape_key(base)
+    assert scaled_shape_key(base.T) != scaled_shape_key(base)
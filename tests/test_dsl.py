@@ -0,0 +1,29 @@
+from dsl import dsl
+from dsl.dsl import Constraints
+
+CONSTRAINTS = Constraints(color=5, grid_width=5, grid_height=5)
+SQUARE = {(x, y, 1) for x in range(1, 4) for y in range(1, 4)}  # 3x3 square, (2, 2) is its only inner pixel
+BORDER = SQUARE - {(2, 2, 1)}
+
+
+def test_pixel_in_and_pixel_out():
+    object = set(SQUARE)
+    assert dsl.pixel_out(CONSTRAINTS, object) == BORDER
+    # pixel_in returns the object without its inner pixels
+    assert dsl.pixel_in(CONSTRAINTS, object) == BORDER
+    assert object == SQUARE
+
+
+def test_change_color_pixel_in_and_out():
+    recolored = {(x, y, 5) for x, y, _ in BORDER}
+    inside, _ = dsl.change_color_pixel_in(CONSTRAINTS, SQUARE)
+    assert inside == BORDER | recolored
+    outside, _ = dsl.change_color_pixel_out(CONSTRAINTS, SQUARE)
+    assert outside == BORDER | recolored
+
+
+def test_isolate(capsys):
+    outcome, constraints = dsl.isolate(CONSTRAINTS, SQUARE)
+    assert outcome == {(x - 1, y - 1, 1) for x, y, _ in SQUARE}
+    assert (constraints.grid_width, constraints.grid_height) == (3, 3)
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from dsl import dsl
+from dsl.dsl import Constraints
+from dsl.dsl_array import (
+    APPLY, DSL_ARRAY_CASES, DSL_ARRAY_METHODS, EMPTY, KEEP, SKIP, array_to_object, object_to_array,
+)
+
+
+def random_object(rng, grid_width, grid_height):
+    kind = rng.integers(4)
+    if kind == 0:
+        return set()
+    if kind == 1:
+        # an upscaled object, so the projections onto smaller grids have something to reduce
+        factor = int(rng.choice([2, 3, 5]))
+        base = rng.integers(-3, 10, size=(max(grid_height // factor, 1), max(grid_width // factor, 1)))
+        grid = np.kron(base, np.ones((factor, factor), dtype=int))[:grid_height, :grid_width]
+    else:
+        # sparse or dense pixels, a lot of color 1 which color_max leaves out
+        colors = rng.choice([1, 1, 1, 2, 3, 4, 5, 6, 7, 8, 9, 0], size=(grid_height, grid_width))
+        grid = np.where(rng.random((grid_height, grid_width)) < rng.random(), colors, -1)
+    rows, columns = np.nonzero(grid >= 0)
+    return set(zip(columns.tolist(), rows.tolist(), grid[rows, columns].tolist()))
+
+
+def random_cases(count):
+    rng = np.random.default_rng(count)
+    for _ in range(count):
+        grid_width, grid_height = int(rng.integers(1, 16)), int(rng.integers(1, 16))
+        yield Constraints(color=int(rng.integers(10)), grid_width=grid_width, grid_height=grid_height), \
+            random_object(rng, grid_width, grid_height)
+
+
+def fits(object, constraints):
+    return all(0 <= x < constraints.grid_width and 0 <= y < constraints.grid_height for x, y, _ in object)
+
+
+@pytest.mark.parametrize("name", sorted(DSL_ARRAY_METHODS))
+def test_array_operator_matches_set_operator(name):
+    set_operator, array_operator = getattr(dsl, name), DSL_ARRAY_METHODS[name]
+    cases_of = DSL_ARRAY_CASES.get(name, lambda constraints, grid: APPLY)
+    seen = set()
+    for constraints, object in random_cases(400):
+        grid = object_to_array(object, constraints.grid_width, constraints.grid_height)
+        case = int(cases_of(constraints, grid))
+        seen.add(case)
+        try:
+            expected, expected_constraints = set_operator(constraints, object)
+        except ValueError:
+            assert case == SKIP
+            with pytest.raises(ValueError):
+                array_operator(constraints, grid)
+            continue
+
+        if case == SKIP:
+            # the set version has an outcome, but the array format cannot hold it
+            assert not fits(expected, expected_constraints)
+            with pytest.raises(ValueError):
+                array_operator(constraints, grid)
+            continue
+
+        outcome, outcome_constraints = array_operator(constraints, grid)
+        assert outcome.shape == (expected_constraints.grid_height, expected_constraints.grid_width)
+        assert outcome_constraints == expected_constraints
+        assert array_to_object(outcome) == expected
+        if case == KEEP:
+            assert expected == object and expected_constraints == constraints
+    if name in DSL_ARRAY_CASES:
+        assert APPLY in seen and SKIP in seen
+
+
+@pytest.mark.parametrize("name", sorted(DSL_ARRAY_METHODS))
+def test_stack_gives_the_outcomes_of_single_grids(name):
+    array_operator = DSL_ARRAY_METHODS[name]
+    cases_of = DSL_ARRAY_CASES.get(name)
+    constraints = Constraints(color=4, grid_width=10, grid_height=10)
+    rng = np.random.default_rng(1)
+    stack = np.stack([object_to_array(random_object(rng, 10, 10), 10, 10) for _ in range(60)])
+    if cases_of is not None:
+        stack = stack[cases_of(constraints, stack) == APPLY]
+    outcome, outcome_constraints = array_operator(constraints, stack)
+    for grid, grid_outcome in zip(stack, outcome):
+        single_outcome, single_constraints = array_operator(constraints, grid)
+        assert single_constraints == outcome_constraints
+        assert np.array_equal(single_outcome, grid_outcome)
+
+
+def test_pixels_without_a_color_are_not_drawn():
+    grid = object_to_array({(0, 0, None), (1, 0, 3)}, 2, 1)
+    assert grid.tolist() == [[EMPTY, 3]]
+
+
+def test_reduce_ties_and_color_1_like_color_max():
+    # the top left block has two pixels of color 1, one of 5 and one of 3
+    object = {(0, 0, 1), (1, 0, 1), (0, 1, 5), (1, 1, 3), (3, 3, 1)}
+    constraints = Constraints(color=0, grid_width=4, grid_height=4)
+    expected, _ = dsl.project_half(constraints, object)
+    assert expected == {(0, 0, 3)}
+    outcome, _ = DSL_ARRAY_METHODS['project_half'](constraints, object_to_array(object, 4, 4))
+    assert array_to_object(outcome) == expected
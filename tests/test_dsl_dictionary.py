@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from dsl import dsl
+from dsl.dsl import Constraints
+from dsl.dsl_dictionary import get_dsl_algebra
+
+ALGEBRA = get_dsl_algebra()
+OPERATORS = {name: getattr(dsl, name) for name in ALGEBRA}
+# the operators that keep the grid, they move pixels beyond it and back
+WALK_OPERATORS = [OPERATORS[name] for name in sorted(ALGEBRA) if not ALGEBRA[name]['changes_dimensions']]
+
+
+def apply(operator, constraints, object):
+    # the outcome and constraints, or None if the operator fails on the object like in the searches
+    try:
+        return operator(constraints, object)
+    except (ValueError, IndexError):
+        return None
+
+
+def then(outcome, operator):
+    return None if outcome is None else apply(operator, outcome[1], outcome[0])
+
+
+def reachable_states(seed):
+    # a random object and the states after a few random operators, which can leave pixels beyond the grid
+    rng = np.random.default_rng(seed)
+    width, height = int(rng.integers(2, 5)), int(rng.integers(2, 5))
+    object = {(x, y, int(rng.integers(1, 4))) for x in range(width) for y in range(height) if rng.random() < 0.4}
+    constraints = Constraints(color=int(rng.integers(0, 4)), grid_width=width, grid_height=height)
+    states = [(object, constraints)]
+    for _ in range(int(rng.integers(0, 4))):
+        outcome = apply(WALK_OPERATORS[int(rng.integers(len(WALK_OPERATORS)))], constraints, object)
+        if outcome is None:
+            break
+        object, constraints = outcome
+        states.append(outcome)
+    return states
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_relations_hold_on_reachable_states(seed):
+    for index in range(200):
+        for state in reachable_states(seed * 200 + index):
+            for name, properties in ALGEBRA.items():
+                operator = OPERATORS[name]
+                if properties['inverse_of']:
+                    first = then(state, OPERATORS[properties['inverse_of']])
+                    assert first is None or then(first, operator) == state, (name, state)
+                if properties['idempotent']:
+                    first = then(state, operator)
+                    assert first is None or then(first, operator) == first, (name, state)
+                for other in properties['commutes_with']:
+                    assert (then(then(state, OPERATORS[other]), operator)
+                            == then(then(state, operator), OPERATORS[other])), (name, other, state)
+
+
+def test_moves_are_no_inverses_beyond_the_grid():
+    # the second move_right drops the pixel the first one moved beyond the grid
+    constraints = Constraints(color=0, grid_width=3, grid_height=1)
+    state = ({(2, 0, 3)}, constraints)
+    moved = then(state, dsl.move_right)
+    assert moved[0] == {(3, 0, 3)}
+    assert then(then(moved, dsl.move_right), dsl.move_left) != moved
+    assert ALGEBRA['move_left']['inverse_of'] is None and ALGEBRA['move_up']['inverse_of'] is None
+
+
+def test_commutes_is_symmetric():
+    for name, properties in ALGEBRA.items():
+        for other in properties['commutes_with']:
+            assert name in ALGEBRA[other]['commutes_with']
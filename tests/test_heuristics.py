@@ -0,0 +1,62 @@
+import math
+
+import pytest
+
+from dsl import dsl
+from dsl.dsl import Constraints
+from search import heuristics
+from search.best_first_search import BestFirstSearch
+from search.program_search_problem import goal_test, program_goal_test
+
+HEURISTICS = [
+    heuristics.hamming,
+    heuristics.bounding_box_heuristic,
+    heuristics.dimension_heuristic,
+    heuristics.color_histogram_distance,
+    heuristics.shape_iou,
+    heuristics.centroid,
+    heuristics.unsolved_lower_bound,
+    heuristics.pixel_difference,
+    heuristics.no_heuristic,
+]
+
+CONSTRAINTS = Constraints(color=2, grid_width=3, grid_height=3)
+
+
+def make_problem(goal):
+    return [({(0, 0, 3)}, goal, CONSTRAINTS)]
+
+
+@pytest.mark.parametrize("heuristic", HEURISTICS, ids=lambda heuristic: heuristic.__name__)
+@pytest.mark.parametrize("outcome", [
+    {(0, 0, None)},                 # color_object_max of an object with only color 1
+    {(0, 0, None), (1, 2, 4)},
+    {(0, 0, -3), (2, 1, 200)},      # no ARC colors
+    set(),
+])
+def test_heuristics_accept_pixels_without_an_arc_color(heuristic, outcome):
+    problem = make_problem({(0, 0, 4), (1, 1, 4)})
+    value = heuristic(problem, ((outcome, CONSTRAINTS),))
+    assert value >= 0 and not math.isnan(value)
+
+
+@pytest.mark.parametrize("heuristic", HEURISTICS, ids=lambda heuristic: heuristic.__name__)
+def test_solved_state_with_a_none_pixel_is_zero(heuristic):
+    goal = {(0, 0, None), (1, 1, 4)}
+    assert heuristic(make_problem(goal), ((set(goal), CONSTRAINTS),)) == 0
+
+
+def test_none_color_differs_from_empty_and_from_arc_colors():
+    assert heuristics.hamming_distance({(0, 0, None)}, CONSTRAINTS, set()) == 1
+    assert heuristics.hamming_distance({(0, 0, None)}, CONSTRAINTS, {(0, 0, 0)}) == 1
+    assert heuristics.color_histogram_l1({(0, 0, None)}, CONSTRAINTS, {(0, 0, 0)}) == 2
+    assert heuristics.unsolved_lower_bound(make_problem(set()), (({(0, 0, None)}, CONSTRAINTS),)) == 1
+
+
+def test_best_first_search_through_none_colors():
+    # color_object_max colors an object with only color 1 pixels None, the search has to score those states
+    problem = [({(0, 0, 1), (1, 0, 1)}, {(1, 0, None), (2, 0, None)}, CONSTRAINTS)]
+    search = BestFirstSearch(problem, goal_test, [dsl.move_right, dsl.color_object_max, dsl.flip_xax], max_depth=3,
+                             heuristic=heuristics.hamming)
+    program = search.search()
+    assert program is not None and program_goal_test(problem, program)
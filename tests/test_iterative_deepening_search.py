@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from dsl import dsl
+from dsl.dsl import Constraints
+from dsl.dsl_dictionary import get_dsl_algebra
+from search import iterative_deepening_search
+from search.heuristics import pixel_difference
+from search.iterative_deepening_search import IterativeDeepeningSearch
+from search.program_search_problem import execute_program, goal_test, initial_state, program_goal_test
+
+OPERATORS = [dsl.flip_xax, dsl.flip_yax, dsl.move_right, dsl.move_left, dsl.move_up, dsl.move_down]
+CONSTRAINTS = Constraints(color=2, grid_width=5, grid_height=5)
+# two moves to the right and one down, on two training pairs
+PROBLEM = [
+    ({(0, 0, 3), (1, 0, 3)}, {(2, 1, 3), (3, 1, 3)}, CONSTRAINTS),
+    ({(1, 2, 4)}, {(3, 3, 4)}, CONSTRAINTS),
+]
+
+
+def test_finds_a_shortest_program():
+    search = IterativeDeepeningSearch(PROBLEM, goal_test, OPERATORS, max_depth=4, algebra=get_dsl_algebra())
+    program = search.search()
+    assert len(program) == 3 and program_goal_test(PROBLEM, program)
+    stats = search.stats()
+    assert stats['depth_completed'] == 2 and not stats['budget_exhausted']
+    assert stats['best_program'] == [operator.__name__ for operator in program] and stats['best_score'] == 0
+
+
+def test_no_program_within_max_depth():
+    # the search is complete, the budget did not run out
+    search = IterativeDeepeningSearch(PROBLEM, goal_test, OPERATORS, max_depth=2)
+    assert search.search() is None
+    assert search.depth_completed == 2 and not search.budget_exhausted
+
+
+def test_node_budget_keeps_the_best_program():
+    search = IterativeDeepeningSearch(PROBLEM, goal_test, OPERATORS, max_depth=4, node_budget=10)
+    assert search.search() is None
+    assert search.budget_exhausted and search.nodes == 11 and search.depth_completed < 2
+
+    # the visited program closest to the goal
+    best = search.best_program
+    assert 0 < len(best) < 3
+    assert pixel_difference(PROBLEM, execute_program(PROBLEM, best)) == search.best_score
+    assert search.best_score < pixel_difference(PROBLEM, initial_state(PROBLEM))
+
+    # a second search starts from scratch
+    stats = search.stats()
+    assert search.search() is None and search.stats()['nodes'] == stats['nodes']
+    assert search.stats()['best_program'] == stats['best_program']
+
+
+def test_time_budget_stops_the_search(monkeypatch):
+    # every reading of the clock is one second later
+    clock = iter(range(1000))
+    monkeypatch.setattr(iterative_deepening_search, "time", SimpleNamespace(monotonic=lambda: next(clock)))
+    search = IterativeDeepeningSearch(PROBLEM, goal_test, OPERATORS, max_depth=4, time_budget=5)
+    assert search.search() is None
+    assert search.budget_exhausted and search.nodes == 6
+    assert search.stats()['elapsed'] == 7
@@ -0,0 +1,100 @@
+from functools import partial
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("arckit")
+pytest.importorskip("kuzu")
+
+import main
+from dsl import DSL_COLOR_METHODS, DSL_OBJECT_MOVE_METHODS, DSL_OBJECT_SHAPE_MUTATION_METHODS, dsl
+from dsl.dsl import Constraints
+from dsl.memo import OperatorCache
+from search.iterative_deepening_search import IterativeDeepeningSearch
+from search.program_search_problem import program_goal_test
+
+
+def test_predict_tasks_runs_predict_output(monkeypatch):
+    monkeypatch.setattr(main, "predict_output", lambda task: task.id)
+    assert main.predict_tasks([SimpleNamespace(id="a"), SimpleNamespace(id="b")], workers=1) == ["a", "b"]
+
+
+def move_problem():
+    # two moves to the right and one down, on two training pairs
+    constraints = Constraints(color=2, grid_width=5, grid_height=5)
+    return [
+        ({(0, 0, 3), (1, 0, 3)}, {(2, 1, 3), (3, 1, 3)}, constraints),
+        ({(1, 2, 4)}, {(3, 3, 4)}, constraints),
+    ]
+
+
+def search_operators():
+    return DSL_OBJECT_MOVE_METHODS + DSL_OBJECT_SHAPE_MUTATION_METHODS + DSL_COLOR_METHODS
+
+
+def test_batched_search_is_opt_in(monkeypatch):
+    # project_half leaves the pixel (1, 1) outside of its 1x1 grid. The batched search does not follow such states and
+    # returns move_up_edge, move_left instead
+    problem = [({(1, 1, 3), (2, 2, 3)}, {(0, 0, 3), (1, 1, 3)}, Constraints(color=2, grid_width=3, grid_height=3))]
+    assert [operator.__name__ for operator in main.search_program(problem, search_operators(), OperatorCache())] == [
+        "project_half"]
+
+    monkeypatch.setattr(main, "BATCHED_SEARCH", True)
+    assert len(main.search_program(problem, search_operators(), OperatorCache())) == 2
+
+
+def test_batched_search_runs_first(monkeypatch, capsys):
+    monkeypatch.setattr(main, "BATCHED_SEARCH", True)
+    problem = move_problem()
+    program = main.search_program(problem, search_operators(), OperatorCache())
+    assert len(program) == 3 and program_goal_test(problem, program)
+    assert "Batched search" in capsys.readouterr().out
+
+
+def test_no_program_when_every_program_was_tried(monkeypatch):
+    # the object has to move left but only move_right is available, the iterative deepening search tries every program
+    # up to its max_depth, so the closest one is not used even with USE_BEST_PROGRAM
+    monkeypatch.setattr(main, "BATCHED_SEARCH", False)
+    monkeypatch.setattr(main, "USE_BEST_PROGRAM", True)
+    problem = [({(2, 0, 3)}, {(1, 0, 3)}, Constraints(color=2, grid_width=5, grid_height=5))]
+    assert main.search_program(problem, [dsl.move_right], OperatorCache()) is None
+
+
+def test_best_program_only_when_the_budget_runs_out(monkeypatch):
+    monkeypatch.setattr(main, "BATCHED_SEARCH", False)
+    monkeypatch.setattr(main, "SEARCH_NODE_BUDGET", 1)
+    monkeypatch.setattr(main, "IterativeDeepeningSearch", partial(IterativeDeepeningSearch, node_budget=10))
+    problem = move_problem()
+    assert main.search_program(problem, search_operators(), OperatorCache()) is None
+
+    monkeypatch.setattr(main, "USE_BEST_PROGRAM", True)
+    program = main.search_program(problem, search_operators(), OperatorCache())
+    assert 0 < len(program) < 3 and not program_goal_test(problem, program)
+
+
+def test_grid_level_prediction_is_the_fallback(monkeypatch):
+    # the last row is duplicated, there is no object program
+    monkeypatch.setattr(main, "run_object_level_prediction", lambda task, dsl_fmt_task: None)
+    task = SimpleNamespace(
+        id="grid",
+        train=[
+            (np.array([[3, 0], [0, 4]]), np.array([[3, 0], [0, 4], [0, 4]])),
+            (np.array([[0, 2, 2], [6, 0, 0]]), np.array([[0, 2, 2], [6, 0, 0], [6, 0, 0]])),
+        ],
+        test=[(np.array([[5, 6], [0, 7]]), np.array([[5, 6], [0, 7], [0, 7]]))],
+    )
+    output = main.predict_output(task)
+    assert output.tolist() == [[5, 6], [0, 7], [0, 7]]
+
+
+def test_parallel_search_with_two_workers(monkeypatch):
+    # SEARCH_WORKERS > 1 searches with a ParallelSearch, it finds the same program as with one worker
+    problem = move_problem()
+    monkeypatch.setattr(main, "SEARCH_WORKERS", 2)
+    program = main.search_program(problem, search_operators(), OperatorCache())
+    assert len(program) == 3 and program_goal_test(problem, program)
+
+    monkeypatch.setattr(main, "SEARCH_WORKERS", 1)
+    monkeypatch.setattr(main, "BATCHED_SEARCH", False)
+    assert len(main.search_program(problem, search_operators(), OperatorCache())) == 3
@@ -0,0 +1,89 @@
+import pytest
+
+from dsl import dsl
+from dsl.dsl import Constraints
+from dsl.memo import OperatorCache
+
+CONSTRAINTS = Constraints(color=2, grid_width=5, grid_height=5)
+OBJECTS = [{(x, 0, 3)} for x in range(4)]  # one pixel each
+
+
+def counting(operator, calls):
+    # operator that appends the objects it is called with to calls
+    def counted(constraints, object):
+        calls.append(frozenset(object))
+        return operator(constraints, object)
+    counted.__name__ = operator.__name__
+    return counted
+
+
+def test_hits_and_misses():
+    calls = []
+    cache = OperatorCache()
+    move_right = cache.wrap(counting(dsl.move_right, calls))
+    for object in OBJECTS[:2] + OBJECTS[:2]:
+        assert move_right(CONSTRAINTS, object) == dsl.move_right(CONSTRAINTS, object)
+    assert len(calls) == 2
+    assert cache.stats() == {'hits': 2, 'misses': 2, 'hit_rate': 0.5, 'evictions': 0, 'entries': 2, 'pixels': 4}
+
+    # the same object with other constraints is another call
+    move_right(CONSTRAINTS.replace(grid_width=6), OBJECTS[0])
+    assert cache.misses == 3
+
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'evictions': 0, 'entries': 0, 'pixels': 0}
+
+
+def test_least_recently_used_call_is_evicted_first():
+    calls = []
+    cache = OperatorCache(max_entries=2)
+    move_right = cache.wrap(counting(dsl.move_right, calls))
+    move_right(CONSTRAINTS, OBJECTS[0])
+    move_right(CONSTRAINTS, OBJECTS[1])
+    move_right(CONSTRAINTS, OBJECTS[0])    # hit, OBJECTS[1] is now the least recently used
+    move_right(CONSTRAINTS, OBJECTS[2])    # evicts OBJECTS[1]
+    assert cache.evictions == 1 and len(cache.entries) == 2
+
+    del calls[:]
+    move_right(CONSTRAINTS, OBJECTS[0])
+    move_right(CONSTRAINTS, OBJECTS[2])
+    assert calls == []
+    move_right(CONSTRAINTS, OBJECTS[1])
+    assert calls == [frozenset(OBJECTS[1])]
+
+
+def test_pixels_stay_within_max_pixels():
+    cache = OperatorCache(max_pixels=10)
+    line = {(x, 1, 3) for x in range(5)}
+    move_right = cache.wrap(dsl.move_right)
+    move_right(CONSTRAINTS, line)           # 5 + 5 pixels
+    assert cache.pixels == 10 and len(cache.entries) == 1
+    move_right(CONSTRAINTS, OBJECTS[0])     # 2 more pixels, the line is evicted
+    assert cache.pixels == 2 and cache.evictions == 1
+
+    # a call with more pixels than the whole cache is not stored, and evicts nothing
+    big = {(x, y, 3) for x in range(5) for y in range(2)}
+    move_right(CONSTRAINTS, big)
+    assert cache.pixels == 2 and len(cache.entries) == 1 and cache.evictions == 1
+
+
+def test_failed_calls_are_not_cached():
+    calls = []
+    cache = OperatorCache()
+    x_min = cache.wrap(counting(lambda constraints, object: (dsl.x_min(object), constraints), calls))
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            x_min(CONSTRAINTS, set())
+    assert len(calls) == 2 and len(cache.entries) == 0
+
+
+def test_wrap_all_keeps_names_and_outcomes():
+    cache = OperatorCache()
+    operators = [dsl.move_right, dsl.flip_xax, dsl.move_down_edge]
+    wrapped = cache.wrap_all(operators)
+    assert [operator.__name__ for operator in wrapped] == [operator.__name__ for operator in operators]
+    object = {(0, 0, 3), (1, 2, 4)}
+    for operator, memoized in zip(operators, wrapped):
+        assert memoized(CONSTRAINTS, object) == operator(CONSTRAINTS, object)
+    # all wrapped operators share the cache, every operator has its own entries
+    assert cache.misses == 3 and len(cache.entries) == 3
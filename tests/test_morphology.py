@@ -0,0 +1,43 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from grid_utils.morphology import StructuringElementMode, find_enclosed_regions
+
+RING = np.array([[1, 1, 1, 1],
+                 [1, 0, 0, 1],
+                 [1, 1, 1, 1]], dtype=bool)
+
+# the background cell in the middle only touches the outside diagonally
+DIAGONAL_GAP = np.array([[0, 1, 0],
+                         [1, 0, 1],
+                         [0, 1, 0]], dtype=bool)
+
+
+def test_holes_of_any_size():
+    assert (find_enclosed_regions(RING) == ~RING).all()
+
+
+def test_mode_decides_how_the_background_connects():
+    assert find_enclosed_regions(DIAGONAL_GAP)[1, 1]
+    assert not find_enclosed_regions(DIAGONAL_GAP, mode="8-way").any()
+
+
+def test_open_shape_has_no_holes():
+    assert not find_enclosed_regions(np.array([[1, 1, 1], [1, 0, 0], [1, 1, 1]], dtype=bool)).any()
+
+
+def test_structuring_elements():
+    assert StructuringElementMode("direct").get_structuring_element().sum() == 5
+    assert StructuringElementMode("diagonal").get_structuring_element().sum() == 4
+    assert StructuringElementMode("8-way").get_structuring_element().all()
+
+
+def test_dsl_does_not_import_the_knowledge_graph():
+    # the knowledge graph pulls in arckit and kuzu, the DSL only needs the morphology
+    code = "import sys, dsl.dsl; print(any(name.startswith('knowledge_graph') for name in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=Path(__file__).resolve().parents[1])
+    assert result.stdout.strip() == "False"
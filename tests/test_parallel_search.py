@@ -0,0 +1,58 @@
+from itertools import product
+
+import pytest
+
+from dsl import dsl
+from dsl.dsl import Constraints
+from dsl.dsl_dictionary import get_dsl_algebra
+from dsl.memo import OperatorCache
+from search.parallel_search import ParallelSearch
+from search.program_search_problem import goal_test, is_canonical_extension, program_goal_test
+
+OPERATORS = [dsl.flip_xax, dsl.flip_yax, dsl.move_right, dsl.move_left, dsl.move_up, dsl.move_down]
+CONSTRAINTS = Constraints(color=2, grid_width=5, grid_height=5)
+# two moves to the right and one down, on two training pairs
+PROBLEM = [
+    ({(0, 0, 3), (1, 0, 3)}, {(2, 1, 3), (3, 1, 3)}, CONSTRAINTS),
+    ({(1, 2, 4)}, {(3, 3, 4)}, CONSTRAINTS),
+]
+
+
+def first_shortest_program(problem, operators, max_depth, algebra=None):
+    # every program in lexicographic order of the operator positions
+    for length in range(max_depth + 1):
+        for program in product(operators, repeat=length):
+            canonical = all(is_canonical_extension(previous, operator, algebra)
+                            for previous, operator in zip((None,) + program, program))
+            if canonical and program_goal_test(problem, program):
+                return list(program)
+    return None
+
+
+@pytest.mark.parametrize("algebra", [None, get_dsl_algebra()])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_lexicographically_first_shortest_program(workers, algebra):
+    search = ParallelSearch(PROBLEM, goal_test, OPERATORS, max_depth=4, workers=workers, algebra=algebra)
+    program = search.search()
+    assert program == first_shortest_program(PROBLEM, OPERATORS, 4, algebra)
+    assert len(program) == 3 and search.tasks > 0
+
+
+def test_no_program_and_empty_program():
+    assert ParallelSearch(PROBLEM, goal_test, OPERATORS, max_depth=2, workers=1).search() is None
+    solved = [(object, object, constraints) for object, _, constraints in PROBLEM]
+    assert ParallelSearch(solved, goal_test, OPERATORS, max_depth=2, workers=2).search() == []
+
+
+def test_operator_cache():
+    expected = first_shortest_program(PROBLEM, OPERATORS, 4)
+
+    # one worker applies the operators through the cache
+    cache = OperatorCache()
+    assert ParallelSearch(PROBLEM, goal_test, OPERATORS, max_depth=4, workers=1, operator_cache=cache).search() == expected
+    assert cache.stats()['misses'] > 0 and cache.stats()['hits'] > 0
+
+    # every worker process has its own cache, the one passed in is not filled
+    cache = OperatorCache()
+    assert ParallelSearch(PROBLEM, goal_test, OPERATORS, max_depth=4, workers=2, operator_cache=cache).search() == expected
+    assert cache.stats()['misses'] == 0
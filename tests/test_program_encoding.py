@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from dsl import DSL_COLOR_METHODS, DSL_OBJECT_MOVE_METHODS, DSL_OBJECT_SHAPE_MUTATION_METHODS, dsl
+from dsl.memo import OperatorCache
+from dsl.program_encoding import OperatorTable, dumps, load_programs, loads, save_programs
+
+OPERATORS = DSL_OBJECT_MOVE_METHODS + DSL_OBJECT_SHAPE_MUTATION_METHODS + DSL_COLOR_METHODS
+TABLE = OperatorTable(OPERATORS)
+
+
+def random_programs(seed, count=50):
+    rng = np.random.default_rng(seed)
+    return [[OPERATORS[index] for index in rng.integers(len(OPERATORS), size=int(rng.integers(0, 7)))]
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_round_trips(seed):
+    for program in random_programs(seed):
+        codes = TABLE.encode(program)
+        assert all(0 <= code < len(TABLE) for code in codes)
+        assert TABLE.decode(codes) == program
+        assert TABLE.unpack(TABLE.pack(codes)) == codes
+        assert loads(dumps(program), TABLE) == program
+
+
+def test_codes_are_the_positions():
+    assert TABLE.encode([OPERATORS[4], OPERATORS[0]]) == (4, 0)
+    assert TABLE[4] is OPERATORS[4] and TABLE.code(OPERATORS[4].__name__) == 4
+
+
+def test_packed_programs_differ_by_their_leading_operators():
+    # code 0 must not disappear at the front
+    assert TABLE.pack((0, 1)) != TABLE.pack((1,))
+    assert TABLE.pack((0, 0, 0)) != TABLE.pack((0,))
+
+
+def test_empty_program():
+    assert TABLE.encode([]) == ()
+    assert TABLE.decode(()) == []
+    assert TABLE.pack(()) == 0 and TABLE.unpack(0) == ()
+    assert dumps([]) == ""
+    assert loads("", TABLE) == []
+
+
+def test_unknown_name():
+    with pytest.raises(KeyError):
+        loads("move_right turn_around", TABLE)
+    # an operator that is missing from a smaller table
+    with pytest.raises(KeyError):
+        loads(dsl.flip_xax.__name__, OperatorTable(DSL_COLOR_METHODS))
+
+
+def test_duplicate_names():
+    with pytest.raises(ValueError):
+        OperatorTable([dsl.move_right, dsl.move_right])
+
+
+def test_wrapped_operators_keep_their_codes():
+    wrapped = OperatorTable(OperatorCache().wrap_all(OPERATORS))
+    program = [dsl.move_right, dsl.flip_xax]
+    assert wrapped.encode(program) == TABLE.encode(program)
+    assert dumps(wrapped.decode(TABLE.encode(program))) == dumps(program)
+
+
+def test_save_and_load_programs(tmp_path):
+    programs = {f"task_{index}": program for index, program in enumerate(random_programs(0, count=10))}
+    programs["empty"] = []
+    path = tmp_path / "programs.json"
+    save_programs(path, programs)
+    assert load_programs(path, TABLE) == programs
+
+    # the names stay valid for a table with the operators in another order
+    reordered = OperatorTable(list(reversed(OPERATORS)))
+    assert load_programs(path, reordered) == programs
@@ -0,0 +1,35 @@
+import pytest
+
+from dsl.dsl import Constraints, move_left, move_left_edge, isolate
+from search.program_search_problem import apply_operator, execute_program, program_goal_test
+
+
+def make_state(*objects):
+    return tuple((set(object), Constraints(color=2, grid_width=3, grid_height=3)) for object in objects)
+
+
+def test_apply_operator_extends_every_outcome():
+    state = apply_operator(make_state({(1, 0, 4)}, {(2, 2, 5)}), move_left)
+    assert [outcome for outcome, _ in state] == [{(0, 0, 4)}, {(1, 2, 5)}]
+
+
+def test_apply_operator_returns_none_for_an_empty_outcome():
+    # move_left drops the pixel, move_left_edge has no x_min of the empty object left
+    state = apply_operator(make_state({(0, 0, 4)}), move_left)
+    assert state == (((set(), Constraints(color=2, grid_width=3, grid_height=3))),)
+    assert apply_operator(state, move_left_edge) is None
+    assert apply_operator(state, isolate) is None
+
+
+def test_apply_operator_does_not_hide_bugs():
+    def broken(constraints, object):
+        return object.missing_method(), constraints
+
+    with pytest.raises(AttributeError):
+        apply_operator(make_state({(0, 0, 4)}), broken)
+
+
+def test_execute_program():
+    problem = [({(0, 1, 3)}, {(2, 1, 3)}, Constraints(color=2, grid_width=3, grid_height=3))]
+    assert program_goal_test(problem, [move_left_edge]) is False
+    assert execute_program(problem, [move_left, move_left_edge]) is None
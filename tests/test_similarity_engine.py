@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from knowledge_graph.similarity_engine import (
+    SIMILARITY_PROPERTIES,
+    compute_similarity_matrix,
+    optimal_one_to_one_assignment_with_valid_dummies,
+    similarity_matrix_to_shared_properties,
+)
+
+# weight of a match on every property, as the similarity was scored pair by pair before the NumPy engine
+REFERENCE_WEIGHTS = {"color": 5, "bbox_x": 5, "bbox_y": 5, "bbox_width": 2.5, "bbox_height": 2.5, "shape": 5}
+
+
+def random_objects(rng, count, first_id, example_id):
+    shapes = [[[1]], [[1, 1]], [[1], [1]], [[1, 0], [1, 1]]]
+    return [{
+        "id": first_id + index,
+        "example_id": example_id,
+        "color": int(rng.integers(3)),
+        "bbox_x": int(rng.integers(3)),
+        "bbox_y": int(rng.integers(3)),
+        "bbox_width": int(rng.integers(1, 3)),
+        "bbox_height": int(rng.integers(1, 3)),
+        "shape": shapes[int(rng.integers(len(shapes)))],
+    } for index in range(count)]
+
+
+def reference_shared_properties(input_objects, output_objects):
+    shared_properties = []
+    for input_object in input_objects:
+        for output_object in output_objects:
+            properties = [property for property in SIMILARITY_PROPERTIES
+                          if input_object[property] == output_object[property]]
+            shared_properties.append({
+                "input_id": input_object["id"],
+                "output_id": output_object["id"],
+                "num_matching_properties": len(properties),
+                "matching_properties": properties,
+                "normalized_similarity": sum(REFERENCE_WEIGHTS[property] for property in properties) / 25,
+            })
+    return shared_properties
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_similarity_matrix_matches_the_pairwise_scores(seed):
+    rng = np.random.default_rng(seed)
+    input_objects = random_objects(rng, int(rng.integers(0, 6)), 1000, 1)
+    output_objects = random_objects(rng, int(rng.integers(0, 6)), 2000, 1)
+    matrix = compute_similarity_matrix(input_objects, output_objects)
+    assert matrix.similarity.shape == (len(input_objects), len(output_objects))
+    assert similarity_matrix_to_shared_properties(matrix) == reference_shared_properties(input_objects, output_objects)
+
+
+def test_pair_mask_selects_the_pairs():
+    rng = np.random.default_rng(0)
+    objects = random_objects(rng, 2, 1000, 1) + random_objects(rng, 2, 1100, 2)
+    example_ids = np.array([object["example_id"] for object in objects])
+    matrix = compute_similarity_matrix(objects, objects)
+    shared_properties = similarity_matrix_to_shared_properties(matrix, example_ids[:, None] != example_ids[None, :])
+    assert [(match["input_id"], match["output_id"]) for match in shared_properties] == [
+        (1000, 1100), (1000, 1101), (1001, 1100), (1001, 1101),
+        (1100, 1000), (1100, 1001), (1101, 1000), (1101, 1001)]
+
+
+def test_one_to_one_assignment():
+    square = {"color": 1, "bbox_x": 0, "bbox_y": 0, "bbox_width": 2, "bbox_height": 2, "shape": [[1, 1], [1, 1]]}
+    line = {"color": 2, "bbox_x": 3, "bbox_y": 3, "bbox_width": 1, "bbox_height": 2, "shape": [[1], [1]]}
+    other = {"color": 7, "bbox_x": 9, "bbox_y": 9, "bbox_width": 3, "bbox_height": 3, "shape": [[1, 0, 0]]}
+    matrix = compute_similarity_matrix(
+        [dict(line, id=1, example_id=1), dict(square, id=2, example_id=1)],
+        [dict(square, id=11, example_id=1, bbox_x=1), dict(line, id=12, example_id=1), dict(other, id=13, example_id=1)])
+    assert optimal_one_to_one_assignment_with_valid_dummies(matrix) == [
+        {"input_id": 1, "output_id": 12, "similarity": 1.0, "marker": "matched"},
+        {"input_id": 2, "output_id": 11, "similarity": 0.8, "marker": "matched"},
+        {"input_id": None, "output_id": 13, "similarity": 0.0, "marker": "unmatched"},
+    ]
+
+
+def test_shared_properties_of_the_database():
+    pytest.importorskip("kuzu")
+    from knowledge_graph.kuzu_db_manager import IN_MEMORY, KuzuDBManager
+
+    rng = np.random.default_rng(1)
+    input_objects = random_objects(rng, 4, 1000, 1) + random_objects(rng, 3, 1100, 2)
+    output_objects = random_objects(rng, 3, 2000, 1)
+    keys = {"holes": 0, "adjacency": [], "shape_key": "", "rotation_shape_key": "", "canonical_shape_key": "",
+            "scaled_shape_key": ""}
+    with KuzuDBManager(IN_MEMORY) as db_manager:
+        db_manager.create_schema()
+        db_manager.insert_input_objects([dict(object, shape=np.array(object["shape"]), **keys) for object in input_objects])
+        db_manager.insert_output_objects([dict(object, shape=np.array(object["shape"]), **keys) for object in output_objects])
+        assert db_manager.get_shared_properties(example_id=1) == reference_shared_properties(input_objects[:4], output_objects)
+        across = db_manager.shared_properties_across_input(1, 2)
+        assert across == reference_shared_properties(input_objects[:4], input_objects[4:])
@@ -0,0 +1,84 @@
+import csv
+import signal
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from task_runner import flatten_prediction, predict_tasks, predict_with_timeout, write_submission
+
+
+def slow_prediction(task):
+    # like the knowledge graph and search code, which catch Exception around their work
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            time.sleep(0.05)
+        except Exception:
+            pass
+    return "finished"
+
+
+def failing_prediction(task):
+    raise ValueError("no objects")
+
+
+def predict_by_id(task):
+    # the first tasks take the longest, so the workers finish them last
+    time.sleep(task.delay)
+    if task.id == "failing":
+        raise ValueError("no objects")
+    return np.full((1, 2), task.value)
+
+
+def stub_task(id, delay=0.0, value=0, tests=1):
+    return SimpleNamespace(id=id, delay=delay, value=value, test=[None] * tests)
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGALRM"), reason="the timeout needs SIGALRM")
+def test_timeout_is_not_swallowed_by_except_exception():
+    start = time.monotonic()
+    assert predict_with_timeout(slow_prediction, stub_task("slow"), timeout=1) is None
+    assert time.monotonic() - start < 5
+
+
+def test_failed_task_gets_no_prediction():
+    assert predict_with_timeout(failing_prediction, stub_task("failing"), timeout=1) is None
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_predictions_are_in_task_order(workers):
+    tasks = [stub_task("first", 0.3, 1), stub_task("failing", 0.2), stub_task("third", 0.1, 3), stub_task("last", 0, 4)]
+    predictions = predict_tasks(predict_by_id, iter(tasks), workers=workers, timeout=5)
+    assert [None if prediction is None else prediction.tolist() for prediction in predictions] == [
+        [[1, 1]], None, [[3, 3]], [[4, 4]]]
+
+
+def test_flatten_prediction():
+    assert flatten_prediction([[1, 2], [3, 0]]) == "|12|30|"
+
+
+def test_write_submission(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "submission.csv").write_text("rows of an earlier run\n")
+    tasks = [stub_task("a"), stub_task("b", tests=2), stub_task("c"), stub_task("d")]
+    predictions = [np.array([[1, 2], [3, 0]]), np.array([[5]]), None, np.zeros((2, 2), dtype=int)]
+    write_submission(tasks, predictions)
+
+    with open("submission.csv") as submission:
+        rows = list(csv.reader(submission))
+    # both guesses are the same prediction, tasks without a prediction get the shark picture
+    shark = flatten_prediction(
+        [[0, 0, 0, 0, 1, 1, 1, 0, 0, 0], [0, 0, 0, 1, 1, 1, 1, 1, 0, 0], [0, 0, 1, 1, 1, 1, 1, 1, 0, 0],
+         [0, 1, 1, 1, 1, 1, 1, 1, 0, 0], [0, 1, 1, 1, 1, 1, 1, 1, 0, 0], [0, 0, 1, 1, 1, 1, 1, 0, 0, 0],
+         [0, 0, 0, 1, 1, 1, 0, 0, 0, 0], [0, 0, 0, 0, 1, 1, 0, 0, 0, 0], [0, 0, 0, 1, 1, 0, 0, 0, 0, 0],
+         [0, 0, 0, 1, 0, 0, 0, 0, 0, 0]])
+    assert rows == [
+        ["output_id", "output"],
+        ["a_0", "|12|30| |12|30|"],
+        ["b_0", "|5| |5|"],
+        ["b_1", "|5| |5|"],
+        ["c_0", f"{shark} {shark}"],
+        ["d_0", f"{shark} {shark}"],
+    ]